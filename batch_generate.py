@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import asdict
+
+from llm_client import HF_BASE_URL, HF_LLAMA3_MODEL, HF_PROVIDER, make_async_client
+from prompts import TASK_IDS, TEMPERATURE, TOP_P, build_messages, max_tokens_for, request_cache_key, stop_sequences_for
+from quiz_parser import parse_quiz
+from translations import LANGUAGES, LEVEL_KEYS, translations
+
+# --- Batch generation of explanations, summaries and quizzes ---
+# Reads a CSV/JSON/JSONL list of jobs (topic, task, language, level, num_questions),
+# fans them out over AsyncInferenceClient with bounded concurrency, a per-provider
+# rate limit and jittered retries, and appends each result to a JSONL file as soon as
+# it completes. Re-running with the same output file skips jobs that already succeeded.
+#
+#     python batch_generate.py term_plan.csv --output term_plan.jsonl --concurrency 8
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_SECOND = 2.0
+DEFAULT_MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 30.0
+RETRYABLE_STATUS = {408, 429} # Plus every 5xx; other 4xx (bad token, bad request) would only fail again
+# httpx and aiohttp connection/timeout errors, matched by class name so neither is imported here
+TRANSPORT_ERRORS = {"TransportError", "TimeoutException", "ClientConnectionError", "ServerTimeoutError"}
+
+# Level names accepted in job files, in addition to 0/1/2 and the translated level labels
+LEVEL_ALIASES = {"primary": 0, "secondary": 1, "tertiary": 2, "university": 2}
+
+
+def _task_id(value):
+    value = str(value or "").strip()
+    key = value.lower().replace(" ", "_")
+    if key in TASK_IDS:
+        return key
+    for lang_texts in translations.values():
+        for task_id in TASK_IDS:
+            if value.casefold() == lang_texts[task_id].casefold():
+                return task_id
+    raise ValueError(f"unknown task {value!r} (expected one of {', '.join(TASK_IDS)})")
+
+
+def _language(value):
+    value = str(value or "English").strip()
+    for language in LANGUAGES:
+        if value.casefold() == language.casefold():
+            return language
+    raise ValueError(f"unknown language {value!r} (expected one of {', '.join(LANGUAGES)})")
+
+
+def _level_index(value):
+    value = str(value if value not in (None, "") else 1).strip()
+    if value.isdigit() and int(value) < len(LEVEL_KEYS):
+        return int(value)
+    if value.casefold() in LEVEL_ALIASES:
+        return LEVEL_ALIASES[value.casefold()]
+    for lang_texts in translations.values():
+        for index, key in enumerate(LEVEL_KEYS):
+            if value.casefold() == lang_texts[key].casefold():
+                return index
+    raise ValueError(f"unknown level {value!r} (expected primary, secondary or tertiary)")
+
+
+def normalize_job(row):
+    topic = str(row.get("topic") or "").strip()
+    if not topic:
+        raise ValueError("missing topic")
+    task_id = _task_id(row.get("task"))
+    num_questions = int(row.get("num_questions") or 1) if task_id == "generate_quiz" else 1
+    if not 1 <= num_questions <= 5:
+        raise ValueError(f"num_questions must be between 1 and 5, got {num_questions}")
+    return {
+        "topic": topic,
+        "task": task_id,
+        "language": _language(row.get("language")),
+        "level_index": _level_index(row.get("level")),
+        "num_questions": num_questions,
+        "provider": str(row.get("provider") or "").strip() or None,
+    }
+
+
+def parse_job_rows(text, extension):
+    if extension == ".csv":
+        return list(csv.DictReader(io.StringIO(text)))
+    if extension == ".jsonl":
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    rows = json.loads(text)
+    return rows["jobs"] if isinstance(rows, dict) else rows
+
+
+def read_job_rows(path):
+    with open(path, encoding="utf-8-sig") as f:
+        return parse_job_rows(f.read(), os.path.splitext(path)[1].lower())
+
+
+def load_jobs(rows, model=HF_LLAMA3_MODEL):
+    # Returns (jobs, errors); duplicate rows collapse onto one job id
+    jobs = {}
+    errors = []
+    for line_number, row in enumerate(rows, start=1):
+        try:
+            job = normalize_job(row)
+        except (AttributeError, TypeError, ValueError) as e: # AttributeError: the row is not an object
+            errors.append(f"job {line_number}: {e}")
+            continue
+        job["job_id"] = request_cache_key(
+            model, job["task"], job["topic"], job["language"], job["level_index"], job["num_questions"]
+        )
+        jobs.setdefault(job["job_id"], job)
+    return list(jobs.values()), errors
+
+
+def completed_job_ids(output_path):
+    # Job ids that already have a successful record, so a killed run can resume
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short when the previous run was killed
+            if record.get("status") == "ok":
+                done.add(record["job_id"])
+    return done
+
+
+class RateLimiter:
+    # Async token bucket: at most `rate` requests per second with bursts of `burst`
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_CAP_SECONDS):
+    # "Full jitter" exponential backoff, so retries from many jobs do not line up
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_retryable(error):
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in TRANSPORT_ERRORS for cls in type(error).__mro__)
+
+
+async def generate_one(client, job, model, limiter, max_retries):
+    messages = build_messages(job["task"], job["topic"], job["language"], job["level_index"], job["num_questions"])
+    started = time.perf_counter()
+    last_error = None
+    attempts = 0
+    for attempt in range(max_retries + 1):
+        if attempt:
+            await asyncio.sleep(backoff_delay(attempt - 1))
+        await limiter.acquire()
+        attempts += 1
+        try:
+            completion = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens_for(job["task"], job["language"], job["num_questions"]),
+                temperature=TEMPERATURE,
+                top_p=TOP_P,
+                stop=stop_sequences_for(job["task"], job["num_questions"]),
+            )
+        except Exception as e:
+            last_error = f"{type(e).__name__}: {e}"
+            if is_retryable(e):
+                continue
+            break
+
+        output = completion.choices[0].message.content or ""
+        usage = getattr(completion, "usage", None)
+        record = dict(job)
+        record.update({
+            "status": "ok",
+            "output": output,
+            "attempts": attempt + 1,
+            "latency_seconds": round(time.perf_counter() - started, 3),
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+            "truncated": completion.choices[0].finish_reason == "length",
+        })
+        if job["task"] == "generate_quiz":
+            questions, issues = parse_quiz(output, extra_labels=(translations[job["language"]]["quiz_correct_answer"],))
+            record["questions"] = [asdict(q) for q in questions]
+            record["issues"] = [asdict(issue) for issue in issues]
+            if not questions:
+                record["status"] = "parse_failed"
+        return record
+
+    record = dict(job)
+    record.update({
+        "status": "error",
+        "error": last_error,
+        "attempts": attempts,
+        "latency_seconds": round(time.perf_counter() - started, 3),
+    })
+    return record
+
+
+async def run_batch(jobs, output_path, concurrency=DEFAULT_CONCURRENCY,
+                    requests_per_second=DEFAULT_REQUESTS_PER_SECOND, max_retries=DEFAULT_MAX_RETRIES,
+                    model=HF_LLAMA3_MODEL, base_url=None, cache=None, on_result=None):
+    # Returns a summary dict; results are appended to output_path as they complete
+    done = completed_job_ids(output_path)
+    pending = [job for job in jobs if job["job_id"] not in done]
+    summary = {"total": len(jobs), "skipped": len(jobs) - len(pending), "ok": 0, "parse_failed": 0, "error": 0}
+
+    clients = {}
+    limiters = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    def route_for(job):
+        # One client and one rate limit per provider (a local base_url counts as one provider)
+        provider = "local" if (base_url or HF_BASE_URL) else (job["provider"] or HF_PROVIDER)
+        if provider not in clients:
+            clients[provider] = make_async_client(
+                provider=None if provider == "local" else provider, base_url=base_url
+            )
+            limiters[provider] = RateLimiter(requests_per_second)
+        return clients[provider], limiters[provider]
+
+    async def worker(job, output_file):
+        async with semaphore:
+            client, limiter = route_for(job)
+            record = await generate_one(client, job, model, limiter, max_retries)
+        output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output_file.flush() # Every finished job survives a kill
+        summary[record["status"]] += 1
+        # Cut-off answers and short quizzes stay in the results file but are not served to students
+        complete = not record.get("truncated") and (
+            record["task"] != "generate_quiz" or len(record.get("questions", ())) >= record["num_questions"]
+        )
+        if cache is not None and record["status"] == "ok" and complete:
+            cache.put(record["job_id"], record["output"])
+        if on_result is not None:
+            on_result(record, summary)
+
+    try:
+        with open(output_path, "a", encoding="utf-8") as output_file:
+            await asyncio.gather(*(worker(job, output_file) for job in pending))
+    finally:
+        for client in clients.values():
+            close = getattr(client, "close", None)
+            if close is not None:
+                await close()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate ClassGPT content for a list of topics")
+    parser.add_argument("jobs", help="CSV, JSON or JSONL file with topic, task, language, level, num_questions")
+    parser.add_argument("--output", "-o", help="JSONL results file (default: <jobs>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                        help="Requests per second per provider (0 disables the limit)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_MAX_RETRIES)
+    parser.add_argument("--model", default=HF_LLAMA3_MODEL)
+    parser.add_argument("--base-url", help="OpenAI-compatible server to use instead of the HF router")
+    parser.add_argument("--no-cache", action="store_true", help="Do not copy results into the app's response cache")
+    args = parser.parse_args(argv)
+
+    output_path = args.output or os.path.splitext(args.jobs)[0] + ".results.jsonl"
+    jobs, errors = load_jobs(read_job_rows(args.jobs), model=args.model)
+    for error in errors:
+        print(f"Skipping {error}", file=sys.stderr)
+
+    cache = None
+    if not args.no_cache:
+        from response_cache import ResponseCache
+        cache = ResponseCache()
+
+    def report(record, summary):
+        finished = summary["ok"] + summary["parse_failed"] + summary["error"]
+        print(f"[{finished}/{summary['total'] - summary['skipped']}] {record['status']:<12} "
+              f"{record['task']:<16} {record['language']:<8} {record['topic']}")
+
+    summary = asyncio.run(run_batch(
+        jobs, output_path,
+        concurrency=args.concurrency,
+        requests_per_second=args.rate,
+        max_retries=args.retries,
+        model=args.model,
+        base_url=args.base_url,
+        cache=cache,
+        on_result=report,
+    ))
+    print(json.dumps(summary))
+    return 0 if summary["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
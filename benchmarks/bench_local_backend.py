@@ -0,0 +1,131 @@
+# Local CPU model (llama.cpp) against the remote path: latency and throughput
+#
+# Run from the repository root (needs the optional llama-cpp-python package and a GGUF model):
+#     python benchmarks/bench_local_backend.py --model /models/Llama-3.2-1B-Instruct-Q4_K_M.gguf \
+#         [--requests 16] [--concurrency 4] [--max-tokens 128] [--remote-url URL]
+#
+# The same streamed explanation requests are sent, `--concurrency` at a time, to:
+#   remote            an OpenAI-compatible endpoint (--remote-url, with HF_TOKEN), or by default
+#                     the local stub (mock_inference_server.py) with a WAN-like first-token delay
+#   local_sequential  local_backend.LocalBackend with one slot: one request at a time
+#   local_batched     the same model with --slots slots, decoded together (continuous batching)
+# Prints a JSON report with time to first token, total latency, requests and tokens per
+# second, and process CPU seconds per request for each path.
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import HF_LLAMA3_MODEL, make_client  # noqa: E402
+from local_backend import LOCAL_MODEL_PATH, LOCAL_THREADS, LlamaCppEngine, LocalBackend  # noqa: E402
+from metrics import percentile  # noqa: E402
+from mock_inference_server import start_server  # noqa: E402
+from prompts import build_messages  # noqa: E402
+
+TOPICS = ("Photosynthesis", "Fractions", "The water cycle", "Gravity", "The human heart", "Electricity", "Erosion", "Volcanoes")
+
+
+def timed_stream(client, model, messages, max_tokens):
+    # (seconds to first token, total seconds, completion tokens), or None when the request failed
+    start = time.perf_counter()
+    first = None
+    tokens = 0
+    try:
+        stream = client.chat.completions.create(
+            model=model, messages=messages, max_tokens=max_tokens, temperature=0.7, top_p=0.9,
+            stream=True, stream_options={"include_usage": True},
+        )
+        for chunk in stream:
+            if first is None and chunk.choices and chunk.choices[0].delta.content:
+                first = time.perf_counter() - start
+            if getattr(chunk, "usage", None) is not None:
+                tokens = chunk.usage.completion_tokens
+    except Exception:
+        return None
+    total = time.perf_counter() - start
+    return (total if first is None else first), total, tokens
+
+
+def run(client, model, requests, concurrency, max_tokens):
+    messages = [build_messages("explain_it", TOPICS[i % len(TOPICS)], "English", 1) for i in range(requests)]
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda m: timed_stream(client, model, m, max_tokens), messages))
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    ok = [r for r in results if r is not None]
+    ttft = sorted(r[0] for r in ok)
+    latency = sorted(r[1] for r in ok)
+    tokens = sum(r[2] for r in ok)
+    return {
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "ttft_ms": {f"p{q}": round(1000 * percentile(ttft, q), 1) for q in (50, 95)} if ok else None,
+        "latency_ms": {f"p{q}": round(1000 * percentile(latency, q), 1) for q in (50, 95)} if ok else None,
+        "requests_per_second": round(len(ok) / elapsed, 3),
+        "tokens_per_second": round(tokens / elapsed, 1),
+        "cpu_seconds_per_request": round(cpu / max(1, len(ok)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=LOCAL_MODEL_PATH, help="GGUF model file (default: CLASSGPT_LOCAL_MODEL)")
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--slots", type=int, default=None, help="Local sequences decoded together (default: --concurrency)")
+    parser.add_argument("--threads", type=int, default=LOCAL_THREADS)
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--remote-url", default=None, help="OpenAI-compatible endpoint to compare against")
+    parser.add_argument("--remote-latency", type=float, default=0.8, help="Stub's seconds to first token when no --remote-url")
+    parser.add_argument("--remote-token-interval", type=float, default=0.02, help="Stub's seconds per streamed word")
+    args = parser.parse_args()
+    if not args.model:
+        parser.error("a GGUF model is required (--model or CLASSGPT_LOCAL_MODEL)")
+    slots = args.slots or args.concurrency
+
+    stub = None
+    if args.remote_url:
+        remote = make_client(base_url=args.remote_url)
+    else:
+        stub = start_server(latency=args.remote_latency, jitter=args.remote_latency / 10, token_interval=args.remote_token_interval)
+        remote = make_client(base_url=stub.url)
+
+    load_started = time.perf_counter()
+    engine = LlamaCppEngine(args.model, slots=slots, threads=args.threads)
+    load_seconds = time.perf_counter() - load_started
+    sequential = LocalBackend(engine, slots=1, queue_size=args.requests)
+    run(sequential, None, 2, 1, 8) # Warm-up: first decode allocates the compute buffers
+    results = {
+        "remote": run(remote, HF_LLAMA3_MODEL, args.requests, args.concurrency, args.max_tokens),
+        "local_sequential": run(sequential, None, args.requests, args.concurrency, args.max_tokens),
+    }
+    batched = LocalBackend(engine, slots=slots, queue_size=args.requests)
+    results["local_batched"] = run(batched, None, args.requests, args.concurrency, args.max_tokens)
+
+    report = {
+        "benchmark": "local_backend",
+        "model": os.path.basename(args.model),
+        "remote_endpoint": args.remote_url or f"stub ({args.remote_latency}s to first token)",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "slots": slots,
+        "threads": args.threads,
+        "max_tokens": args.max_tokens,
+        "model_load_seconds": round(load_seconds, 2),
+        **results,
+        "local_batched_stats": batched.stats(),
+    }
+    print(json.dumps(report, indent=2))
+    if stub is not None:
+        stub.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+# Token and latency savings of compact prompts, adaptive max_tokens and stop sequences
+#
+# Run from the repository root:
+#     python benchmarks/bench_prompt_budget.py [--rounds 3] [--token-interval 0.002]
+#
+# Starts mock_inference_server.py in "overrun" mode (the model keeps talking after the
+# answer until max_tokens or a stop sequence) and sends every task x language request
+# twice: the original way (full prompts, fixed 1500/700 max_tokens, no stop) and the
+# budgeted way (compact prompts, TokenBudget max_tokens, stop sequences). Prompt tokens are
+# counted locally with token_budget.count_message_tokens; completion tokens come from the
+# stub's usage report. Prints a JSON report.
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from huggingface_hub import InferenceClient  # noqa: E402
+
+from mock_inference_server import start_server  # noqa: E402
+from prompts import TASK_IDS, TEMPERATURE, TOP_P, build_messages, stop_sequences_for  # noqa: E402
+from quiz_parser import parse_quiz  # noqa: E402
+from token_budget import TokenBudget, count_message_tokens, load_tokenizer  # noqa: E402
+from translations import LANGUAGES  # noqa: E402
+
+LEGACY_MAX_TOKENS = {"explain_it": 700, "summarize_topic": 700, "generate_quiz": 1500}
+TOPICS = ("Photosynthesis", "The water cycle", "Fractions", "Electricity")
+
+
+def run_request(client, messages, max_tokens, stop):
+    start = time.perf_counter()
+    completion = client.chat.completions.create(
+        model="mock-model",
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=TEMPERATURE,
+        top_p=TOP_P,
+        stop=stop,
+    )
+    return completion, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=3, help="Requests per task and language (the budget learns across them)")
+    parser.add_argument("--num-questions", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--token-interval", type=float, default=0.002, help="Stub seconds per generated token")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency, jitter=0.0, token_interval=args.token_interval, overrun=True)
+    client = InferenceClient(base_url=server.url)
+    budget = TokenBudget(min_samples=1)
+    results = {mode: {task_id: {"prompt_tokens": [], "completion_tokens": [], "latency_ms": [], "quiz_ok": []}
+                      for task_id in TASK_IDS} for mode in ("original", "budgeted")}
+
+    for round_index in range(args.rounds):
+        topic = TOPICS[round_index % len(TOPICS)]
+        for task_id in TASK_IDS:
+            num_questions = args.num_questions if task_id == "generate_quiz" else 1
+            for language in LANGUAGES:
+                variants = {
+                    "original": (build_messages(task_id, topic, language, 1, num_questions, style="full"),
+                                 LEGACY_MAX_TOKENS[task_id], None),
+                    "budgeted": (build_messages(task_id, topic, language, 1, num_questions, style="compact"),
+                                 budget.max_tokens(task_id, language, num_questions),
+                                 stop_sequences_for(task_id, num_questions)),
+                }
+                for mode, (messages, max_tokens, stop) in variants.items():
+                    completion, latency_ms = run_request(client, messages, max_tokens, stop)
+                    output = completion.choices[0].message.content or ""
+                    sample = results[mode][task_id]
+                    sample["prompt_tokens"].append(count_message_tokens(messages))
+                    sample["completion_tokens"].append(completion.usage.completion_tokens)
+                    sample["latency_ms"].append(latency_ms)
+                    if task_id == "generate_quiz":
+                        questions, _ = parse_quiz(output)
+                        sample["quiz_ok"].append(len(questions) >= num_questions)
+                    if mode == "budgeted":
+                        budget.observe(task_id, language, num_questions, completion.usage.completion_tokens,
+                                       truncated=completion.choices[0].finish_reason == "length")
+
+    report = {
+        "benchmark": "prompt_budget",
+        "tokenizer": "model" if load_tokenizer() is not None else "estimate",
+        "rounds": args.rounds,
+        "tasks": {},
+    }
+    totals = {mode: {"prompt_tokens": 0, "completion_tokens": 0, "latency_ms": 0.0} for mode in results}
+    for task_id in TASK_IDS:
+        report["tasks"][task_id] = {}
+        for mode in results:
+            sample = results[mode][task_id]
+            report["tasks"][task_id][mode] = {
+                "prompt_tokens": round(statistics.mean(sample["prompt_tokens"]), 1),
+                "completion_tokens": round(statistics.mean(sample["completion_tokens"]), 1),
+                "latency_ms_p50": round(statistics.median(sample["latency_ms"]), 1),
+            }
+            if sample["quiz_ok"]:
+                report["tasks"][task_id][mode]["complete_quizzes"] = f"{sum(sample['quiz_ok'])}/{len(sample['quiz_ok'])}"
+            for field in totals[mode]:
+                totals[mode][field] += sum(sample[field])
+
+    def reduction(field):
+        return round(100 * (1 - totals["budgeted"][field] / totals["original"][field]), 1)
+
+    report["reduction_percent"] = {
+        "prompt_tokens": reduction("prompt_tokens"),
+        "completion_tokens": reduction("completion_tokens"),
+        "total_tokens": round(100 * (1 - sum(totals["budgeted"][f] for f in ("prompt_tokens", "completion_tokens"))
+                                     / sum(totals["original"][f] for f in ("prompt_tokens", "completion_tokens"))), 1),
+        "latency": reduction("latency_ms"),
+    }
+    report["learned_tokens_per_unit"] = budget.stats()
+    server.shutdown()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
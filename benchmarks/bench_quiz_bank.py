@@ -0,0 +1,102 @@
+# Quiz bank: how many quizzes need the API, and how fast a quiz is assembled locally
+#
+# Run from the repository root:
+#     python benchmarks/bench_quiz_bank.py [--students 300] [--topics 200] [--quizzes-per-student 6]
+#
+# Simulates students taking several 5-question quizzes on a handful of topics each, at
+# one quiz every few minutes of simulated time. A quiz comes from quiz_bank.QuizBank when
+# it has enough questions due for that student; otherwise a "generation" (fresh questions,
+# standing in for an API call) is added to the bank first. Answers are right with a
+# per-student probability, so wrong answers come back through the spaced-repetition
+# schedule. Before the bank, every quiz was an API call (or a repeat of the cached one).
+# Prints a JSON report with the API call rate and assemble/record latency percentiles.
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import percentile  # noqa: E402
+from quiz_bank import QuizBank  # noqa: E402
+from quiz_parser import QuizQuestion  # noqa: E402
+
+LEVELS = 3
+
+
+def generate(rng, topic, count):
+    # Stand-in for an API call: `count` new questions on the topic
+    return [
+        QuizQuestion(
+            number=n,
+            question=f"About {topic}: question {rng.getrandbits(48):x}?",
+            letters="ABCD",
+            texts=tuple(f"Option {letter}" for letter in "ABCD"),
+            correct_answer=rng.choice("ABCD"),
+            diagnostics=(),
+        )
+        for n in range(1, count + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--topics-per-student", type=int, default=3)
+    parser.add_argument("--quizzes-per-student", type=int, default=6)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--minutes-between-quizzes", type=float, default=15)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tmp = tempfile.TemporaryDirectory()
+    bank = QuizBank(os.path.join(tmp.name, "quiz_bank.sqlite3"))
+    students = [
+        (f"student-{i}", [f"topic {rng.randrange(args.topics)}" for _ in range(args.topics_per_student)],
+         rng.randrange(LEVELS), rng.uniform(0.4, 0.9))
+        for i in range(args.students)
+    ]
+    quizzes = api_calls = 0
+    assemble_ms, record_ms = [], []
+    start = time.time()
+    for round_index in range(args.quizzes_per_student):
+        now = start + round_index * args.minutes_between_quizzes * 60
+        for learner, topics, level_index, skill in students:
+            topic = rng.choice(topics)
+            request = (topic, "English", level_index, args.questions)
+            started = time.perf_counter()
+            quiz = bank.assemble(learner, *request, now=now)
+            assemble_ms.append((time.perf_counter() - started) * 1000)
+            if quiz is None:
+                api_calls += 1
+                bank.add(*request[:3], generate(rng, topic, args.questions))
+                quiz = bank.assemble(learner, *request, now=now) or generate(rng, topic, args.questions)
+            answers = [q.correct_answer if rng.random() < skill else "X" for q in quiz]
+            started = time.perf_counter()
+            bank.record_answers(learner, *request[:3], quiz, answers, now=now)
+            record_ms.append((time.perf_counter() - started) * 1000)
+            quizzes += 1
+
+    assemble_ms.sort()
+    record_ms.sort()
+    report = {
+        "benchmark": "quiz_bank",
+        "students": args.students,
+        "quizzes": quizzes,
+        "api_calls": {"before": quizzes, "after": api_calls, "rate_after": round(api_calls / quizzes, 3)},
+        "assemble_ms": {f"p{q}": round(percentile(assemble_ms, q), 3) for q in (50, 95, 99)},
+        "record_answers_ms": {f"p{q}": round(percentile(record_ms, q), 3) for q in (50, 95, 99)},
+        "bank": bank.stats(),
+    }
+    tmp.cleanup()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# Fuzz and timing suite for quiz_parser.py
+#
+# Run from the repository root:
+#     python benchmarks/bench_quiz_parser.py [--seed 0] [--fuzz-rounds 300]
+#
+# Every adversarial input is ~100 KB. The script exits non-zero if any input takes
+# longer than the time budget, if parse time grows clearly faster than linearly, or if the
+# fuzzer finds an input that raises or produces an inconsistent question record.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quiz_parser import OPTION_LETTERS, QuizParser, parse_quiz  # noqa: E402
+
+TARGET_BYTES = 100 * 1024
+TIME_BUDGET_SECONDS = 0.5  # Per 100 KB input, generous for slow CI machines
+GROWTH_FACTOR = 4
+MAX_GROWTH_RATIO = 7.0  # 4x the input: linear is ~4x, quadratic would be ~16x
+
+WELL_FORMED_QUESTION = """{n}. What is the capital of France?
+A) Berlin
+B) Paris
+B) Paris
+C) Rome
+D) Madrid
+Correct Answer: B
+
+"""
+
+
+def repeat_to_size(block_fn, size=TARGET_BYTES):
+    parts = []
+    total = 0
+    n = 1
+    while total < size:
+        block = block_fn(n)
+        parts.append(block)
+        total += len(block.encode("utf-8"))
+        n += 1
+    return "".join(parts)
+
+
+def adversarial_inputs(rng, size=TARGET_BYTES):
+    return {
+        "well_formed": repeat_to_size(lambda n: WELL_FORMED_QUESTION.format(n=n), size),
+        "single_line": "1. " + "A) B) C) D) " * (size // 12),
+        "options_only": repeat_to_size(lambda n: "A) x\nB) y\nC) z\nD) w\n", size),
+        "questions_only": repeat_to_size(lambda n: f"{n}. question without options\n", size),
+        "answers_only": repeat_to_size(lambda n: "Correct Answer: B\n", size),
+        "missing_answers": repeat_to_size(lambda n: f"{n}. Q\nA) a\nB) b\nC) c\nD) d\n", size),
+        "whitespace": " \t" * (size // 2),
+        "long_lines": repeat_to_size(lambda n: "A) " + "x" * 5000 + "\n", size),
+        "markdown_noise": repeat_to_size(lambda n: f"**{n}.** *Q*\n- **A)** a\n> B. b\n(C) c\nD: d\n**Correct Answer:** D\n", size),
+        "arabic": repeat_to_size(lambda n: f"{n}. ما هو؟\nأ) واحد\nب) اثنان\nج) ثلاثة\nد) أربعة\nالإجابة الصحيحة: ب\n", size),
+        "random_bytes": "".join(rng.choice("1. A)B)C)D)\n Correct Answer:") for _ in range(size)),
+    }
+
+
+def time_parse(text, chunk_size=None, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        if chunk_size is None:
+            parse_quiz(text)
+        else:
+            parser = QuizParser()
+            for i in range(0, len(text), chunk_size):
+                parser.feed(text[i:i + chunk_size])
+            parser.close()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_invariants(questions):
+    for q in questions:
+        assert q.question, "empty question text"
+        assert q.correct_answer in q.options, "correct answer missing from options"
+        assert set(q.options) <= set(OPTION_LETTERS), f"unexpected option letters {sorted(q.options)}"
+
+
+def mutate(text, rng):
+    # Insert, delete, duplicate or swap random slices of a well-formed quiz
+    chars = list(text)
+    for _ in range(rng.randint(1, 20)):
+        if not chars:
+            break
+        i = rng.randrange(len(chars))
+        op = rng.random()
+        if op < 0.3:
+            del chars[i:i + rng.randint(1, 10)]
+        elif op < 0.6:
+            chars[i:i] = list(rng.choice(["\n", "A) ", "Correct Answer: ", "1. ", "(B) ", "**", "الإجابة الصحيحة: ", "\r\n"]))
+        elif op < 0.8:
+            j = rng.randrange(len(chars))
+            chars[i], chars[j] = chars[j], chars[i]
+        else:
+            chars[i:i] = chars[i:i + rng.randint(1, 40)]
+    return "".join(chars)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--fuzz-rounds", type=int, default=300)
+    args = arg_parser.parse_args()
+    rng = random.Random(args.seed)
+    failures = []
+
+    print(f"{'input':<16}{'KB':>6}{'whole (ms)':>12}{'8-char chunks (ms)':>20}{'4x growth':>11}")
+    for name, text in adversarial_inputs(rng).items():
+        whole = time_parse(text)
+        streamed = time_parse(text, chunk_size=8)
+        grown = time_parse(text * GROWTH_FACTOR)
+        growth = grown / whole if whole else 1.0
+        print(f"{name:<16}{len(text.encode('utf-8')) // 1024:>6}{whole * 1000:>12.2f}{streamed * 1000:>20.2f}{growth:>11.2f}")
+        if max(whole, streamed) > TIME_BUDGET_SECONDS:
+            failures.append(f"{name}: {max(whole, streamed):.3f}s exceeds {TIME_BUDGET_SECONDS}s")
+        if growth > MAX_GROWTH_RATIO and grown > 0.02:
+            failures.append(f"{name}: {GROWTH_FACTOR}x the input grew parse time {growth:.1f}x")
+
+    # Streaming must not change the result, wherever the chunk boundaries fall
+    sample = repeat_to_size(lambda n: WELL_FORMED_QUESTION.format(n=n), 4096)
+    expected, _ = parse_quiz(sample)
+    for chunk_size in (1, 2, 3, 7, 64, 1000):
+        parser = QuizParser()
+        for i in range(0, len(sample), chunk_size):
+            parser.feed(sample[i:i + chunk_size])
+        parser.close()
+        if parser.questions != expected:
+            failures.append(f"chunk size {chunk_size} changed the parse result")
+
+    for round_number in range(args.fuzz_rounds):
+        text = mutate(sample, rng)
+        try:
+            questions, _ = parse_quiz(text)
+            check_invariants(questions)
+        except Exception as e:  # Any exception is a parser bug
+            failures.append(f"fuzz round {round_number}: {type(e).__name__}: {e}")
+
+    print(f"fuzz rounds: {args.fuzz_rounds}, failures: {len(failures)}")
+    for failure in failures:
+        print("FAIL", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
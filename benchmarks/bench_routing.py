@@ -0,0 +1,95 @@
+# Tail latency with and without provider routing, hedging and circuit breaking
+#
+# Run from the repository root:
+#     python benchmarks/bench_routing.py [--requests 200] [--concurrency 8]
+#
+# Starts three local fake providers (mock_inference_server.py): "primary" is fast but
+# stalls on a fraction of requests, "secondary" is a little slower but steady, and "down"
+# fails every request. The same streamed requests are sent once straight to the primary
+# (how the app used to work) and once through provider_router.Router over all three.
+# Prints a JSON report with time-to-first-token percentiles and error counts.
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from huggingface_hub import InferenceClient  # noqa: E402
+
+from metrics import percentile  # noqa: E402
+from mock_inference_server import start_server  # noqa: E402
+from prompts import build_messages  # noqa: E402
+from provider_router import Route, Router  # noqa: E402
+
+
+def timed_stream(client, messages):
+    # Seconds to the first streamed token, or None when the request failed
+    start = time.perf_counter()
+    try:
+        stream = client.chat.completions.create(model="mock-model", messages=messages, max_tokens=50, stream=True)
+        for _ in stream:
+            first_token = time.perf_counter() - start
+            break
+        else:
+            return None
+        for _ in stream:
+            pass
+        return first_token
+    except Exception:
+        return None
+
+
+def run(client, requests, concurrency):
+    messages = build_messages("explain_it", "Photosynthesis", "English", 1)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: timed_stream(client, messages), range(requests)))
+    latencies = sorted(r for r in results if r is not None)
+    return {
+        "ok": len(latencies),
+        "errors": len(results) - len(latencies),
+        "ttft_ms": {f"p{q}": round(1000 * percentile(latencies, q), 1) for q in (50, 95, 99)} if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tail-rate", type=float, default=0.03, help="Fraction of primary requests that stall (hedging targets tails beyond the p95)")
+    parser.add_argument("--tail-latency", type=float, default=2.0)
+    args = parser.parse_args()
+
+    primary = start_server(latency=0.08, jitter=0.01, tail_rate=args.tail_rate, tail_latency=args.tail_latency)
+    secondary = start_server(latency=0.12, jitter=0.01)
+    down = start_server(latency=0.02, jitter=0.0, error_rate=1.0)
+
+    direct = run(InferenceClient(base_url=primary.url, api_key="local"), args.requests, args.concurrency)
+
+    router = Router([
+        Route("down", InferenceClient(base_url=down.url, api_key="local")),
+        Route("primary", InferenceClient(base_url=primary.url, api_key="local")),
+        Route("secondary", InferenceClient(base_url=secondary.url, api_key="local")),
+    ])
+    run(router, 20, args.concurrency) # Warm-up: the router learns latencies and opens the "down" circuit
+    routed = run(router, args.requests, args.concurrency)
+
+    report = {
+        "benchmark": "routing",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "direct_primary": direct,
+        "router": routed,
+        "router_stats": router.stats(),
+        "upstream_requests": {"primary": primary.request_count, "secondary": secondary.request_count, "down": down.request_count},
+    }
+    print(json.dumps(report, indent=2))
+    for server in (primary, secondary, down):
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# Per-session memory of quiz state, before and after the shared content store
+#
+# Run from the repository root:
+#     python benchmarks/bench_session_memory.py [--sessions 2000] [--quizzes 50] [--questions 5]
+#
+# Simulates many open student tabs that have each generated (or been served from the
+# cache) one of a pool of quizzes, answered it and submitted. "before" is what
+# st.session_state used to hold per session: its own parsed quiz (dict options, list
+# diagnostics), answers keyed "q0".."qN" and the radio values as "A) option text" strings.
+# "after" is what it holds now: a session key, the quiz id, a tuple of chosen letters and
+# the radio letters, with the parsed quizzes held once in content_store.ContentStore.
+# Memory is measured with tracemalloc. Prints a JSON report, including what is left after
+# every session has gone idle and been evicted.
+import argparse
+import json
+import os
+import random
+import sys
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_store import ContentStore, content_id  # noqa: E402
+from quiz_parser import parse_quiz  # noqa: E402
+
+WORDS = (
+    "energy", "plants", "sunlight", "water", "carbon", "oxygen", "cells", "leaves", "process", "glucose",
+    "roots", "chlorophyll", "light", "food", "air", "soil", "growth", "nutrients", "heat", "animals",
+)
+
+
+@dataclass
+class LegacyQuizQuestion:
+    # The record quiz_parser used to produce
+    number: int
+    question: str
+    options: dict
+    correct_answer: str
+    diagnostics: list = field(default_factory=list)
+
+
+def sample_quiz(rng, questions):
+    # Quiz text the size of a real model answer (~80 character questions, ~30 character options)
+    blocks = []
+    for n in range(1, questions + 1):
+        question = " ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + "?"
+        options = [" ".join(rng.choice(WORDS) for _ in range(4)).capitalize() for _ in range(4)]
+        blocks.append(
+            f"{n}. {question}\n" + "".join(f"{letter}) {text}\n" for letter, text in zip("ABCD", options))
+            + f"Correct Answer: {rng.choice('ABCD')}\n"
+        )
+    return "\n".join(blocks)
+
+
+def legacy_session(output, rng):
+    questions, _ = parse_quiz(output)
+    quiz_data = [
+        LegacyQuizQuestion(q.number, q.question, dict(q.options), q.correct_answer, list(q.diagnostics))
+        for q in questions
+    ]
+    state = {"quiz_data": quiz_data, "quiz_submitted": True}
+    radios = {}
+    for i, q in enumerate(quiz_data):
+        letter = rng.choice(sorted(q.options))
+        radios[f"q_{i}_radio"] = f"{letter}) {q.options[letter]}"
+    state["quiz_answers"] = {f"q{i}": value.split(")")[0] for i, value in enumerate(radios.values())}
+    state.update(radios)
+    return state
+
+
+def compact_session(output, rng, store):
+    session_key = uuid.uuid4().hex
+    quiz_id = content_id(output)
+    questions = store.get(quiz_id)
+    if questions is None:
+        questions = tuple(parse_quiz(output)[0])
+    quiz_id = store.put(session_key, output, questions)
+    questions = store.get(quiz_id)
+    state = {"session_key": session_key, "quiz_id": quiz_id, "quiz_submitted": True}
+    for i, q in enumerate(questions):
+        state[f"q_{quiz_id}_{i}_radio"] = rng.choice(q.letters)
+    state["quiz_answers"] = tuple(state[f"q_{quiz_id}_{i}_radio"] for i in range(len(questions)))
+    return state
+
+
+def grown_since(baseline):
+    return sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=2000, help="Open student tabs")
+    parser.add_argument("--quizzes", type=int, default=50, help="Distinct quizzes they were served")
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    outputs = [sample_quiz(rng, args.questions) for _ in range(args.quizzes)]
+    picks = [rng.randrange(args.quizzes) for _ in range(args.sessions)]
+
+    tracemalloc.start()
+    rng = random.Random(args.seed)
+    baseline = tracemalloc.take_snapshot()
+    legacy = [legacy_session(outputs[i], rng) for i in picks]
+    legacy_bytes = grown_since(baseline)
+    del legacy
+
+    rng = random.Random(args.seed)
+    store = ContentStore(idle_seconds=0.0)
+    baseline = tracemalloc.take_snapshot()
+    sessions = [compact_session(outputs[i], rng, store) for i in picks]
+    compact_bytes = grown_since(baseline)
+    stored = store.stats()["content"]
+
+    # Every tab goes idle: the store drops the sessions and then the quizzes nobody holds.
+    # What is left is Streamlit's own (now tiny) per-session state.
+    store.sweep()
+    evicted_bytes = grown_since(baseline)
+    tracemalloc.stop()
+    report = {
+        "benchmark": "session_memory",
+        "sessions": args.sessions,
+        "distinct_quizzes": args.quizzes,
+        "questions_per_quiz": args.questions,
+        "before": {
+            "total_kb": round(legacy_bytes / 1024, 1),
+            "per_session_bytes": round(legacy_bytes / args.sessions),
+        },
+        "after": {
+            "total_kb": round(compact_bytes / 1024, 1),
+            "per_session_bytes": round(compact_bytes / args.sessions),
+            "quizzes_stored": stored,
+        },
+        "reduction_percent": round(100 * (1 - compact_bytes / legacy_bytes), 1),
+        "after_idle_eviction": {
+            "total_kb": round(evicted_bytes / 1024, 1),
+            **store.stats(),
+        },
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# Startup / rerun cost benchmark for class_gpt_app.py
+#
+# Run from the repository root:
+#     python benchmarks/bench_startup.py [--reruns 30] [--output startup.json] [--max-warm-ms 150]
+#
+# "cold" is the first script run in a fresh interpreter: app-module imports, client and
+# cache creation, translations and the first render. "warm" is every rerun after that,
+# which is what each widget interaction of each session pays. Each measurement runs in
+# its own subprocess so imports are genuinely cold. Results are printed as JSON.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE_SCRIPT = r"""
+import json, os, sys, time
+sys.path.insert(0, {repo_root!r})
+from mock_inference_server import start_server
+server = start_server(latency=0.0, jitter=0.0)
+os.environ["HF_BASE_URL"] = server.url
+from streamlit.testing.v1 import AppTest
+
+app = AppTest.from_file(os.path.join({repo_root!r}, "class_gpt_app.py"), default_timeout=60)
+start = time.perf_counter()
+app.run()
+cold = time.perf_counter() - start
+assert not app.exception, app.exception
+
+warm = []
+for i in range({reruns}):
+    start = time.perf_counter()
+    app.run()
+    warm.append(time.perf_counter() - start)
+print(json.dumps({{"cold": cold, "warm": warm}}))
+"""
+
+
+def measure_once(reruns, tmp):
+    # Every store the app opens lives in `tmp`, so each process starts cold and the repo's own
+    # databases are never touched
+    env = dict(
+        os.environ,
+        CLASSGPT_CACHE_DB=os.path.join(tmp, "cache.sqlite3"),
+        CLASSGPT_TOPIC_DB=os.path.join(tmp, "topics.sqlite3"),
+        CLASSGPT_METRICS_DB=os.path.join(tmp, "metrics.sqlite3"),
+        CLASSGPT_QUIZ_BANK_DB=os.path.join(tmp, "quiz_bank.sqlite3"),
+        HF_TOKEN=os.environ.get("HF_TOKEN", "benchmark"),
+    )
+    script = MEASURE_SCRIPT.format(repo_root=REPO_ROOT, reruns=reruns)
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reruns", type=int, default=30, help="Warm reruns per process")
+    parser.add_argument("--processes", type=int, default=3, help="Fresh interpreters to measure cold start in")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--max-warm-ms", type=float, help="Exit non-zero if the median warm rerun is slower")
+    args = parser.parse_args()
+
+    cold = []
+    warm = []
+    for _ in range(args.processes):
+        with tempfile.TemporaryDirectory() as tmp:
+            sample = measure_once(args.reruns, tmp)
+            cold.append(sample["cold"])
+            warm.extend(sample["warm"])
+
+    report = {
+        "benchmark": "startup",
+        "python": sys.version.split()[0],
+        "cold_first_render_ms": {"median": statistics.median(cold) * 1000, "max": max(cold) * 1000},
+        "warm_rerun_ms": {
+            "median": statistics.median(warm) * 1000,
+            "p95": percentile(warm, 0.95) * 1000,
+            "max": max(warm) * 1000,
+        },
+        "processes": args.processes,
+        "reruns_per_process": args.reruns,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.max_warm_ms is not None and report["warm_rerun_ms"]["median"] > args.max_warm_ms:
+        print(f"FAIL: median warm rerun {report['warm_rerun_ms']['median']:.1f} ms > {args.max_warm_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
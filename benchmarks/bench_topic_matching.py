@@ -0,0 +1,94 @@
+# Lookup latency of topic_matching.TopicIndex at classroom-server scale
+#
+# Run from the repository root:
+#     python benchmarks/bench_topic_matching.py [--topics 100000] [--queries 2000] [--typos 1] [--max-p95-ms 1.0]
+#
+# Builds an index of synthetic multi-word topics (English, Hausa and Arabic vocabulary),
+# then times match() for exact, reworded, misspelt and unknown queries with typo matching
+# enabled (the slow path; the default is exact lookups only). Prints a JSON report and exits
+# non-zero if the p95 of the misspelt or unknown lookups exceeds the budget.
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from topic_matching import TopicIndex  # noqa: E402
+
+VOCABULARY = (
+    "photosynthesis cell energy water cycle algebra geometry history nigeria river plant animal "
+    "internet computer market trade farming weather climate soil electricity magnet force motion "
+    "kwayoyin halitta ruwa kasuwa noma yanayi kasa wutar lantarki tarihi lissafi "
+    "التمثيل الضوئي خلية طاقة ماء الجبر الهندسة تاريخ نهر نبات حيوان الإنترنت تجارة زراعة مناخ"
+).split()
+
+
+def synthetic_topic(rng):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(2, 4))) + f" {rng.randint(0, 99999)}"
+
+
+def misspell(topic, rng):
+    chars = list(topic)
+    i = rng.randrange(len(chars))
+    del chars[i]
+    return "".join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--topics", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--typos", type=int, default=1, help="Misspelt words allowed per topic")
+    parser.add_argument("--max-p95-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    topics = [synthetic_topic(rng) for _ in range(args.topics)]
+    index = TopicIndex()
+    start = time.perf_counter()
+    index.add_many((topic, topic) for topic in topics)
+    build_seconds = time.perf_counter() - start
+
+    kinds = {
+        "exact": lambda: rng.choice(topics),
+        "reworded": lambda: "what is the " + rng.choice(topics),
+        "misspelt": lambda: misspell(rng.choice(topics), rng),
+        "unknown": lambda: synthetic_topic(rng),
+    }
+    report = {
+        "benchmark": "topic_matching",
+        "topics": len(index),
+        "build_seconds": round(build_seconds, 3),
+        "lookup_ms": {},
+    }
+    report["matched"] = {}
+    for kind, make_query in kinds.items():
+        queries = [make_query() for _ in range(args.queries)]
+        timings = []
+        matched = 0
+        for query in queries:
+            start = time.perf_counter()
+            matched += index.match(query, args.typos) is not None
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        report["lookup_ms"][kind] = {
+            "p50": round(statistics.median(timings), 4),
+            "p95": round(timings[int(0.95 * (len(timings) - 1))], 4),
+        }
+        report["matched"][kind] = round(matched / len(queries), 3)
+
+    print(json.dumps(report, indent=2))
+    slow = [kind for kind in ("misspelt", "unknown") if report["lookup_ms"][kind]["p95"] > args.max_p95_ms]
+    for kind in slow:
+        print(f"FAIL: {kind} p95 lookup {report['lookup_ms'][kind]['p95']} ms > {args.max_p95_ms} ms", file=sys.stderr)
+    if slow:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
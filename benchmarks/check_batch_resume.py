@@ -0,0 +1,134 @@
+# Batch generation against the local stub: a killed run resumes without regenerating jobs,
+# and failed requests are retried
+#
+# Run from the repository root:
+#     python benchmarks/check_batch_resume.py [--jobs 40] [--kill-after 10]
+#
+# Starts mock_inference_server.py and runs `batch_generate.py` on a generated job list in
+# a subprocess, killing it (SIGKILL) once --kill-after results are on disk. The same
+# command is then run again. Requests still in flight at the kill are lost and sent again,
+# but every job with a result must be skipped: the second run may only send one request
+# per missing job. A second, smaller batch runs against a stub that fails a share of its
+# requests and must still finish every job. Prints a JSON report and exits non-zero if a
+# check fails.
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import batch_generate  # noqa: E402
+from batch_generate import load_jobs, run_batch  # noqa: E402
+from mock_inference_server import start_server  # noqa: E402
+
+
+def write_jobs(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"topic": f"Topic number {i}", "task": "explain_it", "language": "English", "level": "secondary"}) + "\n")
+
+
+def ok_job_ids(path):
+    ids = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                ids.append(record["job_id"])
+    return ids
+
+
+def run_cli(jobs_path, output_path, url, concurrency):
+    return subprocess.Popen(
+        [sys.executable, os.path.join(REPO_ROOT, "batch_generate.py"), jobs_path, "--output", output_path,
+         "--base-url", url, "--concurrency", str(concurrency), "--rate", "0", "--no-cache"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=dict(os.environ, HF_TOKEN="check"),
+    )
+
+
+def check_kill_and_resume(tmp, jobs, kill_after, concurrency):
+    server = start_server(latency=0.1, jitter=0.02)
+    server.handle_error = lambda request, client_address: None # Connections cut by the kill are expected
+    jobs_path = os.path.join(tmp, "jobs.jsonl")
+    output_path = os.path.join(tmp, "jobs.results.jsonl")
+    write_jobs(jobs_path, jobs)
+
+    process = run_cli(jobs_path, output_path, server.url, concurrency)
+    deadline = time.monotonic() + 120
+    while process.poll() is None and len(ok_job_ids(output_path) if os.path.exists(output_path) else ()) < kill_after:
+        if time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    process.kill()
+    process.wait()
+    done_before = len(set(ok_job_ids(output_path)))
+    requests_before = server.request_count
+
+    run_cli(jobs_path, output_path, server.url, concurrency).wait(timeout=120)
+    ids = ok_job_ids(output_path)
+    resumed_requests = server.request_count - requests_before
+    server.shutdown()
+    duplicates = sorted(job_id for job_id, n in Counter(ids).items() if n > 1)
+    return {
+        "jobs": jobs,
+        "done_before_kill": done_before,
+        "requests_before_kill": requests_before,
+        "requests_after_resume": resumed_requests,
+        "completed": len(set(ids)),
+        "duplicate_results": len(duplicates),
+        "passed": done_before < jobs and resumed_requests == jobs - done_before
+                  and len(set(ids)) == jobs and not duplicates,
+    }
+
+
+def check_retries(tmp, jobs, concurrency):
+    server = start_server(latency=0.02, jitter=0.0, error_rate=0.3)
+    jobs_path = os.path.join(tmp, "retry_jobs.jsonl")
+    output_path = os.path.join(tmp, "retry_jobs.results.jsonl")
+    write_jobs(jobs_path, jobs)
+    batch_generate.BACKOFF_BASE_SECONDS = 0.05 # Keep the check quick
+    job_list, _ = load_jobs(batch_generate.read_job_rows(jobs_path))
+    summary = asyncio.run(run_batch(
+        job_list, output_path, concurrency=concurrency, requests_per_second=0, max_retries=8, base_url=server.url,
+    ))
+    with open(output_path, encoding="utf-8") as f:
+        attempts = [json.loads(line)["attempts"] for line in f]
+    server.shutdown()
+    return {
+        "jobs": jobs,
+        "summary": summary,
+        "retried_jobs": sum(1 for a in attempts if a > 1),
+        "requests": server.request_count,
+        "passed": summary["ok"] == jobs and any(a > 1 for a in attempts) and server.request_count == sum(attempts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--kill-after", type=int, default=10, help="Results on disk before the first run is killed")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        report = {
+            "benchmark": "batch_resume",
+            "kill_and_resume": check_kill_and_resume(tmp, args.jobs, args.kill_after, args.concurrency),
+            "retries": check_retries(tmp, 20, args.concurrency),
+        }
+    print(json.dumps(report, indent=2))
+    return 0 if report["kill_and_resume"]["passed"] and report["retries"]["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+# End-to-end load test for class_gpt_app.py
+#
+# Run from the repository root:
+#     python benchmarks/load_test.py [--sessions 8] [--cycles 3] [--latency 0.3] [--output load.json]
+#     python benchmarks/load_test.py --shared-process [--sessions 8]
+#     python benchmarks/load_test.py --compare load.json --max-regression 0.25
+#
+# Drives N concurrent headless sessions (streamlit.testing AppTest) against
+# mock_inference_server.py running in a subprocess with a configurable latency
+# distribution. Each session cycle switches language, asks for an explanation, then
+# generates, answers, submits and resets a quiz. AppTest only runs one app at a time per
+# process (it swaps process-wide runtime and config state on every run), so each session
+# gets its own process; they share the on-disk response cache, topic, metrics and quiz bank databases
+# like several Streamlit workers on one machine. Those live in a temporary directory, so
+# every run starts cold.
+#
+# That measures per-session cost, not what one deployment serves: the job manager (and its
+# coalescing), in-process caches and the GIL are never shared. --shared-process runs every
+# session on threads of this one process instead, sharing all of it; AppTest can still only
+# run one script at a time per process, so reruns take turns on a lock (their wait is part
+# of the latency and reported separately) while generation jobs run in the background.
+# The report's "limitations" field says which caveat applies.
+#
+# The JSON report has per-action latency percentiles, throughput, CPU time per rerun
+# (exact per process; per thread in --shared-process, excluding background jobs), memory
+# per session (tracemalloc over extra sessions kept alive in one process) and peak RSS.
+# --compare exits non-zero when a p95 or the throughput regressed by more than
+# --max-regression against an earlier report.
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from translations import LANGUAGES, TASK_KEYS, TASK_LABELS, translations  # noqa: E402
+
+APP_PATH = os.path.join(REPO_ROOT, "class_gpt_app.py")
+TOPICS = (
+    "Photosynthesis", "The water cycle", "Fractions", "Electricity", "The solar system", "Nigerian history",
+    "The human heart", "Magnetism", "Climate change", "The internet", "Soil erosion", "Democracy",
+    "Simple machines", "Nutrition", "Volcanoes", "Ratios", "Trade", "Ecosystems", "Gravity", "Malaria",
+)
+GENERATING_ACTIONS = ("topic_request", "quiz_generate")
+LIMITATIONS = {
+    "process_per_session": (
+        "Each session runs in its own process: the job manager, in-process caches and the GIL are not "
+        "shared, so this is per-session cost, not the concurrency one app process can serve "
+        "(see --shared-process)."
+    ),
+    "shared_process": (
+        "All sessions share one app process (job manager, caches, quiz bank, GIL), but AppTest runs one "
+        "script at a time per process, so reruns are serialized (rerun_wait_ms) while generation jobs run "
+        "in the background; a Streamlit server runs reruns on parallel threads."
+    ),
+}
+
+
+def start_mock_server(args):
+    # The stub runs in its own process so its CPU time does not count against the app
+    command = [
+        sys.executable, "-u", os.path.join(REPO_ROOT, "mock_inference_server.py"), "--port", "0",
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--tail-rate", str(args.tail_rate), "--tail-latency", str(args.tail_latency),
+        "--token-interval", str(args.token_interval), "--error-rate", str(args.error_rate),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    url = process.stdout.readline().strip().rsplit(" ", 1)[-1]
+    return process, url
+
+
+def task_label(language, task_id):
+    return TASK_LABELS[language][TASK_KEYS.index(task_id)]
+
+
+def button(app, label):
+    return next(b for b in app.button if b.label == label)
+
+
+class Session:
+    def __init__(self, rng, record, lock=None):
+        from streamlit.testing.v1 import AppTest
+        self.app = AppTest.from_file(APP_PATH, default_timeout=120)
+        self.rng = rng
+        self.record = record
+        # Sessions sharing a process take turns (AppTest swaps process-wide state on each run)
+        self.lock = lock or contextlib.nullcontext()
+        self.cpu_clock = time.thread_time if lock else time.process_time
+        self.waits = [] # Seconds spent waiting for the lock, per rerun
+        self.language = "English"
+        self.loaded = False
+        self.aborted = 0 # Cycles cut short by an unexpected page (missing widget, failed rerun)
+
+    def step(self, action, interact=None):
+        # One rerun: apply widget changes, run the script, record wall and CPU time
+        if interact is not None:
+            interact(self.app)
+        started = time.perf_counter()
+        with self.lock:
+            self.waits.append(time.perf_counter() - started)
+            cpu_started = self.cpu_clock()
+            self.app.run()
+            cpu = self.cpu_clock() - cpu_started
+        self.record(action, time.perf_counter() - started, cpu, bool(self.app.exception))
+
+    def load(self):
+        self.step("initial_load")
+        self.loaded = True
+
+    def run(self, cycles):
+        for _ in range(cycles):
+            try:
+                self.cycle()
+            except Exception:
+                self.aborted += 1
+
+    def cycle(self):
+        if not self.loaded:
+            self.load()
+        self.language = self.rng.choice(LANGUAGES)
+        self.step("language_switch", lambda app: app.selectbox[0].set_value(self.language))
+        texts = translations[self.language]
+
+        self.step("task_switch", lambda app: app.selectbox[2].set_value(task_label(self.language, "explain_it")))
+        topic = self.rng.choice(TOPICS)
+        self.step("topic_request", lambda app: (
+            app.text_input[0].input(topic), button(app, texts["get_response_button"]).click()
+        ))
+
+        self.step("task_switch", lambda app: app.selectbox[2].set_value(task_label(self.language, "generate_quiz")))
+        topic = self.rng.choice(TOPICS)
+        self.step("quiz_generate", lambda app: (
+            app.number_input[0].set_value(3), app.text_input[0].input(topic),
+            button(app, texts["get_response_button"]).click(),
+        ))
+        if not self.app.radio:
+            return # Quiz failed to generate; counted through the exception/empty result
+        for radio in self.app.radio:
+            radio.set_value(self.rng.choice(radio.options).split(")")[0]) # Options show "A) text"; the value is the letter
+        self.step("quiz_submit", lambda app: button(app, texts["submit_quiz_button"]).click())
+        if any(b.label == "Generate a New Quiz" for b in self.app.button):
+            self.step("quiz_reset", lambda app: button(app, "Generate a New Quiz").click())
+
+
+def run_session(seed, cycles, start_at):
+    # Runs in a worker process; returns [(action, wall, cpu, failed)], the aborted cycles and
+    # when the timed cycles started and finished
+    records = []
+    session = Session(random.Random(seed), lambda *record: records.append(record))
+    session.load()
+    time.sleep(max(0.0, start_at - time.time())) # Every session starts its cycles together
+    started = time.time()
+    session.run(cycles)
+    return records, session.aborted, (started, time.time())
+
+
+def run_shared_sessions(seeds, cycles, start_at):
+    # Every session on its own thread of this process; returns what run_session returns, per session
+    lock = threading.Lock()
+
+    def one(seed):
+        records = []
+        session = Session(random.Random(seed), lambda *record: records.append(record), lock)
+        session.load()
+        time.sleep(max(0.0, start_at - time.time()))
+        started = time.time()
+        session.run(cycles)
+        return records, session.aborted, (started, time.time()), session.waits[1:] # Not the initial load
+
+    with ThreadPoolExecutor(max_workers=len(seeds)) as executor:
+        return list(executor.map(one, seeds))
+
+
+def percentiles(values):
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]  # noqa: E731
+    return {f"p{q}": round(pick(q) * 1000, 1) for q in (50, 95, 99)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, max_regression):
+    # Returns human-readable regressions; slower p95s and lower throughput count
+    problems = []
+    for action, stats in report["latency_ms"].items():
+        before = baseline.get("latency_ms", {}).get(action)
+        if before and before["p95"] and stats["p95"] > before["p95"] * (1 + max_regression):
+            problems.append(f"{action} p95 {before['p95']} -> {stats['p95']} ms")
+    before = baseline.get("throughput", {}).get("reruns_per_second")
+    after = report["throughput"]["reruns_per_second"]
+    if before and after < before * (1 - max_regression):
+        problems.append(f"throughput {before} -> {after} reruns/s")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent student sessions")
+    parser.add_argument("--cycles", type=int, default=3, help="Scenario cycles per session")
+    parser.add_argument("--memory-sessions", type=int, default=10, help="Extra sessions traced for memory per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.3, help="Mock API mean seconds to first token")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--tail-rate", type=float, default=0.02)
+    parser.add_argument("--tail-latency", type=float, default=3.0)
+    parser.add_argument("--token-interval", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--shared-process", action="store_true", help="Run every session in this one app process")
+    args = parser.parse_args()
+    mode = "shared_process" if args.shared_process else "process_per_session"
+
+    tmp = tempfile.TemporaryDirectory()
+    server, url = start_mock_server(args)
+    os.environ.update({
+        "HF_BASE_URL": url,
+        "HF_TOKEN": os.environ.get("HF_TOKEN", "load-test"),
+        "CLASSGPT_ROUTES": "",
+        "CLASSGPT_CACHE_DB": os.path.join(tmp.name, "cache.sqlite3"),
+        "CLASSGPT_TOPIC_DB": os.path.join(tmp.name, "topics.sqlite3"),
+        "CLASSGPT_METRICS_DB": os.path.join(tmp.name, "metrics.sqlite3"),
+        "CLASSGPT_CONTENT_INDEX": os.path.join(tmp.name, "no_content_index.sqlite3"),
+        "CLASSGPT_QUIZ_BANK_DB": os.path.join(tmp.name, "quiz_bank.sqlite3"),
+    })
+
+    samples = defaultdict(list)
+    cpu_samples = defaultdict(list)
+    errors = defaultdict(int)
+    try:
+        rng = random.Random(args.seed)
+        seeds = [rng.random() for _ in range(args.sessions)]
+        # Sessions load first (imports, first render), then all start cycling at once
+        start_at = time.time() + 5 + 0.5 * args.sessions
+        waits = []
+        if args.shared_process:
+            results = []
+            for records, session_aborted, span, session_waits in run_shared_sessions(seeds, args.cycles, start_at):
+                results.append((records, session_aborted, span))
+                waits.extend(session_waits)
+        else:
+            with ProcessPoolExecutor(max_workers=args.sessions) as executor:
+                futures = [executor.submit(run_session, seed, args.cycles, start_at) for seed in seeds]
+                results = [future.result() for future in futures]
+        elapsed = max(span[1] for _, _, span in results) - min(span[0] for _, _, span in results)
+        aborted = 0
+        for records, session_aborted, _ in results:
+            aborted += session_aborted
+            for action, wall, cpu, failed in records:
+                samples[action].append(wall)
+                cpu_samples[action].append(cpu)
+                errors[action] += failed
+
+        # Memory: sessions kept alive after one cycle each, traced from a baseline taken
+        # after a warm-up session has loaded the modules and shared resources
+        Session(random.Random(args.seed), lambda *record: None).run(1)
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+        traced = [Session(random.Random(i), lambda *record: None) for i in range(args.memory_sessions)]
+        for session in traced:
+            session.run(1)
+        grown = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+        tracemalloc.stop()
+    finally:
+        server.terminate()
+        server.wait()
+        tmp.cleanup()
+
+    # Initial loads happen before the timed phase
+    reruns = sum(len(values) for action, values in samples.items() if action != "initial_load")
+    answers = sum(len(samples[action]) for action in GENERATING_ACTIONS)
+    report = {
+        "benchmark": "load_test",
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "mode": mode,
+        "limitations": LIMITATIONS[mode],
+        "config": {
+            "sessions": args.sessions, "cycles": args.cycles, "latency": args.latency, "jitter": args.jitter,
+            "tail_rate": args.tail_rate, "tail_latency": args.tail_latency, "token_interval": args.token_interval,
+            "error_rate": args.error_rate, "seed": args.seed,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput": {
+            "reruns_per_second": round(reruns / elapsed, 2),
+            "answers_per_second": round(answers / elapsed, 2),
+            "cycles_per_second": round(args.sessions * args.cycles / elapsed, 3),
+        },
+        "latency_ms": {action: percentiles(values) for action, values in sorted(samples.items())},
+        "reruns": {action: len(values) for action, values in sorted(samples.items())},
+        "errors": dict(sorted(errors.items())),
+        "aborted_cycles": aborted,
+        "rerun_wait_ms": percentiles(waits) if waits else None,
+        "cpu_ms_per_rerun": {action: round(1000 * sum(values) / len(values), 2) for action, values in sorted(cpu_samples.items())},
+        "memory": {
+            "per_session_kb": round(grown / args.memory_sessions / 1024, 1),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1), # The tracing process
+        },
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(report, json.load(f), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION: {problem}", file=sys.stderr)
+        if problems:
+            return 1
+    return 1 if sum(errors.values()) or report["aborted_cycles"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,123 +1,118 @@
 import streamlit as st
 import os
-from huggingface_hub import InferenceClient
 import json
-import re # For parsing quiz output
+import time
+import uuid
+from llm_client import HF_API_KEY, HF_BASE_URL, HF_LLAMA3_MODEL, configure_http_pool
+from content_index import ContentIndex
+from content_store import ContentStore
+from generation import run_generation
+from job_manager import JobManager
+from metrics import MetricsStore
+from prompts import request_cache_key
+from provider_router import LOCAL_ROUTE, Router, default_routes
+from quiz_bank import QuizBank
+from quiz_parser import format_quiz, parse_quiz # For parsing quiz output
+from response_cache import ResponseCache
+from token_budget import TokenBudget
+from topic_matching import TopicMatcher
+from translations import LANGUAGES, LEVEL_LABELS, TASK_ID_BY_LABEL, TASK_LABELS, translations
 
 # --- Configuration for Hugging Face LLaMA 3 Inference API ---
-HF_API_KEY = os.getenv("HF_TOKEN")
-HF_LLAMA3_MODEL = os.getenv("HF_LLAMA3_MODEL", "meta-llama/Llama-3.1-8B-Instruct") 
+# HF_TOKEN, HF_LLAMA3_MODEL, HF_PROVIDER and HF_BASE_URL are read in llm_client.py
+
+# Stream tokens to the page as they are generated (set CLASSGPT_STREAMING=0 to disable)
+STREAM_RESPONSES = os.getenv("CLASSGPT_STREAMING", "1") != "0"
 
 # The Hugging Face Inference API endpoint for chat completions
 LLAMA3_API_ENDPOINT = f"https://api-inference.huggingface.co/models/{HF_LLAMA3_MODEL}"
 
-# Validate that the API key is set
-if not HF_API_KEY:
+# Validate that the API key is set (a local HF_BASE_URL server or CPU model does not need one)
+if not HF_API_KEY and not HF_BASE_URL and all(provider != LOCAL_ROUTE for _, provider, _, _ in default_routes()):
     st.error("Hugging Face API Key (HF_TOKEN) not found. Please set it as an environment variable.")
     st.info("Example: `export HF_TOKEN=\"hf_YOUR_TOKEN_HERE\"` in your terminal before running `streamlit run main.py`")
     st.stop() # Stop the Streamlit app if the key is missing
 
+# One client per process with a keep-alive connection pool (CLASSGPT_HTTP_POOL_SIZE),
+# instead of a new client on every rerun of every session. It routes over the providers in
+# CLASSGPT_ROUTES with hedged requests and circuit breakers (see provider_router.py).
+@st.cache_resource
+def get_hf_client():
+    configure_http_pool()
+    return Router.from_config()
+
 try:
-    hf_client = InferenceClient(
-        provider="sambanova", # Confirm this provider is correct for your model access
-        api_key=HF_API_KEY, # Use HF_API_KEY, not HF_API_TOKEN
-    )
+    hf_client = get_hf_client()
 except Exception as e:
     st.error(f"Failed to initialize Hugging Face Inference Client. Please check your HF_TOKEN and provider settings: {e}")
     st.stop()
 
 st.set_page_config(page_title="ClassGPT – AI Study Assistant", layout="centered")
 
+# --- Response cache shared by every session in this process (and via SQLite, across processes) ---
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+response_cache = get_response_cache()
+
+# --- Pre-generated curriculum content (built offline by pregenerate.py), if present ---
+@st.cache_resource
+def get_content_index():
+    return ContentIndex.open_readonly()
+
+content_index = get_content_index()
+
+# --- Near-duplicate topics ("what is photosynthesis" -> "Photosynthesis") resolve onto answered ones ---
+@st.cache_resource
+def get_topic_matcher():
+    matcher = TopicMatcher()
+    if content_index is not None:
+        matcher.seed(content_index.catalog())
+    return matcher
+
+topic_matcher = get_topic_matcher()
+
+# --- Background generation jobs, shared by every session in this process ---
+JOB_POLL_SECONDS = 0.25 # How often a waiting page redraws the live preview
+
+@st.cache_resource
+def get_job_manager():
+    return JobManager()
+
+job_manager = get_job_manager()
+
+# --- Latency, token and cache-hit metrics for every answer (see metrics.py, pages/admin_metrics.py) ---
+@st.cache_resource
+def get_metrics_store():
+    return MetricsStore()
+
+metrics_store = get_metrics_store()
+
+# --- max_tokens learned from the completions this process has seen (see token_budget.py) ---
+@st.cache_resource
+def get_token_budget():
+    return TokenBudget()
+
+token_budget = get_token_budget()
+
+# --- Parsed quizzes, shared by every session that takes them (see content_store.py) ---
+# st.session_state only holds the quiz id and the chosen letters; idle sessions are evicted.
+@st.cache_resource
+def get_content_store():
+    return ContentStore()
+
+content_store = get_content_store()
+
+# --- Every quiz question shown, with per-student spaced repetition (see quiz_bank.py) ---
+@st.cache_resource
+def get_quiz_bank():
+    return QuizBank()
+
+quiz_bank = get_quiz_bank()
+
 # --- Internationalization (i18n) for UI Labels ---
-translations = {
-    "English": {
-        "app_title": "📚 ClassGPT – Your Smart Study Assistant",
-        "tagline": "Explain topics, generate quizzes, and get summaries in English, Hausa, or Arabic!",
-        "settings_header": "⚙️ Settings",
-        "output_language_label": "Choose Output Language",
-        "select_task_label": "Select Task",
-        "level_label": "Choose Your Educational Level", # NEW
-        "level_primary": "Primary School (Ages 6-12)", # NEW
-        "level_secondary": "Secondary School (Ages 13-18)", # NEW
-        "level_tertiary": "Tertiary/University (Ages 18+)", # NEW
-        "explain_it": "Explain It",
-        "generate_quiz": "Generate Quiz",
-        "summarize_topic": "Summarize Topic",
-        "try_topics_tip": "💡 Try topics like *Photosynthesis*, *History*, *The Internet*, or *Algebra*.",
-        "enter_topic_prompt": "✍️ Enter a topic you’d like to study:",
-        "num_questions_label": "Number of Quiz Questions",
-        "get_response_button": "Get Response",
-        "submit_quiz_button": "Submit Quiz",
-        "processing_message": "⏳ Processing... Please wait...",
-        "success_message": "✅ Here's your result:",
-        "quiz_score": "📊 Your Quiz Score:",
-        "quiz_correct_answer": "Correct Answer:",
-        "your_answer": "Your Answer:",
-        "error_api_issue": "An error occurred with the Hugging Face API. Please check your API token, model access, or network.",
-        "error_parse_issue": "An unexpected response format was received from the API. Quiz parsing failed.",
-        "error_general": "A general error occurred.",
-        "start_info": "Enter a topic and click 'Get Response' to begin.",
-        "quote": "> 💡 *“Education is the passport to the future, for tomorrow belongs to those who prepare for it today.”*"
-    },
-    "Hausa": {
-        "app_title": "📚 ClassGPT – Mataimakin Nazari Mai Kaifin Hankali",
-        "tagline": "Fassara batutuwa, ƙirƙirar tambayoyi, da taƙaita abubuwa ko bayabai a Turanci, Hausa, ko Larabci!", #Edited
-        "settings_header": "⚙️ Saituna",
-        "output_language_label": "Zaɓi Harshen Fita",
-        "select_task_label": "Zaɓi Aiki",
-        "level_label": "Zaɓi Matakin Karatunka", # NEW
-        "level_primary": "Makarantar Firamare (Shekaru 6-12)", # NEW
-        "level_secondary": "Makarantar Sakandare (Shekaru 13-18)", # NEW
-        "level_tertiary": "Jami'a/Manyan Makarantu (Shekaru 18+)", # NEW
-        "explain_it": "Fassara",
-        "generate_quiz": "Ƙirƙiri Tambaya", #Edited
-        "summarize_topic": "Taƙaita Bayani", 
-        "try_topics_tip": "💡 Gwada batutuwa kamar *Photosynthesis*, *History*, *Intanet*, ko *Algebra*.",
-        "enter_topic_prompt": "✍️ Shigar da batu da kake son karantawa:",
-        "num_questions_label": "Adadin Tambayoyin Da Akeson Jarrabawa", #Edited
-        "get_response_button": "Samo Amsa",
-        "submit_quiz_button": "Aika Tambayoyin Da Akeson Jarrabawa",
-        "processing_message": "⏳ Ana kan aiwatarwa da umarnin... Don Allah a jira...", #Edited
-        "success_message": "✅ Ga sakamakon ka:",
-        "quiz_score": "📊 Sakamakon Jarrabawar ka:",
-        "quiz_correct_answer": "Amsa Daidai:",
-        "your_answer": "Amsar ka:",
-        "error_api_issue": "Akwai matsala da Hugging Face API. Don Allah ka/ki bincika makullin API ɗinka, damar samun samfurin, ko hanyar sadarwa.",
-        "error_parse_issue": "An sami tsarin amsa da ba a tsammace ce taba daga API. Tsarin jarrabawar ya gagara. Don Allah Ayi Hakuri", #Edited
-        "error_general": "Akwai matsala gabaɗaya.",
-        "start_info": "Shigar da batu sannan ka danna 'Samo Amsa' don farawa.",
-        "quote": "> 💡 *“Ilimi shine fasfo zuwa gaba, domin gobe ta waɗanda suka shirya mata a yau.”*"
-    },
-    "Arabic": {
-        "app_title": "📚 كلاس جي بي تي – مساعدك الذكي للدراسة",
-        "tagline": "اشرح المواضيع، أنشئ اختبارات، واحصل على ملخصات بالإنجليزية أو الهوسا أو العربية!",
-        "settings_header": "⚙️ الإعدادات",
-        "output_language_label": "اختر لغة الإخراج",
-        "select_task_label": "اختر المهمة",
-        "level_label": "اختر مستواك التعليمي", # NEW
-        "level_primary": "المرحلة الابتدائية (6-12 سنة)", # NEW
-        "level_secondary": "المرحلة الثانوية (13-18 سنة)", # NEW
-        "level_tertiary": "التعليم العالي/الجامعة (18+ سنة)", # NEW
-        "explain_it": "اشرح",
-        "generate_quiz": "إنشاء اختبار",
-        "summarize_topic": "لخص الموضوع",
-        "try_topics_tip": "💡 جرب مواضيع مثل *التمثيل الضوئي*, *الإنترنت*, أو *الجبر*.",
-        "enter_topic_prompt": "✍️ أدخل موضوعًا ترغب في دراسته:",
-        "num_questions_label": "عدد أسئلة الاختبار",
-        "get_response_button": "احصل على الرد",
-        "submit_quiz_button": "إرسال الاختبار",
-        "processing_message": "⏳ جاري المعالجة... يرجى الانتظار...",
-        "success_message": "✅ إليك نتيجتك:",
-        "quiz_score": "📊 نتيجتك في الاختبار:",
-        "quiz_correct_answer": "الإجابة الصحيحة:",
-        "your_answer": "إجابتك:",
-        "error_api_issue": "حدث خطأ في واجهة برمجة تطبيقات Hugging Face. يرجى التحقق من مفتاح API الخاص بك، أو الوصول إلى النموذج، أو الشبكة.",
-        "error_parse_issue": "تم استلام تنسيق استجابة غير متوقع من واجهة برمجة التطبيقات. فشل تحليل الاختبار.",
-        "error_general": "حدث خطأ عام.",
-        "start_info": "أدخل موضوعًا وانقر على 'احصل على الرد' للبدء.",
-        "quote": "> 💡 *“التعليم هو جواز السفر إلى المستقبل، فالغد ملك لأولئك الذين يستعدون له اليوم.”*"
-    }
-}
+# The translation dictionaries live in translations.py, built once per process and frozen
 
 # Ensure session states are initialized
 if "selected_language" not in st.session_state:
@@ -126,13 +121,29 @@ if "selected_language" not in st.session_state:
 if "selected_level_index" not in st.session_state:
     st.session_state.selected_level_index = 1 # Default to Secondary (index 1)
 
-if "quiz_data" not in st.session_state:
-    st.session_state.quiz_data = None
+if "session_key" not in st.session_state:
+    st.session_state.session_key = uuid.uuid4().hex # Identifies this tab in the content store
+if "quiz_id" not in st.session_state:
+    st.session_state.quiz_id = None # Content store id of the current quiz
 if "quiz_answers" not in st.session_state:
-    st.session_state.quiz_answers = {}
+    st.session_state.quiz_answers = () # Chosen option letter (or None) per question
+if "learner_id" not in st.session_state:
+    # Name or class code the quiz bank keys review history by, so it follows a student across
+    # visits; a ?learner=... link fills it in. Without one, reviews only last for this tab.
+    st.session_state.learner_id = st.query_params.get("learner", "")
+if "quiz_bank_key" not in st.session_state:
+    st.session_state.quiz_bank_key = None # (topic, language, level_index) the answers are recorded under
 if "quiz_submitted" not in st.session_state:
     st.session_state.quiz_submitted = False
-
+if "pending_job" not in st.session_state:
+    st.session_state.pending_job = None # {"job_id", "is_quiz", ...} of the generation this session waits for
+
+# Keep this session (and its quiz) alive in the content store; a session that sat idle
+# for too long was evicted and starts over
+if not content_store.check_in(st.session_state.session_key, st.session_state.quiz_id):
+    st.session_state.quiz_id = None
+    st.session_state.quiz_answers = ()
+    st.session_state.quiz_submitted = False
 
 # Get the current translations based on user's selection
 current_lang_texts = translations.get(st.session_state.selected_language, translations["English"])
@@ -148,23 +159,20 @@ with st.sidebar:
     # Language selection
     new_lang_selection = st.selectbox(
         current_lang_texts["output_language_label"],
-        ["English", "Hausa", "Arabic"],
-        index=["English", "Hausa", "Arabic"].index(st.session_state.selected_language)
+        LANGUAGES,
+        index=LANGUAGES.index(st.session_state.selected_language)
     )
     if new_lang_selection != st.session_state.selected_language:
         st.session_state.selected_language = new_lang_selection
         # Clear quiz data and reset level index on language change to prevent mismatch errors
-        st.session_state.quiz_data = None 
+        st.session_state.quiz_id = None 
         st.session_state.quiz_submitted = False
         st.session_state.selected_level_index = 1 # Reset level to default (Secondary) on lang change
+        st.session_state.pending_job = None # Its answer is in the old language; the job still finishes into the cache
         st.rerun() 
 
     # Level selection - uses the NEW translation keys
-    educational_levels = [
-        current_lang_texts["level_primary"],
-        current_lang_texts["level_secondary"],
-        current_lang_texts["level_tertiary"]
-    ]
+    educational_levels = LEVEL_LABELS[st.session_state.selected_language]
     new_level_selection_text = st.selectbox(
         current_lang_texts["level_label"],
         options=educational_levels,
@@ -175,13 +183,13 @@ with st.sidebar:
     new_level_index = educational_levels.index(new_level_selection_text)
     if new_level_index != st.session_state.selected_level_index:
         st.session_state.selected_level_index = new_level_index # Store the INDEX
-        st.session_state.quiz_data = None # Clear quiz if level changes
+        st.session_state.quiz_id = None # Clear quiz if level changes
         st.session_state.quiz_submitted = False
+        st.session_state.pending_job = None
         st.rerun() # Trigger rerun to update prompts with new level
 
 
-    task = st.selectbox(current_lang_texts["select_task_label"],
-                        [current_lang_texts["explain_it"], current_lang_texts["generate_quiz"], current_lang_texts["summarize_topic"]])
+    task = st.selectbox(current_lang_texts["select_task_label"], TASK_LABELS[st.session_state.selected_language])
     st.markdown(current_lang_texts["try_topics_tip"])
 
     num_questions = 1 # Default
@@ -195,193 +203,253 @@ with st.sidebar:
         )
         # Clear quiz if number of questions changes, only if not just initialized
         if st.session_state.get('last_num_questions') is not None and st.session_state.last_num_questions != num_questions:
-             st.session_state.quiz_data = None 
+             st.session_state.quiz_id = None 
              st.session_state.quiz_submitted = False
         st.session_state.last_num_questions = num_questions
 
+    parallel_quiz = False
+    if task == current_lang_texts["generate_quiz"] and num_questions > 1:
+        # One small request per question, sent at the same time
+        parallel_quiz = st.checkbox(current_lang_texts["parallel_quiz_label"], value=False)
+
+    # Escape hatch for when a saved answer is poor or outdated
+    force_regenerate = st.checkbox(current_lang_texts["force_regenerate_label"], value=False)
+    st.text_input(current_lang_texts["learner_label"], key="learner_id")
+    learner = " ".join(st.session_state.learner_id.split()).casefold()
+    if learner and st.query_params.get("learner") != learner:
+        st.query_params["learner"] = learner # The page URL can be bookmarked to come back as the same learner
+    learner = learner or st.session_state.session_key
+    cache_stats = response_cache.stats()
+    st.caption(current_lang_texts["cache_stats"].format(hits=cache_stats["hits"], misses=cache_stats["misses"]))
+
 
 # Main input section
 topic = st.text_input(current_lang_texts["enter_topic_prompt"])
 
 # --- Helper function to parse quiz output ---
 def parse_quiz_output(raw_text, lang_texts):
-    questions = []
-    # This regex attempts to find numbered questions, options (A-D), and the correct answer.
-    # It's robust but may need tweaking based on actual LLM output patterns.
-    # It looks for:
-    # 1. Start of a line with a number and a dot (e.g., "1. Question text")
-    # 2. Captures the question text.
-    # 3. Captures options labeled A), B), C), D) and their text.
-    # 4. Captures the "Correct Answer: [Letter]" line.
-    pattern = re.compile(
-        r'^\s*(\d+)\.\s*(.*?)\n' # Question number and text
-        r'(?:\s*([A-D])\)\s*(.*?)\n){4}' # Four options A-D
-        r'(?:Correct Answer|' + re.escape(lang_texts["quiz_correct_answer"]) + r'):\s*([A-D])', # Correct Answer line
-        re.MULTILINE | re.DOTALL | re.IGNORECASE
-    )
+    # The line-oriented parser in quiz_parser.py knows the labels for every UI language;
+    # pass the current one too in case the translation has been edited.
+    return parse_quiz(raw_text, extra_labels=(lang_texts["quiz_correct_answer"],))
 
-    for match in pattern.finditer(raw_text):
-        q_num = int(match.group(1))
-        question_text = match.group(2).strip()
-        
-        options = {
-            match.group(3).upper(): match.group(4).strip(), # A)
-            match.group(5).upper(): match.group(6).strip(), # B)
-            match.group(7).upper(): match.group(8).strip(), # C)
-            match.group(9).upper(): match.group(10).strip() # D)
-        }
-        correct_answer = match.group(11).upper().strip()
-
-        if question_text and options and correct_answer:
-            questions.append({
-                "question": question_text,
-                "options": options,
-                "correct_answer": correct_answer
-            })
-    return questions
+
+# --- Helpers for showing generation progress and results ---
+def render_quiz_preview(questions, placeholder):
+    with placeholder.container():
+        for i, q_data in enumerate(questions):
+            st.markdown(f"**{i+1}. {q_data.question}**")
+            for letter, text in zip(q_data.letters, q_data.texts):
+                st.markdown(f"{letter}) {text}")
+
+
+def show_quiz(questions, bank_request):
+    # Shared with every session that gets the same questions (see content_store.py)
+    st.session_state.quiz_id = content_store.put(st.session_state.session_key, format_quiz(questions), tuple(questions))
+    st.session_state.quiz_bank_key = bank_request[:3]
+    st.session_state.quiz_answers = (None,) * len(questions)
+    st.session_state.quiz_submitted = False
+    st.success(current_lang_texts["success_message"])
+    st.write("Quiz Generated! Please answer the questions below.")
+
+
+def show_result(output, is_quiz, bank_request=None, regenerated=False):
+    # bank_request: (topic, language, level_index, num_questions) for quizzes
+    if is_quiz:
+        parsed_quiz, parse_issues = parse_quiz_output(output, current_lang_texts)
+        if parsed_quiz:
+            quiz_bank.add(*bank_request[:3], parsed_quiz)
+            if not regenerated:
+                # Questions this student got wrong come back first, topped up with unseen ones
+                parsed_quiz = quiz_bank.assemble(learner, *bank_request) or parsed_quiz
+            show_quiz(parsed_quiz, bank_request)
+        else:
+            st.error(f"{current_lang_texts['error_parse_issue']} The AI did not generate a parsable quiz. Please try again or refine the topic.")
+            for issue in parse_issues:
+                st.caption(f"Question {issue.number}: {issue.reason}")
+            st.code(output, language='markdown') # Show raw output for debugging
+    else:
+        st.success(current_lang_texts["success_message"])
+        st.write(output) # Sent to the browser once; it is not kept in the session
+
+    st.markdown("---")
+    st.markdown(current_lang_texts["quote"])
+
+
+def show_error(e):
+    st.error(f"{current_lang_texts['error_api_issue']} (Details: {e})")
+    st.text(f"Error type: {type(e).__name__}")
+    st.text(f"Error message: {str(e)}")
 
 
 # --- Main App Logic ---
 if st.button(current_lang_texts["get_response_button"]) and topic:
-    st.markdown(current_lang_texts["processing_message"])
-    st.session_state.quiz_data = None # Clear previous quiz
-    st.session_state.quiz_answers = {}
+    st.session_state.quiz_id = None # Clear previous quiz
+    st.session_state.quiz_answers = ()
     st.session_state.quiz_submitted = False
-
-    # Retrieve the selected educational level text from the current language's list
-    # Use the stored index to get the correct text for the prompt
-    educational_levels_current_lang = [
-        current_lang_texts["level_primary"],
-        current_lang_texts["level_secondary"],
-        current_lang_texts["level_tertiary"]
-    ]
-    selected_education_level_text = educational_levels_current_lang[st.session_state.selected_level_index]
-
-
-    # Prepare the prompt
-    # System prompt is now dependent on selected_education_level_text
-    system_prompt_template = f"""You are ClassGPT, an expert educational tutor and assistant.
-Your primary goal is to provide clear, concise, and accurate educational content for students.
-You are fluent in English, Hausa, and Arabic.
-Strictly adhere to the requested output language. **Do NOT include any English words or phrases in your output unless they are proper nouns (e.g., 'Google', 'Nigeria') or universally accepted scientific terms without a common translation.**
-Explain concepts in simple terms suitable for learners at a {selected_education_level_text} level.
-"""
-    prompt_map = {
-        current_lang_texts["explain_it"]: f"""Explain the topic '{topic}' in simple and easy-to-understand terms.
-Ensure the explanation is appropriate for a {selected_education_level_text} student level.
-Use clear and concise sentences.
-Provide concrete examples relevant to everyday life in Nigeria if applicable.
-The entire explanation MUST be in {st.session_state.selected_language}.
-""",
-        current_lang_texts["generate_quiz"]: f"""Generate exactly {num_questions} multiple-choice questions about the topic '{topic}'.
-Ensure questions are appropriate for a {selected_education_level_text} student level.
-Each question and all its options MUST be in {st.session_state.selected_language}.
-For each question, provide 4 options, labeled A, B, C, D.
-After the options for each question, explicitly state the correct answer on a new line in the format: "Correct Answer: [Option Letter]".
-DO NOT provide explanations for the answers or any additional text apart from the questions, options, and correct answers.
-
-Example Format for a single question:
-1. What is the capital of France?
-A) Berlin
-B) Paris
-B) Paris
-C) Rome
-D) Madrid
-Correct Answer: B
-
-2. What is the largest planet in our solar system?
-A) Mars
-B) Earth
-C) Jupiter
-D) Venus
-Correct Answer: C
-""",
-        current_lang_texts["summarize_topic"]: f"""Provide a concise summary of the topic '{topic}'.
-Focus only on the most critical information relevant to a {selected_education_level_text} student.
-The summary MUST be in {st.session_state.selected_language}.
-Keep the summary to a maximum of 150 words or 3 paragraphs, whichever is shorter.
-"""
+    st.session_state.pending_job = None
+
+    # Reuse the spelling of a previously answered topic, so rewordings hit the caches
+    resolved_topic = topic_matcher.resolve(topic, st.session_state.selected_language)
+    if resolved_topic.casefold() != topic.strip().casefold():
+        st.caption(current_lang_texts["resolved_topic"].format(topic=resolved_topic))
+    topic = resolved_topic
+
+    # The prompts and the cache key use the language-independent task id, not the translated task label
+    generation_request = {
+        "task_id": TASK_ID_BY_LABEL[st.session_state.selected_language][task],
+        "topic": topic,
+        "language": st.session_state.selected_language,
+        "level_index": st.session_state.selected_level_index, # The prompt describes the level from this index
+        "num_questions": num_questions,
+        "parallel_quiz": parallel_quiz,
+        "stream": STREAM_RESPONSES,
     }
-    final_prompt = prompt_map[task]
+    generation_request["cache_key"] = request_cache_key(
+        HF_LLAMA3_MODEL,
+        generation_request["task_id"],
+        topic,
+        generation_request["language"],
+        generation_request["level_index"],
+        num_questions=num_questions,
+    )
+    is_quiz = generation_request["task_id"] == "generate_quiz"
+    bank_request = (topic, generation_request["language"], generation_request["level_index"], num_questions)
 
-    # --- Hugging Face LLaMA 3 API Request using InferenceClient ---
     try:
-        completion = hf_client.chat.completions.create(
-            model=HF_LLAMA3_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt_template},
-                {"role": "user", "content": final_prompt}
-            ],
-            max_tokens=1500 if task == current_lang_texts["generate_quiz"] else 700, # More tokens for multiple questions
-            temperature=0.7,
-            top_p=0.9,
-            # do_sample=True # Removed as per previous TypeError
-        )
-        
-        output = completion.choices[0].message.content
-        
-        if task == current_lang_texts["generate_quiz"]:
-            parsed_quiz = parse_quiz_output(output, current_lang_texts)
-            if parsed_quiz:
-                st.session_state.quiz_data = parsed_quiz
-                st.session_state.quiz_answers = {f"q{i}": None for i in range(len(parsed_quiz))}
-                st.session_state.quiz_submitted = False
-                st.success(current_lang_texts["success_message"])
-                st.write("Quiz Generated! Please answer the questions below.")
-            else:
-                st.error(f"{current_lang_texts['error_parse_issue']} The AI did not generate a parsable quiz. Please try again or refine the topic.")
-                st.code(output, language='markdown') # Show raw output for debugging
+        output = None
+        source = None
+        banked_quiz = None
+        bank_exhausted = False
+        lookup_started = time.perf_counter()
+        if is_quiz and not force_regenerate:
+            # A quiz assembled from the question bank is a local indexed query, no API call
+            banked_quiz = quiz_bank.assemble(learner, *bank_request)
+            bank_exhausted = banked_quiz is None and quiz_bank.count(*bank_request[:3]) > 0
+        if banked_quiz is None and not force_regenerate:
+            # Pre-generated curriculum content first (works offline), then saved answers. Even with
+            # the bank exhausted for this learner these beat an API call: offline there is no other
+            # answer, and online a repeat of questions seen before is better than an avoidable call.
+            if content_index is not None:
+                output = content_index.lookup(
+                    generation_request["task_id"],
+                    topic,
+                    generation_request["language"],
+                    generation_request["level_index"],
+                    num_questions,
+                )
+                source = "content_index"
+                if is_quiz and output is not None:
+                    # Every pre-generated question goes into the bank, not just the num_questions
+                    # served now, so later quizzes on the topic can assemble the unseen ones
+                    full_quiz = content_index.full_quiz(topic, *bank_request[1:3])
+                    quiz_bank.add(*bank_request[:3], parse_quiz_output(full_quiz or "", current_lang_texts)[0])
+            if output is None:
+                output = response_cache.get(generation_request["cache_key"])
+                source = "response_cache"
+        if banked_quiz is not None:
+            metrics_store.record(
+                generation_request["task_id"],
+                generation_request["language"],
+                generation_request["level_index"],
+                "quiz_bank",
+                latency=time.perf_counter() - lookup_started,
+            )
+            show_quiz(banked_quiz, bank_request)
+            st.markdown("---")
+            st.markdown(current_lang_texts["quote"])
+        elif output is not None:
+            metrics_store.record(
+                generation_request["task_id"],
+                generation_request["language"],
+                generation_request["level_index"],
+                source,
+                latency=time.perf_counter() - lookup_started,
+            )
+            show_result(output, is_quiz, bank_request)
         else:
-            st.success(current_lang_texts["success_message"])
-            st.write(output)
-            st.code(output, language='markdown') 
-
-        st.markdown("---")
-        st.markdown(current_lang_texts["quote"])
-
+            # --- Hugging Face LLaMA 3 API Request, run as a background job (see generation.py) ---
+            # Identical requests from other sessions attach to the same in-flight job.
+            job = job_manager.submit(
+                generation_request["cache_key"],
+                lambda job, request=generation_request: run_generation(
+                    job, hf_client, HF_LLAMA3_MODEL, request,
+                    cache=response_cache, topics=topic_matcher, metrics=metrics_store, budget=token_budget,
+                ),
+                # A finished job for this key only holds questions already in the bank
+                coalesce=not (force_regenerate or bank_exhausted),
+            )
+            st.session_state.pending_job = {
+                "job_id": job.job_id, "is_quiz": is_quiz, "bank_request": bank_request, "regenerated": force_regenerate,
+            }
     except Exception as e:
-        st.error(f"{current_lang_texts['error_api_issue']} (Details: {e})")
-        st.text(f"Error type: {type(e).__name__}")
-        st.text(f"Error message: {str(e)}")
+        show_error(e)
 
-else:
+elif not st.session_state.pending_job:
     st.info(current_lang_texts["start_info"])
 
 
+# --- Attach to the running job and show its progress ---
+# This runs on every rerun, so a job started before a rerun keeps streaming into the page.
+if st.session_state.pending_job:
+    pending = st.session_state.pending_job
+    job = job_manager.get(pending["job_id"])
+    if job is None:
+        st.session_state.pending_job = None # Expired while the tab was idle; the answer is in the cache
+    else:
+        st.markdown(current_lang_texts["processing_message"])
+        live_output = st.empty()
+        while not job.wait(timeout=JOB_POLL_SECONDS):
+            if pending["is_quiz"]:
+                render_quiz_preview(list(job.questions), live_output) # Each question as soon as it is complete
+            elif job.text:
+                live_output.markdown(job.text)
+        live_output.empty() # The final result (or the quiz form) replaces the preview
+        st.session_state.pending_job = None
+        if job.status == "done":
+            show_result(job.result, pending["is_quiz"], pending["bank_request"], pending["regenerated"])
+        else:
+            show_error(job.error)
+
+
 # --- Display Quiz and Collect Answers ---
-if st.session_state.quiz_data and not st.session_state.quiz_submitted:
+quiz_data = content_store.get(st.session_state.quiz_id) # Set above, or just generated
+if quiz_data and not st.session_state.quiz_submitted:
     st.markdown("### Take the Quiz!")
     with st.form("quiz_form"):
-        user_answers = {}
-        for i, q_data in enumerate(st.session_state.quiz_data):
-            st.markdown(f"**{i+1}. {q_data['question']}**")
-            options_list = [f"{k}) {q_data['options'][k]}" for k in sorted(q_data['options'].keys())]
-            user_answers[f"q{i}"] = st.radio(
+        user_answers = []
+        for i, q_data in enumerate(quiz_data):
+            st.markdown(f"**{i+1}. {q_data.question}**")
+            # The widget value is just the option letter; the text is only used for display
+            user_answers.append(st.radio(
                 f"Select your answer for question {i+1}",
-                options=options_list,
-                key=f"q_{i}_radio" # Unique key for Streamlit widgets
-            )
+                options=tuple(q_data.letters),
+                format_func=lambda letter, q_data=q_data: f"{letter}) {q_data.option_text(letter)}",
+                # Per quiz, so a new quiz never starts with the previous quiz's selections
+                key=f"q_{st.session_state.quiz_id}_{i}_radio"
+            ))
         
         if st.form_submit_button(current_lang_texts["submit_quiz_button"]):
-            # Extract just the option letter (A, B, C, D) from the user's selection
-            st.session_state.quiz_answers = {k: v.split(')')[0] if v else None for k, v in user_answers.items()}
+            st.session_state.quiz_answers = tuple(user_answers)
+            # Per-question statistics and this student's review schedule
+            quiz_bank.record_answers(learner, *st.session_state.quiz_bank_key, quiz_data, user_answers)
             st.session_state.quiz_submitted = True
             st.rerun() # Rerun to show results
 
 # --- Display Quiz Results ---
-if st.session_state.quiz_data and st.session_state.quiz_submitted:
+if quiz_data and st.session_state.quiz_submitted:
     st.markdown(f"## {current_lang_texts['quiz_score']}")
     score = 0
-    total_questions = len(st.session_state.quiz_data)
+    total_questions = len(quiz_data)
+    answers = st.session_state.quiz_answers
 
-    for i, q_data in enumerate(st.session_state.quiz_data):
-        st.markdown(f"**{i+1}. {q_data['question']}**")
+    for i, q_data in enumerate(quiz_data):
+        st.markdown(f"**{i+1}. {q_data.question}**")
         
-        user_choice_letter = st.session_state.quiz_answers.get(f"q{i}")
-        correct_answer_letter = q_data['correct_answer']
+        user_choice_letter = answers[i] if i < len(answers) else None
+        correct_answer_letter = q_data.correct_answer
         
-        user_choice_text = q_data['options'].get(user_choice_letter, "No Answer Selected") # Handle case where user didn't select
-        correct_answer_text = q_data['options'].get(correct_answer_letter, "N/A")
+        user_choice_text = q_data.option_text(user_choice_letter, "No Answer Selected") # Handle case where user didn't select
+        correct_answer_text = q_data.option_text(correct_answer_letter, "N/A")
 
         if user_choice_letter == correct_answer_letter:
             score += 1
@@ -401,7 +469,7 @@ if st.session_state.quiz_data and st.session_state.quiz_submitted:
         st.markdown("### You can do better! Keep studying! 💪")
 
     if st.button("Generate a New Quiz"):
-        st.session_state.quiz_data = None
-        st.session_state.quiz_answers = {}
+        st.session_state.quiz_id = None
+        st.session_state.quiz_answers = ()
         st.session_state.quiz_submitted = False
         st.rerun()
@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import threading
+import time
+
+from quiz_parser import format_quiz, parse_quiz
+from response_cache import normalize_topic
+
+# --- Pre-generated content index ---
+# A compact SQLite file holding Explain/Summarize/Quiz content for a curriculum topic
+# catalog in every language x level, built offline by pregenerate.py. The app opens it
+# read-only (memory-mapped) and serves matching requests without any network access.
+CONTENT_INDEX_PATH = os.getenv(
+    "CLASSGPT_CONTENT_INDEX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "content_index.sqlite3"),
+)
+MMAP_BYTES = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topics (
+    topic_key TEXT PRIMARY KEY,
+    topic TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS topic_aliases (
+    alias_key TEXT PRIMARY KEY,
+    topic_key TEXT NOT NULL REFERENCES topics (topic_key)
+);
+CREATE TABLE IF NOT EXISTS content (
+    topic_key TEXT NOT NULL REFERENCES topics (topic_key),
+    task TEXT NOT NULL,
+    language TEXT NOT NULL,
+    level_index INTEGER NOT NULL,
+    num_questions INTEGER NOT NULL,
+    output TEXT NOT NULL,
+    model TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (topic_key, task, language, level_index, num_questions)
+) WITHOUT ROWID;
+"""
+
+
+class ContentIndex:
+    def __init__(self, path=CONTENT_INDEX_PATH, readonly=False):
+        self.path = path
+        self.readonly = readonly
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        if not readonly:
+            conn = self._connect()
+            with conn:
+                conn.executescript(SCHEMA)
+
+    @classmethod
+    def open_readonly(cls, path=CONTENT_INDEX_PATH):
+        # None when no index has been built for this deployment
+        if not os.path.exists(path):
+            return None
+        return cls(path, readonly=True)
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.readonly:
+                conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+                conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+            else:
+                conn = sqlite3.connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    # --- Building the index (pregenerate.py) ---
+    def add_topic(self, topic, aliases=()):
+        topic_key = normalize_topic(topic)
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO topics (topic_key, topic) VALUES (?, ?)", (topic_key, topic.strip()))
+            for alias in (topic, *aliases):
+                alias_key = normalize_topic(alias)
+                if alias_key:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO topic_aliases (alias_key, topic_key) VALUES (?, ?)",
+                        (alias_key, topic_key),
+                    )
+        return topic_key
+
+    def put(self, topic, task_id, language, level_index, num_questions, output, model=None):
+        topic_key = self.add_topic(topic)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO content"
+                " (topic_key, task, language, level_index, num_questions, output, model, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (topic_key, task_id, language, level_index, num_questions, output, model, time.time()),
+            )
+
+    def compact(self):
+        conn = self._connect()
+        conn.execute("VACUUM")
+        conn.execute("ANALYZE")
+
+    # --- Serving (the app) ---
+    def resolve_topic(self, topic):
+        row = self._connect().execute(
+            "SELECT topic_key FROM topic_aliases WHERE alias_key = ?", (normalize_topic(topic),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def catalog(self):
+        # (alias key, catalog topic) pairs, for seeding near-duplicate topic matching
+        return self._connect().execute(
+            "SELECT a.alias_key, t.topic FROM topic_aliases a JOIN topics t ON t.topic_key = a.topic_key"
+        ).fetchall()
+
+    def lookup(self, task_id, topic, language, level_index, num_questions=1):
+        output = self._lookup(task_id, topic, language, level_index, num_questions)
+        if output is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return output
+
+    def _lookup(self, task_id, topic, language, level_index, num_questions):
+        topic_key = self.resolve_topic(topic)
+        if topic_key is None:
+            return None
+        conn = self._connect()
+        if task_id != "generate_quiz":
+            row = conn.execute(
+                "SELECT output FROM content WHERE topic_key = ? AND task = ? AND language = ? AND level_index = ?",
+                (topic_key, task_id, language, level_index),
+            ).fetchone()
+            return row[0] if row else None
+
+        # A stored quiz with at least as many questions also answers a smaller request
+        row = conn.execute(
+            "SELECT output, num_questions FROM content"
+            " WHERE topic_key = ? AND task = ? AND language = ? AND level_index = ? AND num_questions >= ?"
+            " ORDER BY num_questions LIMIT 1",
+            (topic_key, task_id, language, level_index, num_questions),
+        ).fetchone()
+        if row is None:
+            return None
+        output, stored_questions = row
+        if stored_questions == num_questions:
+            return output
+        questions, _ = parse_quiz(output)
+        if len(questions) < num_questions:
+            return None
+        return format_quiz(questions[:num_questions])
+
+    def full_quiz(self, topic, language, level_index):
+        # Every pre-generated question for the topic (the largest stored quiz), for the question bank
+        topic_key = self.resolve_topic(topic)
+        if topic_key is None:
+            return None
+        row = self._connect().execute(
+            "SELECT output FROM content WHERE topic_key = ? AND task = 'generate_quiz' AND language = ? AND level_index = ?"
+            " ORDER BY num_questions DESC LIMIT 1",
+            (topic_key, language, level_index),
+        ).fetchone()
+        return row[0] if row else None
+
+    def stats(self):
+        conn = self._connect()
+        return {
+            "topics": conn.execute("SELECT COUNT(*) FROM topics").fetchone()[0],
+            "entries": conn.execute("SELECT COUNT(*) FROM content").fetchone()[0],
+            "hits": self.hits,
+            "misses": self.misses,
+        }
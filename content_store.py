@@ -0,0 +1,104 @@
+import hashlib
+import os
+import threading
+import time
+
+# --- Shared, content-addressed store for generated quizzes ---
+# Sessions used to keep their own parsed copy of every quiz in st.session_state, and
+# nothing was ever freed while a tab stayed open. A parsed quiz now lives once per process
+# here, keyed by a hash of the generated text, so the hundreds of students who get the same
+# cached quiz share one copy and st.session_state only holds its id (plus the chosen
+# letters). Sessions check in on every rerun; a session idle for SESSION_IDLE_SECONDS is
+# evicted, and content that no remaining session refers to is dropped with it. A student
+# returning after that just starts over, like an expired generation job.
+SESSION_IDLE_SECONDS = float(os.getenv("CLASSGPT_SESSION_IDLE_SECONDS", str(30 * 60)))
+SWEEP_INTERVAL_SECONDS = 60 # Idle sessions are looked for at most this often
+
+
+def content_id(text):
+    # 24 hex characters: short enough for every session to hold, long enough to never collide
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class StoredContent:
+    __slots__ = ("value", "refs")
+
+    def __init__(self, value):
+        self.value = value
+        self.refs = 0 # Sessions currently holding this content id
+
+
+class ContentStore:
+    def __init__(self, idle_seconds=SESSION_IDLE_SECONDS, sweep_interval=SWEEP_INTERVAL_SECONDS):
+        self.idle_seconds = idle_seconds
+        self.sweep_interval = sweep_interval
+        self.evicted_sessions = 0
+        self._content = {} # content id -> StoredContent
+        self._sessions = {} # session id -> [last seen, content id or None]
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    def put(self, session_id, text, value):
+        # Store `value` (e.g. the quiz parsed from `text`) under the id of `text`, unless an
+        # equal copy is already stored, and check the session in as holding it. Returns the id.
+        key = content_id(text)
+        with self._lock:
+            self._content.setdefault(key, StoredContent(value))
+            self._check_in(session_id, key)
+        return key
+
+    def get(self, key):
+        with self._lock:
+            entry = self._content.get(key) if key else None
+        return None if entry is None else entry.value
+
+    def check_in(self, session_id, key=None):
+        # Mark the session as active and holding `key` (None: no content), releasing any
+        # content it held before. Returns False when `key` is no longer stored.
+        with self._lock:
+            return self._check_in(session_id, key)
+
+    def _check_in(self, session_id, key):
+        now = time.monotonic()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = [now, None]
+        session[0] = now
+        found = key is None or key in self._content
+        if not found:
+            key = None
+        if session[1] != key:
+            self._release(session[1])
+            if key is not None:
+                self._content[key].refs += 1
+            session[1] = key
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+        return found
+
+    def _release(self, key):
+        entry = self._content.get(key) if key else None
+        if entry is not None:
+            entry.refs -= 1
+            if entry.refs <= 0:
+                del self._content[key]
+
+    def _sweep(self, now):
+        self._last_sweep = now
+        cutoff = now - self.idle_seconds
+        idle = [session_id for session_id, (last_seen, _) in self._sessions.items() if last_seen < cutoff]
+        for session_id in idle:
+            self._release(self._sessions.pop(session_id)[1])
+        self.evicted_sessions += len(idle)
+
+    def sweep(self):
+        with self._lock:
+            self._sweep(time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "content": len(self._content),
+                "evicted_sessions": self.evicted_sessions,
+            }
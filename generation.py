@@ -0,0 +1,158 @@
+import time
+
+from parallel_quiz import generate_parallel_quiz
+from prompts import TEMPERATURE, TOP_P, build_messages, max_tokens_for, stop_sequences_for
+from quiz_parser import QuizParser, format_quiz, parse_quiz
+from token_budget import count_message_tokens, count_tokens
+from translations import translations
+
+# --- One generation request, run on a background job thread ---
+# `request` is a plain dict describing what the student asked for:
+#     task_id, topic, language, level_index, num_questions, parallel_quiz, stream, cache_key
+# Progress is published on the job (text pieces and completed quiz questions) so any
+# session attached to it can render a live preview; nothing here touches Streamlit.
+# With a MetricsStore, every run records queue wait, time to first output, latency,
+# token usage and the quiz parse result, including failed runs. With a TokenBudget,
+# max_tokens is sized from (and teaches it) the observed completion lengths.
+
+
+def stream_completion_text(stream, usage=None):
+    # Yield only the text deltas from a streamed chat completion; token usage (sent with
+    # the last chunk) and the finish reason are added to the `usage` dict when given
+    for chunk in stream:
+        if usage is not None and getattr(chunk, "usage", None) is not None:
+            add_usage(usage, chunk.usage)
+        if usage is not None and chunk.choices and chunk.choices[0].finish_reason:
+            usage["finish_reason"] = chunk.choices[0].finish_reason
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def add_usage(usage, completion_usage):
+    for field in ("prompt_tokens", "completion_tokens"):
+        value = getattr(completion_usage, field, None)
+        if value is not None:
+            usage[field] = usage.get(field, 0) + value
+
+
+def run_generation(job, client, model, request, cache=None, topics=None, metrics=None, budget=None):
+    is_quiz = request["task_id"] == "generate_quiz"
+    language = request["language"]
+    started = time.time()
+    usage = {}
+    try:
+        output = _generate(job, client, model, request, usage, budget)
+    except Exception as e:
+        if metrics is not None:
+            _record(metrics, job, request, started, usage, status="error", error=f"{type(e).__name__}: {e}")
+        raise
+
+    parallel = is_quiz and request.get("parallel_quiz")
+    if not parallel:
+        # provider_router.Router remembers which route answered this thread's request
+        usage["route"] = getattr(client, "last_route", None)
+    if not parallel and "completion_tokens" not in usage:
+        # The provider did not report usage; count locally
+        usage["prompt_tokens"] = count_message_tokens(build_messages(
+            request["task_id"], request["topic"], language, request["level_index"], request["num_questions"]
+        ))
+        usage["completion_tokens"] = count_tokens(output)
+    if budget is not None and not parallel: # Parallel requests teach the budget themselves
+        budget.observe(
+            request["task_id"], language, request["num_questions"], usage["completion_tokens"],
+            truncated=usage.get("finish_reason") == "length",
+        )
+    questions = parse_quiz(output, extra_labels=(translations[language]["quiz_correct_answer"],))[0] if is_quiz else ()
+    parsed = not is_quiz or bool(questions)
+    if metrics is not None:
+        _record(
+            metrics, job, request, started, usage,
+            status="ok" if parsed else "parse_failed",
+            parse_ok=parsed if is_quiz else None,
+        )
+    # Only keep complete answers: a cut-off explanation or a quiz short of questions is shown
+    # once but would otherwise be served for a week under the full request's key
+    complete = usage.get("finish_reason") != "length" and (not is_quiz or len(questions) >= request["num_questions"])
+    if complete and cache is not None and request.get("cache_key"):
+        cache.put(request["cache_key"], output)
+    if complete and topics is not None:
+        # Later rewordings of this topic resolve onto it (see topic_matching.py)
+        topics.remember(request["topic"], language)
+    return output
+
+
+def _record(metrics, job, request, started, usage, **fields):
+    metrics.record(
+        request["task_id"],
+        request["language"],
+        request["level_index"],
+        "api",
+        queue_wait=started - job.created_at,
+        ttft=job.first_output_at - started if job.first_output_at else None,
+        latency=time.time() - started,
+        prompt_tokens=usage.get("prompt_tokens"),
+        completion_tokens=usage.get("completion_tokens"),
+        route=usage.get("route"),
+        **fields,
+    )
+
+
+def _generate(job, client, model, request, usage, budget):
+    is_quiz = request["task_id"] == "generate_quiz"
+    language = request["language"]
+
+    if is_quiz and request.get("parallel_quiz"):
+        questions, stats = generate_parallel_quiz(
+            client,
+            model,
+            request["topic"],
+            language,
+            request["level_index"],
+            request["num_questions"],
+            on_question=job.add_question,
+            budget=budget,
+        )
+        for field in ("prompt_tokens", "completion_tokens"):
+            usage[field] = stats[field]
+        output = format_quiz(questions)
+    else:
+        stream = request.get("stream", True)
+        max_tokens = (budget.max_tokens if budget is not None else max_tokens_for)(
+            request["task_id"], language, request["num_questions"]
+        )
+        completion = client.chat.completions.create(
+            model=model,
+            messages=build_messages(
+                request["task_id"],
+                request["topic"],
+                language,
+                request["level_index"],
+                num_questions=request["num_questions"],
+            ),
+            max_tokens=max_tokens,
+            temperature=TEMPERATURE,
+            top_p=TOP_P,
+            stop=stop_sequences_for(request["task_id"], request["num_questions"]),
+            stream=stream,
+            stream_options={"include_usage": True} if stream else None,
+            # do_sample=True # Removed as per previous TypeError
+        )
+        if not stream:
+            output = completion.choices[0].message.content or ""
+            if getattr(completion, "usage", None) is not None:
+                add_usage(usage, completion.usage)
+            usage["finish_reason"] = completion.choices[0].finish_reason
+            job.append_text(output)
+        else:
+            # Publish each question as soon as its "Correct Answer:" line arrives
+            parser = QuizParser(extra_labels=(translations[language]["quiz_correct_answer"],)) if is_quiz else None
+            for piece in stream_completion_text(completion, usage):
+                job.append_text(piece)
+                if parser is not None:
+                    for question in parser.feed(piece):
+                        job.add_question(question)
+            if parser is not None:
+                for question in parser.close():
+                    job.add_question(question)
+            output = job.text
+    return output
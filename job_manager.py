@@ -0,0 +1,112 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Process-wide background job manager ---
+# Generation runs on a worker thread instead of inside the Streamlit script, so a rerun
+# (language change, radio click, st.rerun()) no longer throws away an in-flight completion.
+# Jobs are keyed by request fingerprint: identical requests from different sessions attach
+# to the same in-flight job, and each session polls for its result by job id. Only queued
+# or running jobs are joined; a finished job's result is either in the response cache
+# already or was not worth keeping (e.g. a quiz that did not parse), so asking again
+# starts a new job.
+
+JOB_WORKERS = 8
+JOB_RETENTION_SECONDS = 600 # Finished jobs stay attachable for this long
+
+
+class Job:
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.status = "queued" # queued -> running -> done | failed
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.first_output_at = None # First streamed piece or quiz question, for time-to-first-token
+        self.result = None
+        self.error = None
+        self.questions = [] # Quiz questions parsed so far, for live previews
+        self._pieces = [] # Streamed text so far
+        self._done = threading.Event()
+
+    # --- Called from the worker thread ---
+    def append_text(self, piece):
+        if self.first_output_at is None:
+            self.first_output_at = time.time()
+        self._pieces.append(piece)
+
+    def add_question(self, question):
+        if self.first_output_at is None:
+            self.first_output_at = time.time()
+        self.questions.append(question)
+
+    # --- Called from Streamlit sessions ---
+    @property
+    def text(self):
+        return "".join(self._pieces)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+
+class JobManager:
+    def __init__(self, max_workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self.coalesced = 0 # Submissions that attached to an existing job
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="classgpt-job")
+        self._jobs = {} # job id -> Job
+        self._in_flight = {} # fingerprint -> newest joinable Job
+        self._lock = threading.Lock()
+
+    def submit(self, fingerprint, fn, coalesce=True):
+        # fn(job) runs on a worker thread and returns the job result.
+        # With coalesce=False (e.g. "force regenerate") a fresh job is always started.
+        with self._lock:
+            self._prune()
+            job = self._in_flight.get(fingerprint) if coalesce else None
+            if job is not None and job.status in ("queued", "running"):
+                self.coalesced += 1
+                return job
+            job = Job(f"{fingerprint}:{uuid.uuid4().hex[:8]}")
+            self._jobs[job.job_id] = job
+            if coalesce:
+                self._in_flight[fingerprint] = job
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = fn(job)
+            job.status = "done"
+        except Exception as e:
+            job.error = e
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            job._done.set()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        for fingerprint in [fp for fp, job in self._in_flight.items() if job.finished_at is not None]:
+            del self._in_flight[fingerprint]
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        stats = {status: statuses.count(status) for status in ("queued", "running", "done", "failed")}
+        stats["coalesced"] = self.coalesced
+        return stats
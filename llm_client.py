@@ -0,0 +1,78 @@
+import importlib
+import os
+
+import huggingface_hub
+from huggingface_hub import AsyncInferenceClient, InferenceClient
+
+# --- Configuration for Hugging Face LLaMA 3 Inference API ---
+HF_API_KEY = os.getenv("HF_TOKEN")
+HF_LLAMA3_MODEL = os.getenv("HF_LLAMA3_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
+HF_PROVIDER = os.getenv("HF_PROVIDER", "sambanova") # Confirm this provider is correct for your model access
+
+# Point every client at an OpenAI-compatible server instead of the Hugging Face router,
+# e.g. the local stub in mock_inference_server.py
+HF_BASE_URL = os.getenv("HF_BASE_URL")
+
+# Keep-alive HTTP connection pool shared by every InferenceClient in the process
+HTTP_POOL_SIZE = int(os.getenv("CLASSGPT_HTTP_POOL_SIZE", "32"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("CLASSGPT_HTTP_KEEPALIVE_SECONDS", "120"))
+
+
+def configure_http_pool(pool_size=HTTP_POOL_SIZE, keepalive_seconds=HTTP_KEEPALIVE_SECONDS):
+    # huggingface_hub shares one HTTP session per process; size its pool for concurrent
+    # sessions and keep idle connections open so follow-up requests skip the TLS handshake.
+    if hasattr(huggingface_hub, "set_client_factory"):
+        # httpx-based releases: rebuild the default client with a larger transport pool
+        from huggingface_hub.utils import _http
+        probe = _http.default_client_factory()
+        httpx_module = importlib.import_module(type(probe).__module__.split(".")[0])
+        event_hooks = probe.event_hooks
+        probe.close()
+
+        def client_factory():
+            transport = httpx_module.HTTPTransport(
+                limits=httpx_module.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size,
+                    keepalive_expiry=keepalive_seconds,
+                ),
+            )
+            return httpx_module.Client(event_hooks=event_hooks, follow_redirects=True, timeout=None, transport=transport)
+
+        huggingface_hub.set_client_factory(client_factory)
+    elif hasattr(huggingface_hub, "configure_http_backend"):
+        # requests-based releases
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        def backend_factory():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            return session
+
+        huggingface_hub.configure_http_backend(backend_factory=backend_factory)
+
+
+def client_kwargs(api_key=None, provider=None, base_url=None, timeout=None):
+    # An explicit provider wins over HF_BASE_URL; an explicit base_url wins over both
+    base_url = base_url or (None if provider else HF_BASE_URL)
+    if base_url:
+        kwargs = {"base_url": base_url, "api_key": api_key or HF_API_KEY or "local"}
+    else:
+        kwargs = {
+            "provider": provider or HF_PROVIDER,
+            "api_key": api_key or HF_API_KEY, # Use HF_API_KEY, not HF_API_TOKEN
+        }
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    return kwargs
+
+
+def make_client(**kwargs):
+    return InferenceClient(**client_kwargs(**kwargs))
+
+
+def make_async_client(**kwargs):
+    return AsyncInferenceClient(**client_kwargs(**kwargs))
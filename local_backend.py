@@ -0,0 +1,431 @@
+import codecs
+import ctypes
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+import numpy as np
+from huggingface_hub import (
+    ChatCompletionOutput,
+    ChatCompletionOutputComplete,
+    ChatCompletionOutputMessage,
+    ChatCompletionOutputUsage,
+    ChatCompletionStreamOutput,
+    ChatCompletionStreamOutputChoice,
+    ChatCompletionStreamOutputDelta,
+    ChatCompletionStreamOutputUsage,
+)
+
+# --- Offline generation on this machine's CPU ---
+# For schools with intermittent connectivity: a small quantized GGUF model (e.g. Llama 3.2
+# 1B/3B Instruct Q4_K_M) runs through the optional llama-cpp-python bindings. The model is
+# loaded once per process. Requests wait in a bounded queue, and one scheduler thread
+# decodes every active request together (continuous batching): each llama_decode call
+# carries one new token for every request that is generating plus the prompt of any request
+# that just got a slot, so a new student starts as soon as a slot is free instead of after
+# everyone else has finished. LocalBackend has the InferenceClient chat.completions.create
+# interface (including streamed chunks and usage), so provider_router.Router treats it as
+# one more route, "local" in CLASSGPT_ROUTES.
+#
+#     CLASSGPT_LOCAL_MODEL=/models/Llama-3.2-1B-Instruct-Q4_K_M.gguf streamlit run class_gpt_app.py
+LOCAL_MODEL_PATH = os.getenv("CLASSGPT_LOCAL_MODEL", "")
+LOCAL_SLOTS = int(os.getenv("CLASSGPT_LOCAL_SLOTS", "4")) # Requests decoded together
+LOCAL_QUEUE_SIZE = int(os.getenv("CLASSGPT_LOCAL_QUEUE_SIZE", "16")) # Requests waiting for a slot
+LOCAL_CONTEXT_TOKENS = int(os.getenv("CLASSGPT_LOCAL_CONTEXT", "4096")) # Prompt plus answer, per request
+LOCAL_THREADS = int(os.getenv("CLASSGPT_LOCAL_THREADS", str(os.cpu_count() or 4)))
+LOCAL_TIMEOUT = float(os.getenv("CLASSGPT_LOCAL_TIMEOUT", "120")) # Seconds a caller waits for a slot or its next token
+LOCAL_BATCH_TOKENS = 512 # Tokens per llama_decode call; longer prompts are prefilled over several steps
+TOP_K = 40 # Candidates considered by top-p sampling
+
+
+class LocalBackendBusy(RuntimeError):
+    # The request queue is full; the router sends the request elsewhere
+    pass
+
+
+class LlamaCppEngine:
+    # One model and one context (through the llama.cpp C API) whose KV cache holds `slots`
+    # independent sequences. Only the scheduler thread may call it.
+    def __init__(self, model_path, slots=LOCAL_SLOTS, context_tokens=LOCAL_CONTEXT_TOKENS,
+                 batch_tokens=LOCAL_BATCH_TOKENS, threads=LOCAL_THREADS):
+        try:
+            import llama_cpp
+        except ImportError as e:
+            raise ImportError("The local backend needs the optional llama-cpp-python package") from e
+        self._lib = llama_cpp
+        logging.getLogger("llama-cpp-python").setLevel(logging.WARNING) # Not every tensor and buffer it loads
+        llama_cpp.llama_backend_init()
+        self._model = llama_cpp.llama_model_load_from_file(model_path.encode("utf-8"), llama_cpp.llama_model_default_params())
+        if not self._model:
+            raise ValueError(f"Could not load the local model from {model_path}")
+        params = llama_cpp.llama_context_default_params()
+        params.n_ctx = context_tokens * slots
+        params.n_batch = params.n_ubatch = batch_tokens
+        params.n_seq_max = slots
+        params.n_threads = params.n_threads_batch = threads
+        self._ctx = llama_cpp.llama_init_from_model(self._model, params)
+        if not self._ctx:
+            raise ValueError("Could not create a llama.cpp context for the local model")
+        self._memory = llama_cpp.llama_get_memory(self._ctx)
+        self._vocab = llama_cpp.llama_model_get_vocab(self._model)
+        self._batch = llama_cpp.llama_batch_init(batch_tokens, 0, 1)
+        self._template = llama_cpp.llama_model_chat_template(self._model, None)
+        self.n_vocab = llama_cpp.llama_vocab_n_tokens(self._vocab)
+        self.context_tokens = context_tokens
+        self.batch_tokens = batch_tokens
+
+    def prompt_tokens(self, messages):
+        # The model's own chat template (a plain transcript when it has none), tokenized
+        lib = self._lib
+        text = None
+        if self._template:
+            chat = (lib.llama_chat_message * len(messages))(
+                *(lib.llama_chat_message(m["role"].encode("utf-8"), m["content"].encode("utf-8")) for m in messages)
+            )
+            size = lib.llama_chat_apply_template(self._template, chat, len(messages), True, None, 0)
+            if size > 0:
+                buf = ctypes.create_string_buffer(size + 1)
+                lib.llama_chat_apply_template(self._template, chat, len(messages), True, buf, len(buf))
+                text = buf.raw[:size]
+        if text is None:
+            text = ("".join(f"{m['role']}: {m['content']}\n" for m in messages) + "assistant: ").encode("utf-8")
+        tokens = (lib.llama_token * (len(text) + 2))()
+        n = lib.llama_tokenize(self._vocab, text, len(text), tokens, len(tokens), True, True)
+        if n < 0:
+            raise ValueError("Prompt could not be tokenized")
+        return tokens[:n]
+
+    def decode(self, entries):
+        # entries: [(sequence id, tokens, position of the first token)], decoded in one call.
+        # Returns the logits after each entry's last token, valid until the next call.
+        batch = self._batch
+        rows = []
+        n = 0
+        for seq_id, tokens, position in entries:
+            for i, token in enumerate(tokens):
+                batch.token[n] = token
+                batch.pos[n] = position + i
+                batch.n_seq_id[n] = 1
+                batch.seq_id[n][0] = seq_id
+                batch.logits[n] = i == len(tokens) - 1
+                n += 1
+            rows.append(n - 1)
+        batch.n_tokens = n
+        status = self._lib.llama_decode(self._ctx, batch)
+        if status != 0:
+            raise RuntimeError(f"llama_decode failed with status {status}")
+        return [np.ctypeslib.as_array(self._lib.llama_get_logits_ith(self._ctx, row), shape=(self.n_vocab,)) for row in rows]
+
+    def piece(self, token):
+        buf = ctypes.create_string_buffer(64)
+        n = self._lib.llama_token_to_piece(self._vocab, token, buf, len(buf), 0, False)
+        if n < 0:
+            buf = ctypes.create_string_buffer(-n)
+            n = self._lib.llama_token_to_piece(self._vocab, token, buf, len(buf), 0, False)
+        return buf.raw[:n]
+
+    def is_end(self, token):
+        return self._lib.llama_vocab_is_eog(self._vocab, token)
+
+    def release(self, seq_id):
+        self._lib.llama_memory_seq_rm(self._memory, seq_id, -1, -1)
+
+
+def sample_token(logits, temperature, top_p, rng):
+    # Greedy at temperature 0; otherwise top-p over the TOP_K most likely tokens
+    if temperature <= 0:
+        return int(np.argmax(logits))
+    top = np.argpartition(logits, -TOP_K)[-TOP_K:] if len(logits) > TOP_K else np.arange(len(logits))
+    top = top[np.argsort(logits[top])[::-1]]
+    probs = np.exp((logits[top] - logits[top[0]]) / temperature)
+    probs /= probs.sum()
+    keep = min(len(top), int(np.searchsorted(np.cumsum(probs), top_p)) + 1)
+    probs = probs[:keep] / probs[:keep].sum()
+    return int(top[rng.choice(keep, p=probs)])
+
+
+class _Sequence:
+    # One request from queueing to its last token
+    def __init__(self, messages, max_tokens, temperature, top_p, stop, seed):
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.top_p = top_p
+        self.stop = [s for s in stop or () if s]
+        self.holdback = max((len(s) for s in self.stop), default=1) - 1 # Text that may still become a stop sequence
+        self.rng = np.random.default_rng(seed)
+        self.events = queue.Queue() # Text pieces, then _FINISHED or an exception
+        self.cancelled = False # Set by a caller that stopped reading
+        self.prompt = None
+        self.slot = None
+        self.position = 0 # Tokens of this sequence in the KV cache
+        self.next_token = None
+        self.generated = 0
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.text = ""
+        self.sent = 0 # Characters of `text` already handed out
+        self.finish_reason = None
+
+
+_FINISHED = object()
+
+
+class _Completions:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def create(self, **kwargs):
+        return self._backend.create(**kwargs)
+
+
+class _Chat:
+    def __init__(self, backend):
+        self.completions = _Completions(backend)
+
+
+class LocalBackend:
+    def __init__(self, engine, slots=LOCAL_SLOTS, queue_size=LOCAL_QUEUE_SIZE, model_name="local"):
+        self.engine = engine
+        self.slots = slots
+        self.model_name = model_name
+        self.chat = _Chat(self)
+        self.completed = 0
+        self.rejected = 0
+        self.steps = 0 # llama_decode calls
+        self.batched = 0 # Sequences in those calls, summed
+        self._active = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="classgpt-local", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_model(cls, model_path=LOCAL_MODEL_PATH, slots=LOCAL_SLOTS, queue_size=LOCAL_QUEUE_SIZE, **engine_kwargs):
+        if not model_path:
+            raise ValueError("No local model: set CLASSGPT_LOCAL_MODEL or use local@/path/to/model.gguf")
+        engine = LlamaCppEngine(model_path, slots=slots, **engine_kwargs)
+        return cls(engine, slots=slots, queue_size=queue_size, model_name=os.path.basename(model_path))
+
+    def load(self):
+        # Requests running or waiting, per slot
+        return (self._active + self._queue.qsize()) / self.slots
+
+    def full(self):
+        # Also true once the scheduler thread is gone, so the router stops choosing this route
+        return self._queue.full() or not self._thread.is_alive()
+
+    def create(self, messages, max_tokens=None, temperature=None, top_p=None, stop=None, stream=False,
+               stream_options=None, seed=None, **_):
+        # Same arguments as InferenceClient.chat.completions.create; `model` and other
+        # provider options are ignored
+        if not self._thread.is_alive():
+            raise RuntimeError("The local model's scheduler thread has stopped")
+        seq = _Sequence(
+            messages, max_tokens, 1.0 if temperature is None else temperature, 1.0 if top_p is None else top_p, stop, seed
+        )
+        try:
+            self._queue.put_nowait(seq)
+        except queue.Full:
+            self.rejected += 1
+            raise LocalBackendBusy(f"Local model queue is full ({self._queue.maxsize} waiting)") from None
+        completion_id = f"local-{uuid.uuid4().hex}"
+        if stream:
+            return self._stream(seq, completion_id, bool(stream_options and stream_options.get("include_usage")))
+        text = "".join(self._pieces(seq))
+        return ChatCompletionOutput(
+            choices=[ChatCompletionOutputComplete(
+                finish_reason=seq.finish_reason,
+                index=0,
+                message=ChatCompletionOutputMessage(role="assistant", content=text),
+            )],
+            created=int(time.time()),
+            id=completion_id,
+            model=self.model_name,
+            system_fingerprint="local",
+            usage=ChatCompletionOutputUsage(
+                completion_tokens=seq.generated,
+                prompt_tokens=len(seq.prompt),
+                total_tokens=len(seq.prompt) + seq.generated,
+            ),
+        )
+
+    def _pieces(self, seq):
+        last_event = time.monotonic()
+        try:
+            while True:
+                try:
+                    event = seq.events.get(timeout=1.0)
+                except queue.Empty:
+                    if not self._thread.is_alive():
+                        raise RuntimeError("The local model's scheduler thread has stopped") from None
+                    if time.monotonic() - last_event > LOCAL_TIMEOUT:
+                        raise TimeoutError(f"No output from the local model for {LOCAL_TIMEOUT:g} s") from None
+                    continue
+                last_event = time.monotonic()
+                if event is _FINISHED:
+                    return
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        finally:
+            seq.cancelled = True # A caller that stops reading frees the slot
+
+    def _stream(self, seq, completion_id, include_usage):
+        def chunk(content=None, finish_reason=None, usage=None):
+            choices = [] if usage is not None else [ChatCompletionStreamOutputChoice(
+                delta=ChatCompletionStreamOutputDelta(role="assistant", content=content),
+                index=0,
+                finish_reason=finish_reason,
+            )]
+            return ChatCompletionStreamOutput(
+                choices=choices, created=int(time.time()), id=completion_id, model=self.model_name,
+                system_fingerprint="local", usage=usage,
+            )
+
+        for piece in self._pieces(seq):
+            yield chunk(piece)
+        yield chunk(finish_reason=seq.finish_reason)
+        if include_usage:
+            yield chunk(usage=ChatCompletionStreamOutputUsage(
+                completion_tokens=seq.generated,
+                prompt_tokens=len(seq.prompt),
+                total_tokens=len(seq.prompt) + seq.generated,
+            ))
+
+    # --- Scheduler thread ---
+    def _run(self):
+        active = []
+        free_slots = list(range(self.slots))
+        while True:
+            try:
+                self._step(active, free_slots)
+            except Exception as e:
+                # Not tied to one sequence (batch building, a bug): fail what is in flight, keep serving
+                for seq in active:
+                    self._fail(seq, e)
+            # Free the slots of finished and failed requests and of callers that stopped reading
+            for seq in [seq for seq in active if seq.cancelled]:
+                active.remove(seq)
+                free_slots.append(seq.slot)
+                try:
+                    self.engine.release(seq.slot)
+                except Exception:
+                    pass # Cleared again when the slot is next assigned
+            self._active = len(active)
+
+    def _step(self, active, free_slots):
+        # Admit waiting requests into free slots; block only when there is nothing to decode
+        while free_slots:
+            try:
+                seq = self._queue.get(block=not active)
+            except queue.Empty:
+                break
+            if not seq.cancelled and self._admit(seq, free_slots[-1]):
+                seq.slot = free_slots.pop()
+                active.append(seq)
+        self._active = len(active)
+
+        # Every generating sequence's last token, then prompts as far as the batch allows
+        generating = [seq for seq in active if seq.position >= len(seq.prompt)]
+        entries = [(seq, [seq.next_token]) for seq in generating]
+        room = self.engine.batch_tokens - len(entries)
+        for seq in active:
+            if room <= 0:
+                break
+            if seq.position < len(seq.prompt):
+                chunk = seq.prompt[seq.position:seq.position + room]
+                entries.append((seq, chunk))
+                room -= len(chunk)
+        if not entries:
+            return
+        try:
+            logits = self.engine.decode([(seq.slot, tokens, seq.position) for seq, tokens in entries])
+        except Exception as e:
+            for seq, _ in entries:
+                self._fail(seq, e)
+            return
+        self.steps += 1
+        self.batched += len(entries)
+
+        for (seq, tokens), row in zip(entries, logits):
+            seq.position += len(tokens)
+            if seq.cancelled or seq.position < len(seq.prompt):
+                continue
+            try:
+                seq.next_token = sample_token(row, seq.temperature, seq.top_p, seq.rng)
+                if self._emit(seq, seq.next_token):
+                    self.completed += 1
+                    seq.cancelled = True
+            except Exception as e:
+                self._fail(seq, e) # e.g. NaN logits: only this request fails
+
+    @staticmethod
+    def _fail(seq, error):
+        seq.events.put(error)
+        seq.cancelled = True
+
+    def _admit(self, seq, slot):
+        try:
+            self.engine.release(slot) # In case releasing it after its last request failed
+            seq.prompt = self.engine.prompt_tokens(seq.messages)
+        except Exception as e:
+            seq.events.put(e)
+            return False
+        room = self.engine.context_tokens - len(seq.prompt)
+        if room <= 0:
+            seq.events.put(ValueError(f"Prompt of {len(seq.prompt)} tokens does not fit the local context"))
+            return False
+        seq.max_tokens = min(seq.max_tokens or room, room)
+        return True
+
+    def _emit(self, seq, token):
+        # Hand out the new text, holding back anything that could still turn into a stop
+        # sequence. Returns True when the sequence has finished.
+        if self.engine.is_end(token):
+            return self._finish(seq, "stop")
+        seq.generated += 1
+        searched = max(0, len(seq.text) - seq.holdback)
+        seq.text += seq.decoder.decode(self.engine.piece(token))
+        hits = [i for i in (seq.text.find(s, searched) for s in seq.stop) if i >= 0]
+        if hits:
+            seq.text = seq.text[:min(hits)]
+            return self._finish(seq, "stop")
+        if seq.generated >= seq.max_tokens:
+            return self._finish(seq, "length")
+        end = len(seq.text) - seq.holdback
+        if end > seq.sent:
+            seq.events.put(seq.text[seq.sent:end])
+            seq.sent = end
+        return False
+
+    def _finish(self, seq, reason):
+        seq.text += seq.decoder.decode(b"", final=True)
+        if len(seq.text) > seq.sent:
+            seq.events.put(seq.text[seq.sent:])
+        seq.finish_reason = reason
+        seq.events.put(_FINISHED)
+        return True
+
+    def stats(self):
+        return {
+            "slots": self.slots,
+            "active": self._active,
+            "queued": self._queue.qsize(),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "mean_batch": round(self.batched / self.steps, 2) if self.steps else None,
+        }
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_backend(model_path=LOCAL_MODEL_PATH):
+    # One loaded model (and scheduler thread) per model file per process
+    with _shared_lock:
+        if model_path not in _shared:
+            _shared[model_path] = LocalBackend.from_model(model_path)
+        return _shared[model_path]
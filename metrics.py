@@ -0,0 +1,275 @@
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Generation metrics ---
+# Every request the app answers (from the content index, the response cache or the API)
+# is appended to a local SQLite table: queue wait, time to first token, total latency,
+# token usage, quiz parse result, language, level and task. The admin page
+# (pages/admin_metrics.py) reads percentiles from it, and the same data is exported in
+# the Prometheus text format:
+#
+#     python metrics.py                 # print the exposition text once
+#     python metrics.py --serve 9464    # serve it on http://127.0.0.1:9464/metrics
+METRICS_DB_PATH = os.getenv(
+    "CLASSGPT_METRICS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".classgpt_metrics.sqlite3"),
+)
+METRICS_RETENTION_DAYS = float(os.getenv("CLASSGPT_METRICS_RETENTION_DAYS", "30"))
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0) # Seconds
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    ts REAL NOT NULL,
+    task TEXT NOT NULL,
+    language TEXT NOT NULL,
+    level_index INTEGER,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL,
+    queue_wait REAL,
+    ttft REAL,
+    latency REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    parse_ok INTEGER,
+    error TEXT,
+    route TEXT
+);
+CREATE INDEX IF NOT EXISTS generations_ts ON generations (ts);
+"""
+COLUMNS = (
+    "ts", "task", "language", "level_index", "source", "status", "queue_wait", "ttft", "latency",
+    "prompt_tokens", "completion_tokens", "parse_ok", "error", "route",
+)
+
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile of an already sorted list (None when empty)
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class MetricsStore:
+    # Append-only: one row per answer, whose `source` is content_index, response_cache or api
+    def __init__(self, path=METRICS_DB_PATH, retention_days=METRICS_RETENTION_DAYS):
+        self.path = path
+        self.dropped = 0 # Records lost to SQLite errors; metrics must never fail a request
+        self._local = threading.local()
+        if not path:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executescript(SCHEMA)
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(generations)")}
+                if "route" not in columns: # Stores created before provider routing
+                    conn.execute("ALTER TABLE generations ADD COLUMN route TEXT")
+                if retention_days:
+                    conn.execute("DELETE FROM generations WHERE ts < ?", (time.time() - retention_days * 86400,))
+        except sqlite3.Error:
+            self.path = None # Unwritable location: record nothing rather than fail the app
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL") # Appends from app workers do not block the admin page
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, task, language, level_index, source, status="ok", queue_wait=None, ttft=None,
+               latency=None, prompt_tokens=None, completion_tokens=None, parse_ok=None, error=None, route=None):
+        row = (
+            time.time(), task, language, level_index, source, status, queue_wait, ttft, latency,
+            prompt_tokens, completion_tokens, None if parse_ok is None else int(parse_ok), error, route,
+        )
+        if not self.path:
+            self.dropped += 1
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(f"INSERT INTO generations ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", row)
+        except sqlite3.Error:
+            self.dropped += 1
+
+    def rows(self, since=None):
+        if not self.path:
+            return []
+        query = f"SELECT {', '.join(COLUMNS)} FROM generations"
+        params = ()
+        if since is not None:
+            query += " WHERE ts >= ?"
+            params = (since,)
+        return [dict(zip(COLUMNS, row)) for row in self._connect().execute(query + " ORDER BY ts", params)]
+
+    def summary(self, since=None):
+        # One row per (task, language): request counts, latency percentiles and token spend
+        groups = defaultdict(list)
+        for row in self.rows(since):
+            groups[(row["task"], row["language"])].append(row)
+        summary = []
+        for (task, language), rows in sorted(groups.items()):
+            api_rows = [row for row in rows if row["source"] == "api"]
+            latencies = sorted(row["latency"] for row in api_rows if row["latency"] is not None)
+            ttfts = sorted(row["ttft"] for row in api_rows if row["ttft"] is not None)
+            waits = sorted(row["queue_wait"] for row in api_rows if row["queue_wait"] is not None)
+            parsed = [row["parse_ok"] for row in rows if row["parse_ok"] is not None]
+            summary.append({
+                "task": task,
+                "language": language,
+                "requests": len(rows),
+                "api_requests": len(api_rows),
+                "cache_hit_rate": round(1 - len(api_rows) / len(rows), 3),
+                "errors": sum(row["status"] == "error" for row in rows),
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+                "latency_p99": percentile(latencies, 99),
+                "ttft_p50": percentile(ttfts, 50),
+                "ttft_p95": percentile(ttfts, 95),
+                "queue_wait_p95": percentile(waits, 95),
+                "prompt_tokens": sum(row["prompt_tokens"] or 0 for row in rows),
+                "completion_tokens": sum(row["completion_tokens"] or 0 for row in rows),
+                "parse_failure_rate": round(1 - sum(parsed) / len(parsed), 3) if parsed else None,
+            })
+        return summary
+
+    def route_summary(self, since=None):
+        # One row per provider route that answered API requests
+        groups = defaultdict(list)
+        for row in self.rows(since):
+            if row["source"] == "api":
+                groups[row["route"] or "unknown"].append(row)
+        summary = []
+        for route, rows in sorted(groups.items()):
+            latencies = sorted(row["latency"] for row in rows if row["status"] != "error" and row["latency"] is not None)
+            ttfts = sorted(row["ttft"] for row in rows if row["ttft"] is not None)
+            summary.append({
+                "route": route,
+                "requests": len(rows),
+                "errors": sum(row["status"] == "error" for row in rows),
+                "latency_p50": percentile(latencies, 50),
+                "latency_p95": percentile(latencies, 95),
+                "latency_p99": percentile(latencies, 99),
+                "ttft_p95": percentile(ttfts, 95),
+            })
+        return summary
+
+    def prometheus_text(self, since=None):
+        return prometheus_text(self.rows(since))
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+def _histogram(lines, name, help_text, samples):
+    # samples: {labels tuple: [values]}, rendered as a cumulative Prometheus histogram
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (task, language, source), values in sorted(samples.items()):
+        for bound in LATENCY_BUCKETS:
+            count = sum(value <= bound for value in values)
+            lines.append(f"{name}_bucket{_labels(task=task, language=language, source=source, le=bound)} {count}")
+        lines.append(f"{name}_bucket{_labels(task=task, language=language, source=source, le='+Inf')} {len(values)}")
+        lines.append(f"{name}_sum{_labels(task=task, language=language, source=source)} {sum(values):.6f}")
+        lines.append(f"{name}_count{_labels(task=task, language=language, source=source)} {len(values)}")
+
+
+def prometheus_text(rows):
+    requests = defaultdict(int)
+    route_requests = defaultdict(int)
+    tokens = defaultdict(int)
+    parse_failures = defaultdict(int)
+    latency = defaultdict(list)
+    ttft = defaultdict(list)
+    queue_wait = defaultdict(list)
+    for row in rows:
+        key = (row["task"], row["language"], row["source"])
+        requests[key + (row["status"],)] += 1
+        if row["source"] == "api":
+            route_requests[(row["route"] or "unknown", row["status"])] += 1
+        tokens[(row["task"], row["language"], "prompt")] += row["prompt_tokens"] or 0
+        tokens[(row["task"], row["language"], "completion")] += row["completion_tokens"] or 0
+        if row["parse_ok"] == 0:
+            parse_failures[(row["task"], row["language"])] += 1
+        if row["latency"] is not None:
+            latency[key].append(row["latency"])
+        if row["ttft"] is not None:
+            ttft[key].append(row["ttft"])
+        if row["queue_wait"] is not None:
+            queue_wait[key].append(row["queue_wait"])
+
+    lines = [
+        "# HELP classgpt_requests_total Answered requests by task, language, answer source and status",
+        "# TYPE classgpt_requests_total counter",
+    ]
+    for (task, language, source, status), count in sorted(requests.items()):
+        lines.append(f"classgpt_requests_total{_labels(task=task, language=language, source=source, status=status)} {count}")
+    lines.append("# HELP classgpt_route_requests_total API requests by the provider route that answered")
+    lines.append("# TYPE classgpt_route_requests_total counter")
+    for (route, status), count in sorted(route_requests.items()):
+        lines.append(f"classgpt_route_requests_total{_labels(route=route, status=status)} {count}")
+    lines.append("# HELP classgpt_tokens_total Tokens reported by the inference provider")
+    lines.append("# TYPE classgpt_tokens_total counter")
+    for (task, language, kind), count in sorted(tokens.items()):
+        lines.append(f"classgpt_tokens_total{_labels(task=task, language=language, kind=kind)} {count}")
+    lines.append("# HELP classgpt_quiz_parse_failures_total Generated quizzes that did not parse")
+    lines.append("# TYPE classgpt_quiz_parse_failures_total counter")
+    for (task, language), count in sorted(parse_failures.items()):
+        lines.append(f"classgpt_quiz_parse_failures_total{_labels(task=task, language=language)} {count}")
+    _histogram(lines, "classgpt_latency_seconds", "Time from job start (or cache lookup) to the full answer", latency)
+    _histogram(lines, "classgpt_ttft_seconds", "Time from job start to the first streamed token or quiz question", ttft)
+    _histogram(lines, "classgpt_queue_wait_seconds", "Time a generation job waited for a worker thread", queue_wait)
+    return "\n".join(lines) + "\n"
+
+
+def serve(store, port, host="127.0.0.1"):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = store.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    print(f"Serving Prometheus metrics on http://{host}:{server.server_address[1]}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export ClassGPT generation metrics in the Prometheus text format")
+    parser.add_argument("--db", default=METRICS_DB_PATH)
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Serve /metrics over HTTP instead of printing once")
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args(argv)
+    store = MetricsStore(args.db, retention_days=0)
+    if args.serve is not None:
+        serve(store, args.serve, args.host)
+    else:
+        sys.stdout.write(store.prometheus_text())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
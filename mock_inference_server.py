@@ -0,0 +1,210 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Local stand-in for the Hugging Face Inference API ---
+# Speaks just enough of the OpenAI-compatible /v1/chat/completions protocol (including
+# server-sent-event streaming) for InferenceClient/AsyncInferenceClient created with
+# base_url=... to talk to it. Latency and failures are configurable so batch jobs,
+# benchmarks and load tests can run without network access or API tokens.
+#
+#     python mock_inference_server.py --port 8765 --latency 0.3 --error-rate 0.05
+#
+# With --overrun the stub behaves like a chatty model that keeps going after the answer
+# (an extra quiz question and explanations until max_tokens or a stop sequence ends it).
+#     HF_BASE_URL=http://127.0.0.1:8765 streamlit run class_gpt_app.py
+
+
+def fake_quiz(num_questions, part=1):
+    blocks = []
+    for n in range(1, num_questions + 1):
+        correct = "ABCD"[n % 4]
+        blocks.append(
+            f"{n}. Sample question number {n} from part {part}?\n"
+            f"A) First option {n}\nB) Second option {n}\nC) Third option {n}\nD) Fourth option {n}\n"
+            f"Correct Answer: {correct}\n"
+        )
+    return "\n".join(blocks)
+
+
+def fake_overrun_text(messages):
+    # What a model that ignores "no other text" appends after the requested answer: quizzes
+    # get an extra question and explanations until cut off, prose gets a closing remark
+    prompt = messages[-1]["content"] if messages else ""
+    quiz = re.search(r"Generate exactly (\d+) multiple-choice question", prompt)
+    if not quiz:
+        return "\n\nI hope this explanation helps you in your studies. Let me know if you have any other questions!"
+    extra = f"\n{int(quiz.group(1)) + 1}. An extra question nobody asked for?\nA) One\nB) Two\nC) Three\nD) Four\nCorrect Answer: A\n"
+    return extra + "\nExplanation: the correct option follows directly from the definition of the topic." * 200
+
+
+def fake_completion_text(messages):
+    prompt = messages[-1]["content"] if messages else ""
+    quiz = re.search(r"Generate exactly (\d+) multiple-choice question", prompt)
+    if quiz:
+        part = re.search(r"part (\d+) of a larger quiz", prompt)
+        return fake_quiz(int(quiz.group(1)), int(part.group(1)) if part else 1)
+    topic = re.search(r"topic '([^']*)'", prompt)
+    topic = topic.group(1) if topic else "this topic"
+    sentence = f"This is a sample explanation of {topic} for testing. "
+    return sentence * 12
+
+
+class MockInferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # Health check used by connectivity probes
+        self._send_json(200, {"status": "ok"})
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get("Content-Length", "0"))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.request_count += 1
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+
+        latency = max(0.0, random.gauss(config["latency"], config["jitter"]))
+        if random.random() < config["tail_rate"]:
+            latency += config["tail_latency"] # An occasional stalled request, as on a busy provider
+        if random.random() < config["error_rate"]:
+            time.sleep(latency / 2)
+            status = random.choice([429, 500, 503])
+            self._send_json(status, {"error": f"mock failure {status}"})
+            return
+
+        text = fake_completion_text(request.get("messages", []))
+        if config["overrun"]:
+            text += fake_overrun_text(request.get("messages", []))
+        stops = request.get("stop") or []
+        for stop in [stops] if isinstance(stops, str) else stops:
+            if stop in text:
+                text = text[:text.index(stop)]
+        words = re.findall(r"\S+\s*", text)
+        max_tokens = request.get("max_tokens")
+        finish_reason = "stop"
+        if max_tokens and len(words) > max_tokens:
+            words = words[:max_tokens]
+            finish_reason = "length"
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in request.get("messages", []))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(words),
+            "total_tokens": prompt_tokens + len(words),
+        }
+        completion_id = f"mock-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "mock-model")
+
+        if not request.get("stream"):
+            time.sleep(latency + config["token_interval"] * len(words))
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(words)},
+                    "finish_reason": finish_reason,
+                }],
+                "usage": usage,
+            })
+            return
+
+        # Streamed response: first token after `latency`, then one word per token_interval
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        time.sleep(latency)
+        try:
+            for i, word in enumerate(words):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}],
+                }
+                if i == len(words) - 1:
+                    chunk["choices"][0]["finish_reason"] = finish_reason
+                    chunk["usage"] = usage
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if config["token_interval"]:
+                    time.sleep(config["token_interval"])
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client cancelled the stream (e.g. the losing side of a hedged request)
+        self.close_connection = True
+
+
+def start_server(port=0, latency=0.2, jitter=0.05, error_rate=0.0, token_interval=0.0, host="127.0.0.1",
+                 overrun=False, tail_rate=0.0, tail_latency=5.0):
+    # Start the stub in a daemon thread; returns the server (its URL is server.url)
+    server = ThreadingHTTPServer((host, port), MockInferenceHandler)
+    server.daemon_threads = True
+    server.config = {
+        "latency": latency,
+        "jitter": jitter,
+        "error_rate": error_rate,
+        "token_interval": token_interval,
+        "overrun": overrun,
+        "tail_rate": tail_rate,
+        "tail_latency": tail_latency,
+    }
+    server.lock = threading.Lock()
+    server.request_count = 0
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub for the Hugging Face chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail with 429/5xx")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fraction of requests that stall")
+    parser.add_argument("--tail-latency", type=float, default=5.0, help="Extra seconds a stalled request takes")
+    parser.add_argument("--overrun", action="store_true", help="Keep generating past the answer until max_tokens or a stop sequence")
+    args = parser.parse_args()
+    server = start_server(
+        args.port, args.latency, args.jitter, args.error_rate, args.token_interval, args.host, args.overrun,
+        args.tail_rate, args.tail_latency,
+    )
+    print(f"Mock inference API listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
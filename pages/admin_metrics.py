@@ -0,0 +1,63 @@
+import streamlit as st
+import hmac
+import os
+import time
+from metrics import METRICS_DB_PATH, MetricsStore
+
+# --- Admin metrics page: latency percentiles, token spend and cache hit rates ---
+# Only shown when CLASSGPT_ADMIN_PASSWORD is set, and only after entering it.
+ADMIN_PASSWORD = os.getenv("CLASSGPT_ADMIN_PASSWORD", "")
+WINDOWS = {"Last hour": 3600, "Last 24 hours": 24 * 3600, "Last 7 days": 7 * 24 * 3600, "All": None}
+
+st.set_page_config(page_title="ClassGPT – Metrics", layout="wide")
+st.markdown("## 📈 Generation Metrics")
+
+if not ADMIN_PASSWORD:
+    st.info("Set CLASSGPT_ADMIN_PASSWORD to enable the metrics page.")
+    st.stop()
+
+if not st.session_state.get("admin_authenticated"):
+    password = st.text_input("Admin password", type="password")
+    if password and hmac.compare_digest(password.encode("utf-8"), ADMIN_PASSWORD.encode("utf-8")):
+        st.session_state.admin_authenticated = True
+        st.rerun()
+    if password:
+        st.error("Wrong password.")
+    st.stop()
+
+
+@st.cache_resource
+def get_metrics_store():
+    return MetricsStore(METRICS_DB_PATH)
+
+
+store = get_metrics_store()
+window = st.selectbox("Time window", list(WINDOWS), index=1)
+since = time.time() - WINDOWS[window] if WINDOWS[window] else None
+summary = store.summary(since)
+
+if not summary:
+    st.info("No requests recorded in this window yet.")
+    st.stop()
+
+requests = sum(row["requests"] for row in summary)
+api_requests = sum(row["api_requests"] for row in summary)
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Requests", requests)
+col2.metric("Cache hit rate", f"{1 - api_requests / requests:.0%}")
+col3.metric("Prompt tokens", sum(row["prompt_tokens"] for row in summary))
+col4.metric("Completion tokens", sum(row["completion_tokens"] for row in summary))
+
+st.markdown("### Per task and language")
+st.caption("Latencies in seconds, for requests that went to the API (cache hits are excluded).")
+st.dataframe(summary)
+
+st.markdown("### Per provider route")
+st.caption("Slow or failing routes are also skipped automatically; see provider_router.py.")
+st.dataframe(store.route_summary(since))
+
+with st.expander("Prometheus export"):
+    exposition = store.prometheus_text(since)
+    st.download_button("Download metrics.prom", exposition, file_name="metrics.prom")
+    st.code(exposition, language="text")
+    st.caption("Scrape it continuously with `python metrics.py --serve 9464`.")
@@ -0,0 +1,96 @@
+import streamlit as st
+import asyncio
+import csv
+import hashlib
+import hmac
+import os
+from batch_generate import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_REQUESTS_PER_SECOND,
+    load_jobs,
+    parse_job_rows,
+    run_batch,
+)
+from response_cache import ResponseCache
+
+# --- Batch generation page for teachers preparing a whole term of material ---
+# Results are written under CLASSGPT_BATCH_DIR, named after the uploaded file's contents,
+# so uploading the same plan again resumes where the previous run stopped. Every job is
+# an API call, so the page is only shown when CLASSGPT_ADMIN_PASSWORD is set, and only
+# after entering it (like the metrics page).
+ADMIN_PASSWORD = os.getenv("CLASSGPT_ADMIN_PASSWORD", "")
+BATCH_DIR = os.getenv("CLASSGPT_BATCH_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "batch_runs"))
+
+st.set_page_config(page_title="ClassGPT – Batch Generation", layout="centered")
+st.markdown("## 🗂️ Batch Generation")
+
+if not ADMIN_PASSWORD:
+    st.info("Set CLASSGPT_ADMIN_PASSWORD to enable batch generation.")
+    st.stop()
+
+if not st.session_state.get("admin_authenticated"):
+    password = st.text_input("Admin password", type="password")
+    if password and hmac.compare_digest(password.encode("utf-8"), ADMIN_PASSWORD.encode("utf-8")):
+        st.session_state.admin_authenticated = True
+        st.rerun()
+    if password:
+        st.error("Wrong password.")
+    st.stop()
+
+st.markdown(
+    "Upload a CSV or JSON file with the columns `topic`, `task` (explain_it, generate_quiz, "
+    "summarize_topic), `language` (English, Hausa, Arabic), `level` (primary, secondary, tertiary) "
+    "and `num_questions`."
+)
+
+
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+
+uploaded = st.file_uploader("Job list", type=["csv", "json", "jsonl"])
+concurrency = st.number_input("Concurrent requests", min_value=1, max_value=32, value=DEFAULT_CONCURRENCY)
+rate = st.number_input("Requests per second (per provider)", min_value=0.0, value=DEFAULT_REQUESTS_PER_SECOND, step=0.5)
+max_retries = st.number_input("Retries per job", min_value=0, max_value=10, value=DEFAULT_MAX_RETRIES)
+
+if uploaded is not None:
+    raw = uploaded.getvalue()
+    extension = os.path.splitext(uploaded.name)[1].lower()
+    try:
+        jobs, errors = load_jobs(parse_job_rows(raw.decode("utf-8-sig"), extension))
+    except (ValueError, TypeError, KeyError, csv.Error) as e:
+        st.error(f"Could not read {uploaded.name}: {e}")
+        st.stop()
+    for error in errors:
+        st.warning(f"Skipping {error}")
+    st.write(f"{len(jobs)} unique jobs found.")
+
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    output_path = os.path.join(BATCH_DIR, hashlib.sha256(raw).hexdigest()[:16] + ".jsonl")
+
+    if st.button("Start / Resume Batch") and jobs:
+        progress = st.progress(0.0)
+        status = st.empty()
+
+        def on_result(record, summary):
+            finished = summary["skipped"] + summary["ok"] + summary["parse_failed"] + summary["error"]
+            progress.progress(finished / summary["total"])
+            status.text(f"{finished}/{summary['total']} – {record['status']}: {record['topic']} ({record['language']})")
+
+        summary = asyncio.run(run_batch(
+            jobs, output_path,
+            concurrency=int(concurrency),
+            requests_per_second=float(rate),
+            max_retries=int(max_retries),
+            cache=get_response_cache(),
+            on_result=on_result,
+        ))
+        progress.progress(1.0)
+        st.success(f"Done: {summary['ok']} ok, {summary['parse_failed']} unparsable quizzes, "
+                   f"{summary['error']} failed, {summary['skipped']} already completed.")
+
+    if os.path.exists(output_path):
+        with open(output_path, "rb") as f:
+            st.download_button("Download results (JSONL)", f.read(), file_name=os.path.splitext(uploaded.name)[0] + ".results.jsonl")
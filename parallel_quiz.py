@@ -0,0 +1,124 @@
+import dataclasses
+import hashlib
+import re
+import unicodedata
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from prompts import TEMPERATURE, TOP_P, build_quiz_part_messages, max_tokens_for, stop_sequences_for
+from quiz_parser import parse_quiz
+from translations import translations
+
+# --- Parallel quiz generation ---
+# Instead of one long request for all questions, issue several small requests (one or
+# two questions each) at once and parse each as it lands. Wall-clock time then tracks
+# the slowest single small request, and one malformed answer only costs its own slice.
+# Near-duplicate questions are rejected and replacement requests top the quiz up.
+
+QUESTIONS_PER_REQUEST = 1
+MAX_EXTRA_REQUESTS = 4 # Replacement requests allowed on top of the initial fan-out
+
+
+def question_fingerprint(question_text):
+    # Case, punctuation, diacritics and word order do not make a question new
+    text = unicodedata.normalize("NFKD", question_text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    words = sorted(set(re.findall(r"\w+", text)))
+    return hashlib.sha1(" ".join(words).encode("utf-8")).hexdigest()
+
+
+def generate_parallel_quiz(client, model, topic, language, level_index, num_questions,
+                           questions_per_request=QUESTIONS_PER_REQUEST, max_extra_requests=MAX_EXTRA_REQUESTS,
+                           on_question=None, executor=None, budget=None):
+    # Returns (questions, stats); on_question(question) is called as each accepted question arrives.
+    # With a token_budget.TokenBudget, max_tokens follows (and learns) the observed question size.
+    extra_labels = (translations[language]["quiz_correct_answer"],)
+    accepted = []
+    seen = set()
+    stats = {"requests": 0, "failed_requests": 0, "duplicates": 0, "unparsable": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    question_counts = {} # future -> questions it asked for
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ThreadPoolExecutor(max_workers=num_questions + max_extra_requests)
+
+    def submit(count, part_index):
+        messages = build_quiz_part_messages(
+            topic, language, level_index, count, part_index,
+            avoid_questions=[q.question for q in accepted],
+        )
+        stats["requests"] += 1
+        future = executor.submit(
+            client.chat.completions.create,
+            model=model,
+            messages=messages,
+            max_tokens=(budget.max_tokens if budget is not None else max_tokens_for)("generate_quiz", language, count),
+            temperature=TEMPERATURE,
+            top_p=TOP_P,
+            stop=stop_sequences_for("generate_quiz", count),
+        )
+        question_counts[future] = count
+        return future
+
+    try:
+        in_flight = set()
+        part_index = 0
+        remaining = num_questions
+        while remaining > 0:
+            count = min(questions_per_request, remaining)
+            in_flight.add(submit(count, part_index))
+            part_index += 1
+            remaining -= count
+        extra_budget = max_extra_requests
+        last_error = None
+
+        while in_flight and len(accepted) < num_questions:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    completion = future.result()
+                except Exception as e:
+                    stats["failed_requests"] += 1
+                    last_error = e
+                    continue
+                output = completion.choices[0].message.content or ""
+                usage = getattr(completion, "usage", None)
+                stats["prompt_tokens"] += getattr(usage, "prompt_tokens", None) or 0
+                stats["completion_tokens"] += getattr(usage, "completion_tokens", None) or 0
+                if budget is not None:
+                    budget.observe(
+                        "generate_quiz", language, question_counts[future], getattr(usage, "completion_tokens", None),
+                        truncated=completion.choices[0].finish_reason == "length",
+                    )
+                questions, _ = parse_quiz(output, extra_labels=extra_labels)
+                if not questions:
+                    stats["unparsable"] += 1
+                for question in questions:
+                    fingerprint = question_fingerprint(question.question)
+                    if fingerprint in seen:
+                        stats["duplicates"] += 1
+                        continue
+                    if len(accepted) >= num_questions:
+                        break
+                    seen.add(fingerprint)
+                    accepted.append(question)
+                    if on_question is not None:
+                        on_question(question)
+
+            # Top up when the requests still in flight cannot fill the quiz
+            shortfall = num_questions - len(accepted) - questions_per_request * len(in_flight)
+            while shortfall > 0 and extra_budget > 0:
+                count = min(questions_per_request, shortfall)
+                in_flight.add(submit(count, part_index))
+                part_index += 1
+                extra_budget -= 1
+                shortfall -= count
+
+        for future in in_flight:
+            future.cancel() # Not started yet; anything already running is simply ignored
+        if not accepted and last_error is not None:
+            raise last_error
+    finally:
+        if owns_executor:
+            executor.shutdown(wait=False)
+
+    accepted = [dataclasses.replace(question, number=n) for n, question in enumerate(accepted, start=1)]
+    return accepted, stats
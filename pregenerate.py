@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+
+from batch_generate import DEFAULT_CONCURRENCY, DEFAULT_MAX_RETRIES, DEFAULT_REQUESTS_PER_SECOND, load_jobs, run_batch
+from content_index import CONTENT_INDEX_PATH, ContentIndex
+from llm_client import HF_LLAMA3_MODEL
+from prompts import TASK_IDS
+from translations import LANGUAGES, LEVEL_KEYS
+
+# --- Offline pre-generation of a curriculum topic catalog ---
+# Expands a topic list into every task x language x level, generates the content with
+# batch_generate.run_batch (resumable JSONL) and loads the successful results into the
+# content index the app serves from first.
+#
+#     python pregenerate.py curriculum.csv --index content_index.sqlite3
+#
+# The catalog is a CSV with a `topic` column and an optional `aliases` column
+# (alternative spellings or translations separated by "|"), or a plain text file with
+# one topic per line in the same "topic | alias | alias" form.
+
+DEFAULT_QUIZ_QUESTIONS = 5 # Smaller quiz requests are served from the first N questions
+
+
+def read_catalog(path):
+    # Returns [(topic, [aliases])]
+    entries = []
+    with open(path, encoding="utf-8-sig") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                topic = (row.get("topic") or "").strip()
+                aliases = [a.strip() for a in (row.get("aliases") or "").split("|") if a.strip()]
+                if topic:
+                    entries.append((topic, aliases))
+        else:
+            for line in f:
+                names = [name.strip() for name in line.split("|") if name.strip()]
+                if names and not names[0].startswith("#"):
+                    entries.append((names[0], names[1:]))
+    return entries
+
+
+def expand_jobs(topics, tasks=TASK_IDS, languages=LANGUAGES, levels=range(len(LEVEL_KEYS)),
+                quiz_questions=DEFAULT_QUIZ_QUESTIONS):
+    return [
+        {
+            "topic": topic,
+            "task": task_id,
+            "language": language,
+            "level": level_index,
+            "num_questions": quiz_questions if task_id == "generate_quiz" else 1,
+        }
+        for topic in topics
+        for task_id in tasks
+        for language in languages
+        for level_index in levels
+    ]
+
+
+def import_results(index, results_path, model=HF_LLAMA3_MODEL):
+    imported = 0
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue # A line cut short when a previous run was killed
+            if record.get("status") != "ok":
+                continue
+            index.put(
+                record["topic"], record["task"], record["language"], record["level_index"],
+                record["num_questions"], record["output"], model=model,
+            )
+            imported += 1
+    return imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate ClassGPT content for a curriculum topic catalog")
+    parser.add_argument("catalog", help="CSV (topic, aliases) or text file (topic | alias | ...)")
+    parser.add_argument("--index", default=CONTENT_INDEX_PATH, help="SQLite content index to build or extend")
+    parser.add_argument("--results", help="Resumable JSONL of raw results (default: <index>.jobs.jsonl)")
+    parser.add_argument("--tasks", nargs="+", default=list(TASK_IDS), choices=TASK_IDS)
+    parser.add_argument("--languages", nargs="+", default=list(LANGUAGES), choices=LANGUAGES)
+    parser.add_argument("--levels", nargs="+", type=int, default=list(range(len(LEVEL_KEYS))), choices=range(len(LEVEL_KEYS)))
+    parser.add_argument("--quiz-questions", type=int, default=DEFAULT_QUIZ_QUESTIONS, choices=range(1, 6))
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_REQUESTS_PER_SECOND)
+    parser.add_argument("--retries", type=int, default=DEFAULT_MAX_RETRIES)
+    parser.add_argument("--model", default=HF_LLAMA3_MODEL)
+    parser.add_argument("--base-url", help="OpenAI-compatible server to use instead of the HF router")
+    parser.add_argument("--import-only", action="store_true", help="Only load an existing results file into the index")
+    args = parser.parse_args(argv)
+
+    results_path = args.results or os.path.splitext(args.index)[0] + ".jobs.jsonl"
+    catalog = read_catalog(args.catalog)
+    index = ContentIndex(args.index)
+    for topic, aliases in catalog:
+        index.add_topic(topic, aliases)
+
+    if not args.import_only:
+        rows = expand_jobs([topic for topic, _ in catalog], args.tasks, args.languages, args.levels, args.quiz_questions)
+        jobs, errors = load_jobs(rows, model=args.model)
+        for error in errors:
+            print(f"Skipping {error}", file=sys.stderr)
+        print(f"{len(catalog)} topics -> {len(jobs)} generation jobs")
+
+        def report(record, summary):
+            finished = summary["ok"] + summary["parse_failed"] + summary["error"]
+            print(f"[{finished}/{summary['total'] - summary['skipped']}] {record['status']:<12} "
+                  f"{record['task']:<16} {record['language']:<8} L{record['level_index']} {record['topic']}")
+
+        summary = asyncio.run(run_batch(
+            jobs, results_path,
+            concurrency=args.concurrency,
+            requests_per_second=args.rate,
+            max_retries=args.retries,
+            model=args.model,
+            base_url=args.base_url,
+            on_result=report,
+        ))
+        print(json.dumps(summary))
+
+    if os.path.exists(results_path):
+        imported = import_results(index, results_path, model=args.model)
+        index.compact()
+        print(f"Imported {imported} results into {args.index}: {json.dumps(index.stats())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
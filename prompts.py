@@ -0,0 +1,167 @@
+from response_cache import make_cache_key
+import math
+import os
+from functools import lru_cache
+
+from translations import LEVEL_KEYS, TASK_KEYS, translations
+
+# --- Prompt construction shared by the app and the batch tools ---
+TASK_IDS = TASK_KEYS
+
+# Sampling parameters used for every generation
+TEMPERATURE = 0.7
+TOP_P = 0.9
+
+# "compact" prompts carry the same instructions in far fewer tokens; "full" keeps the
+# original wording (CLASSGPT_PROMPT_STYLE=full) for comparison
+PROMPT_STYLE = os.getenv("CLASSGPT_PROMPT_STYLE", "compact")
+
+# --- Output token budgets ---
+# Expected output tokens per unit (one quiz question, or a whole explanation/summary) in
+# English, before any completions have been observed (see token_budget.TokenBudget)
+OUTPUT_TOKENS_PER_UNIT = {"explain_it": 480, "summarize_topic": 240, "generate_quiz": 80}
+# Hausa and Arabic need more Llama 3 tokens for the same text than English
+LANGUAGE_TOKEN_FACTOR = {"English": 1.0, "Hausa": 1.4, "Arabic": 1.6}
+MAX_TOKENS_HEADROOM = 1.25 # An answer slightly longer than expected is not cut off
+MIN_MAX_TOKENS = 64
+MAX_MAX_TOKENS = 2048
+
+
+def output_units(task_id, num_questions=1):
+    return num_questions if task_id == "generate_quiz" else 1
+
+
+def clamp_max_tokens(tokens):
+    return max(MIN_MAX_TOKENS, min(MAX_MAX_TOKENS, int(math.ceil(tokens))))
+
+
+def max_tokens_for(task_id, language="English", num_questions=1):
+    # Output budget sized to the expected answer rather than a fixed 1500/700
+    per_unit = OUTPUT_TOKENS_PER_UNIT[task_id] * LANGUAGE_TOKEN_FACTOR.get(language, 1.0)
+    return clamp_max_tokens(per_unit * output_units(task_id, num_questions) * MAX_TOKENS_HEADROOM)
+
+
+def stop_sequences_for(task_id, num_questions=1):
+    # A quiz is finished once the model starts numbering one question too many
+    if task_id != "generate_quiz":
+        return None
+    return [f"\n{num_questions + 1}.", f"\n{num_questions + 1})"]
+
+
+def level_text_for(language, level_index):
+    # The level is described to the model in the output language, as shown in the UI
+    return translations[language][LEVEL_KEYS[level_index]]
+
+
+# Prompt templates are filled with str.format; only the requested task's template is used
+SYSTEM_PROMPT_TEMPLATE = """You are ClassGPT, an expert educational tutor and assistant.
+Your primary goal is to provide clear, concise, and accurate educational content for students.
+You are fluent in English, Hausa, and Arabic.
+Strictly adhere to the requested output language. **Do NOT include any English words or phrases in your output unless they are proper nouns (e.g., 'Google', 'Nigeria') or universally accepted scientific terms without a common translation.**
+Explain concepts in simple terms suitable for learners at a {level_text} level.
+"""
+USER_PROMPT_TEMPLATES = {
+    "explain_it": """Explain the topic '{topic}' in simple and easy-to-understand terms.
+Ensure the explanation is appropriate for a {level_text} student level.
+Use clear and concise sentences.
+Provide concrete examples relevant to everyday life in Nigeria if applicable.
+The entire explanation MUST be in {language}.
+""",
+    "generate_quiz": """Generate exactly {num_questions} multiple-choice questions about the topic '{topic}'.
+Ensure questions are appropriate for a {level_text} student level.
+Each question and all its options MUST be in {language}.
+For each question, provide 4 options, labeled A, B, C, D.
+After the options for each question, explicitly state the correct answer on a new line in the format: "Correct Answer: [Option Letter]".
+DO NOT provide explanations for the answers or any additional text apart from the questions, options, and correct answers.
+
+Example Format for a single question:
+1. What is the capital of France?
+A) Berlin
+B) Paris
+C) Rome
+D) Madrid
+Correct Answer: B
+
+2. What is the largest planet in our solar system?
+A) Mars
+B) Earth
+C) Jupiter
+D) Venus
+Correct Answer: C
+""",
+    "summarize_topic": """Provide a concise summary of the topic '{topic}'.
+Focus only on the most critical information relevant to a {level_text} student.
+The summary MUST be in {language}.
+Keep the summary to a maximum of 150 words or 3 paragraphs, whichever is shorter.
+"""
+}
+
+# The same instructions, trimmed: the level and language are stated once in the system
+# prompt and the quiz format is shown with one skeleton question instead of two examples
+COMPACT_SYSTEM_PROMPT_TEMPLATE = """You are ClassGPT, a tutor for {level_text} students.
+Write only in {language}; use English only for proper nouns and scientific terms with no common translation.
+Keep it simple, clear and accurate.
+"""
+COMPACT_USER_PROMPT_TEMPLATES = {
+    "explain_it": """Explain the topic '{topic}' simply, with everyday examples from Nigeria where relevant.
+""",
+    "generate_quiz": """Generate exactly {num_questions} multiple-choice questions about the topic '{topic}' in this format, with no explanations or other text:
+1. Question?
+A) ...
+B) ...
+C) ...
+D) ...
+Correct Answer: B
+""",
+    "summarize_topic": """Summarize the topic '{topic}' in at most 150 words (3 short paragraphs), keeping only the essentials.
+""",
+}
+PROMPT_TEMPLATES = {
+    "full": (SYSTEM_PROMPT_TEMPLATE, USER_PROMPT_TEMPLATES),
+    "compact": (COMPACT_SYSTEM_PROMPT_TEMPLATE, COMPACT_USER_PROMPT_TEMPLATES),
+}
+
+
+@lru_cache(maxsize=None)
+def system_prompt_for(language, level_index, style=PROMPT_STYLE):
+    # System prompt is dependent on the educational level; there are only 3 x 3 of them
+    return PROMPT_TEMPLATES[style][0].format(level_text=level_text_for(language, level_index), language=language)
+
+
+def build_messages(task_id, topic, language, level_index, num_questions=1, style=PROMPT_STYLE):
+    user_prompt = PROMPT_TEMPLATES[style][1][task_id].format(
+        topic=topic,
+        language=language,
+        level_text=level_text_for(language, level_index),
+        num_questions=num_questions,
+    )
+    return [
+        {"role": "system", "content": system_prompt_for(language, level_index, style)},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def build_quiz_part_messages(topic, language, level_index, num_questions, part_index, avoid_questions=(),
+                             style=PROMPT_STYLE):
+    # One small slice of a larger quiz, generated in parallel with the other slices
+    messages = build_messages("generate_quiz", topic, language, level_index, num_questions, style)
+    extra = f"\nThese questions are part {part_index + 1} of a larger quiz; focus on a different aspect of '{topic}' than an obvious first question would.\n"
+    if avoid_questions:
+        extra += "Do NOT repeat or rephrase any of these questions:\n" + "".join(f"- {q}\n" for q in avoid_questions)
+    messages[-1]["content"] += extra
+    return messages
+
+
+def request_cache_key(model, task_id, topic, language, level_index, num_questions=1):
+    # Same key for the app and the batch tools, so pre-generated answers are cache hits
+    return make_cache_key(
+        model=model,
+        task=task_id,
+        topic=topic,
+        language=language,
+        level_index=level_index,
+        num_questions=num_questions if task_id == "generate_quiz" else 1,
+        prompt_style=PROMPT_STYLE,
+        temperature=TEMPERATURE,
+        top_p=TOP_P,
+    )
@@ -0,0 +1,312 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from llm_client import HF_BASE_URL, HF_LLAMA3_MODEL, HF_PROVIDER, make_client
+from local_backend import LOCAL_MODEL_PATH, shared_backend
+
+# --- Routing over several inference providers/models ---
+# A Router looks like an InferenceClient (router.chat.completions.create(...)), so the app,
+# generation.py and parallel_quiz.py use it unchanged. Each request goes to the healthiest
+# route (lowest observed latency, weighted by error rate). If no response (or, for streams,
+# no first token) has arrived after that route's p95 latency, a hedged duplicate is sent to
+# the next route; the first good response wins and the loser is closed. Only streams are
+# hedged: a non-stream call cannot be cancelled once sent, so a losing duplicate would run
+# to completion and still spend the provider's quota. Routes that keep
+# failing are skipped by a circuit breaker until a cooldown has passed.
+#
+#     CLASSGPT_ROUTES="sambanova, together@meta-llama/Llama-3.3-70B-Instruct, http://127.0.0.1:8765"
+#
+# Entries are a provider name or an OpenAI-compatible base URL, optionally followed by
+# "@model" to use a different model on that route. Without CLASSGPT_ROUTES the single
+# HF_BASE_URL / HF_PROVIDER route is used. Hedges only go to a route that is not already
+# working on the request, so a single route is never sent duplicates; failed attempts are
+# still retried on it.
+#
+# "local" (or "local@/path/to/model.gguf") is the CPU model of local_backend.py. When
+# CLASSGPT_LOCAL_MODEL is set it is added after the remote route automatically: a remote
+# route that cannot be reached fails over to it at once, opens its circuit and leaves the
+# local model to serve everything until the network is back. It is ranked by its own
+# latency scaled by how busy its queue is, so it also takes over when it is faster.
+ROUTES_SPEC = os.getenv("CLASSGPT_ROUTES", "")
+ROUTE_TIMEOUT_SECONDS = float(os.getenv("CLASSGPT_ROUTE_TIMEOUT", "60"))
+HEDGE_ENABLED = os.getenv("CLASSGPT_HEDGING", "1") != "0"
+HEDGE_DEFAULT_DELAY = 2.0 # Seconds before a hedge while a route has too few samples for a p95
+HEDGE_MIN_DELAY = 0.05
+HEDGE_MIN_SAMPLES = 10
+MAX_ATTEMPTS = 3 # Original request plus hedges and failovers
+LATENCY_WINDOW = 100 # Recent successful latencies kept per route
+ERROR_RATE_ALPHA = 0.2 # Weight of the newest outcome in the error-rate moving average
+UNKNOWN_LATENCY = 1.0 # Assumed latency of a route that has not answered yet
+LOCAL_UNKNOWN_LATENCY = 10.0 # The same for the CPU model
+BREAKER_FAILURES = 5 # Consecutive failures that open the circuit
+BREAKER_COOLDOWN_SECONDS = 30.0
+LOCAL_ROUTE = "local"
+
+
+def parse_routes(spec, default_model=HF_LLAMA3_MODEL):
+    # Returns [(name, provider, base_url, model)]
+    routes = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        target, model = entry.rsplit("@", 1) if "@" in entry else (entry, default_model)
+        if target == LOCAL_ROUTE:
+            routes.append((entry, LOCAL_ROUTE, None, model if "@" in entry else LOCAL_MODEL_PATH))
+        elif target.startswith(("http://", "https://")):
+            routes.append((entry, None, target, model))
+        else:
+            routes.append((entry, target, None, model))
+    return routes
+
+
+def default_routes(default_model=HF_LLAMA3_MODEL):
+    if ROUTES_SPEC.strip():
+        return parse_routes(ROUTES_SPEC, default_model)
+    if HF_BASE_URL:
+        routes = [(HF_BASE_URL, None, HF_BASE_URL, default_model)]
+    else:
+        routes = [(HF_PROVIDER, HF_PROVIDER, None, default_model)]
+    if LOCAL_MODEL_PATH:
+        routes.append((LOCAL_ROUTE, LOCAL_ROUTE, None, LOCAL_MODEL_PATH))
+    return routes
+
+
+class Route:
+    unknown_latency = UNKNOWN_LATENCY # Assumed until the route has answered
+
+    def __init__(self, name, client, model=None):
+        self.name = name
+        self.client = client
+        self.model = model # None keeps the caller's model
+        # Seconds to the full response, and to the first token of streams, kept apart
+        self.latencies = {False: deque(maxlen=LATENCY_WINDOW), True: deque(maxlen=LATENCY_WINDOW)}
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.opened_at = None # Circuit breaker: set while open
+        self.requests = 0
+        self.wins = 0
+        self._lock = threading.Lock()
+
+    # --- Health ---
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def record_success(self, latency, stream=False):
+        with self._lock:
+            self.latencies[stream].append(latency)
+            self.error_rate *= 1 - ERROR_RATE_ALPHA
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.error_rate = self.error_rate * (1 - ERROR_RATE_ALPHA) + ERROR_RATE_ALPHA
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= BREAKER_FAILURES:
+                self.opened_at = time.monotonic() # (Re)open; a failed half-open probe restarts the cooldown
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= BREAKER_COOLDOWN_SECONDS:
+            return "half_open" # Cooldown over: requests may probe it again, ranked last
+        return "open"
+
+    def latency_percentile(self, q, stream=False):
+        with self._lock:
+            samples = sorted(self.latencies[stream])
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+    def score(self, stream=False):
+        # Expected seconds to a good answer; lower is better
+        p50 = self.latency_percentile(50, stream)
+        return (self.unknown_latency if p50 is None else p50) * (1 + 4 * self.error_rate)
+
+    def hedge_delay(self, stream=False):
+        with self._lock:
+            enough = len(self.latencies[stream]) >= HEDGE_MIN_SAMPLES
+        if not enough:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, self.latency_percentile(95, stream))
+
+    def stats(self):
+        stats = {
+            "route": self.name,
+            "state": self.state,
+            "requests": self.requests,
+            "wins": self.wins,
+            "error_rate": round(self.error_rate, 3),
+        }
+        for stream, prefix in ((False, "latency"), (True, "ttft")):
+            for q in (50, 95):
+                value = self.latency_percentile(q, stream)
+                stats[f"{prefix}_p{q}"] = None if value is None else round(value, 3)
+        return stats
+
+
+class LocalRoute(Route):
+    # local_backend.LocalBackend on this machine's CPU. Its latency is scaled by how many
+    # requests are running or waiting per slot, and a full queue ranks it last. Until it has
+    # answered it is assumed slower than a remote provider, which stays first while healthy.
+    unknown_latency = LOCAL_UNKNOWN_LATENCY
+
+    def score(self, stream=False):
+        if self.client.full():
+            return float("inf")
+        return super().score(stream) * (1 + self.client.load())
+
+    def stats(self):
+        return dict(super().stats(), local=self.client.stats())
+
+
+class _Completions:
+    def __init__(self, router):
+        self._router = router
+
+    def create(self, **kwargs):
+        return self._router.create(**kwargs)
+
+
+class _Chat:
+    def __init__(self, router):
+        self.completions = _Completions(router)
+
+
+class Router:
+    def __init__(self, routes, hedging=HEDGE_ENABLED, max_attempts=MAX_ATTEMPTS, max_workers=32):
+        if not routes:
+            raise ValueError("at least one route is required")
+        self.routes = list(routes)
+        self.hedging = hedging
+        self.max_attempts = max_attempts
+        self.hedges = 0
+        self.failovers = 0
+        self.chat = _Chat(self)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="classgpt-route")
+        self._local = threading.local()
+        self._lock = threading.Lock() # Counters are updated from every caller's thread
+
+    @classmethod
+    def from_config(cls, routes=None, timeout=ROUTE_TIMEOUT_SECONDS, **kwargs):
+        routes = routes if routes is not None else default_routes()
+        return cls(
+            [LocalRoute(name, shared_backend(model)) if provider == LOCAL_ROUTE
+             else Route(name, make_client(provider=provider, base_url=base_url, timeout=timeout), model)
+             for name, provider, base_url, model in routes],
+            **kwargs,
+        )
+
+    @property
+    def last_route(self):
+        # Name of the route that answered this thread's most recent request
+        return getattr(self._local, "route", None)
+
+    def candidates(self, stream=False):
+        # Healthy routes by score; open circuits only when nothing else is left
+        available = [route for route in self.routes if route.state != "open"]
+        ranked = sorted(available, key=lambda route: (route.state == "half_open", route.score(stream)))
+        return ranked or sorted(self.routes, key=lambda route: route.opened_at)
+
+    def _attempt(self, route, kwargs):
+        route.record_request()
+        if route.model:
+            kwargs = dict(kwargs, model=route.model)
+        started = time.monotonic()
+        try:
+            completion = route.client.chat.completions.create(**kwargs)
+            first = None
+            if kwargs.get("stream"):
+                # A stream counts as answered once its first chunk arrives
+                completion = iter(completion)
+                first = next(completion, None)
+        except Exception:
+            route.record_failure()
+            raise
+        route.record_success(time.monotonic() - started, bool(kwargs.get("stream")))
+        return route, completion, first
+
+    @staticmethod
+    def _discard(future):
+        # Close a losing stream as soon as it produces anything
+        if future.cancelled() or future.exception() is not None:
+            return
+        _, completion, _ = future.result()
+        close = getattr(completion, "close", None)
+        if close is not None:
+            close()
+
+    def create(self, **kwargs):
+        self._local.route = None
+        stream = bool(kwargs.get("stream"))
+        candidates = self.candidates(stream)
+        in_flight = set()
+        tried = 0
+        last_error = None
+
+        def launch():
+            nonlocal tried
+            # Next untried route, or the best one again to retry after failures
+            route = candidates[tried] if tried < len(candidates) else candidates[0]
+            tried += 1
+            in_flight.add(self._executor.submit(self._attempt, route, kwargs))
+            return route
+
+        hedge_at = time.monotonic() + launch().hedge_delay(stream)
+        while in_flight:
+            can_launch = tried < self.max_attempts
+            # A hedge on a route that is already working on the request would only double its load,
+            # and a non-stream loser cannot be closed
+            can_hedge = self.hedging and stream and can_launch and tried < len(candidates)
+            timeout = max(0.0, hedge_at - time.monotonic()) if can_hedge else None
+            done, in_flight = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    route, completion, first = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                for loser in in_flight:
+                    if not loser.cancel():
+                        loser.add_done_callback(self._discard)
+                route.record_win()
+                self._local.route = route.name
+                if stream:
+                    return self._resume(first, completion)
+                return completion
+
+            if done and can_launch and (tried < len(candidates) or not in_flight):
+                # Every finished attempt failed: fail over without waiting for the hedge delay (a
+                # retry on an already tried route waits until nothing else is in flight)
+                with self._lock:
+                    self.failovers += 1
+                hedge_at = time.monotonic() + launch().hedge_delay(stream)
+            elif not done and can_hedge:
+                with self._lock:
+                    self.hedges += 1
+                hedge_at = time.monotonic() + launch().hedge_delay(stream)
+        raise last_error
+
+    @staticmethod
+    def _resume(first, rest):
+        if first is not None:
+            yield first
+        yield from rest
+
+    def stats(self):
+        return {
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "routes": [route.stats() for route in self.routes],
+        }
@@ -0,0 +1,194 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from parallel_quiz import question_fingerprint
+from quiz_parser import QuizQuestion
+from response_cache import normalize_topic
+
+# --- Question bank with spaced repetition ---
+# Every quiz a student is shown is split into questions and kept in SQLite, deduplicated by
+# question fingerprint and indexed by (topic, language, level). A new quiz is assembled from
+# the bank with one indexed query, so the API is only called once the bank runs out of
+# questions this student should see now. Per-student review state follows a Leitner
+# schedule: a wrong answer puts the question back in box 0 (due again right away), each
+# correct answer moves it up a box with a longer wait. Questions the student got wrong come
+# first, then ones they have never seen, then reviews that have come due.
+QUIZ_BANK_DB_PATH = os.getenv(
+    "CLASSGPT_QUIZ_BANK_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".classgpt_quiz_bank.sqlite3"),
+)
+# Seconds until a question in each box is due again
+REVIEW_INTERVALS = (0, 10 * 60, 60 * 60, 24 * 3600, 3 * 24 * 3600, 7 * 24 * 3600)
+REVIEW_RETENTION_DAYS = float(os.getenv("CLASSGPT_QUIZ_BANK_REVIEW_DAYS", "30")) # Review state of inactive students
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    topic_key TEXT NOT NULL,
+    language TEXT NOT NULL,
+    level_index INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    question TEXT NOT NULL,
+    letters TEXT NOT NULL,
+    options TEXT NOT NULL,
+    correct_answer TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    served INTEGER NOT NULL DEFAULT 0,
+    answered INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (topic_key, language, level_index, fingerprint)
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    learner TEXT NOT NULL,
+    question_id INTEGER NOT NULL,
+    box INTEGER NOT NULL,
+    due_at REAL NOT NULL,
+    lapses INTEGER NOT NULL DEFAULT 0,
+    last_answered_at REAL NOT NULL,
+    PRIMARY KEY (learner, question_id)
+) WITHOUT ROWID;
+"""
+
+# Due questions for one student: wrong ones first (most lapses, longest waiting), then
+# unseen ones (least served across students), then reviews that have come due
+ASSEMBLE_QUERY = """
+SELECT q.id, q.question, q.letters, q.options, q.correct_answer
+FROM questions q
+LEFT JOIN reviews r ON r.learner = ? AND r.question_id = q.id
+WHERE q.topic_key = ? AND q.language = ? AND q.level_index = ? AND (r.due_at IS NULL OR r.due_at <= ?)
+ORDER BY
+    CASE WHEN r.box = 0 THEN 0 WHEN r.box IS NULL THEN 1 ELSE 2 END,
+    r.lapses DESC, r.due_at, q.served, q.id
+LIMIT ?
+"""
+
+
+class QuizBank:
+    def __init__(self, path=QUIZ_BANK_DB_PATH, review_retention_days=REVIEW_RETENTION_DAYS):
+        self.path = path
+        self.dropped = 0 # Writes lost to SQLite errors; the bank must never fail a request
+        self._local = threading.local()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executescript(SCHEMA)
+                if review_retention_days:
+                    conn.execute("DELETE FROM reviews WHERE last_answered_at < ?", (time.time() - review_retention_days * 86400,))
+        except sqlite3.Error:
+            self.path = None # Unwritable location: every quiz then comes from the API, as before the bank
+
+    def _connect(self):
+        if not self.path:
+            raise sqlite3.OperationalError("quiz bank unavailable") # Callers already degrade on sqlite3.Error
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, topic, language, level_index, questions):
+        # Returns how many of `questions` were new to the bank
+        key = (normalize_topic(topic), language, level_index)
+        now = time.time()
+        rows = [
+            key + (question_fingerprint(q.question), q.question, q.letters, json.dumps(q.texts, ensure_ascii=False),
+                   q.correct_answer, now)
+            for q in questions
+        ]
+        try:
+            conn = self._connect()
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO questions (topic_key, language, level_index, fingerprint, question,"
+                    " letters, options, correct_answer, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                return conn.total_changes - before
+        except sqlite3.Error:
+            self.dropped += 1
+            return 0
+
+    def count(self, topic, language, level_index):
+        try:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM questions WHERE topic_key = ? AND language = ? AND level_index = ?",
+                (normalize_topic(topic), language, level_index),
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def assemble(self, learner, topic, language, level_index, num_questions, now=None):
+        # A quiz of num_questions questions that are due for this learner, or None when the
+        # bank does not have enough of them
+        now = time.time() if now is None else now
+        try:
+            conn = self._connect()
+            rows = conn.execute(
+                ASSEMBLE_QUERY, (learner, normalize_topic(topic), language, level_index, now, num_questions)
+            ).fetchall()
+            if len(rows) < num_questions:
+                return None
+            with conn:
+                conn.executemany("UPDATE questions SET served = served + 1 WHERE id = ?", [(row[0],) for row in rows])
+        except sqlite3.Error:
+            return None
+        return [
+            QuizQuestion(
+                number=n,
+                question=question,
+                letters=letters,
+                texts=tuple(json.loads(options)),
+                correct_answer=correct_answer,
+                diagnostics=(),
+            )
+            for n, (_, question, letters, options, correct_answer) in enumerate(rows, start=1)
+        ]
+
+    def record_answers(self, learner, topic, language, level_index, questions, answers, now=None):
+        # Per-question statistics and the learner's review schedule, from one submitted quiz
+        now = time.time() if now is None else now
+        key = (normalize_topic(topic), language, level_index)
+        try:
+            conn = self._connect()
+            with conn:
+                for question, answer in zip(questions, answers):
+                    row = conn.execute(
+                        "SELECT id FROM questions WHERE topic_key = ? AND language = ? AND level_index = ?"
+                        " AND fingerprint = ?",
+                        key + (question_fingerprint(question.question),),
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    correct = answer == question.correct_answer
+                    conn.execute(
+                        "UPDATE questions SET answered = answered + 1, correct = correct + ? WHERE id = ?",
+                        (int(correct), row[0]),
+                    )
+                    review = conn.execute(
+                        "SELECT box, lapses FROM reviews WHERE learner = ? AND question_id = ?", (learner, row[0])
+                    ).fetchone()
+                    box, lapses = review if review is not None else (0, 0)
+                    if correct:
+                        box = min(box + 1, len(REVIEW_INTERVALS) - 1)
+                    else:
+                        box, lapses = 0, lapses + 1
+                    conn.execute(
+                        "INSERT OR REPLACE INTO reviews (learner, question_id, box, due_at, lapses, last_answered_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (learner, row[0], box, now + REVIEW_INTERVALS[box], lapses, now),
+                    )
+        except sqlite3.Error:
+            self.dropped += 1
+
+    def stats(self):
+        try:
+            row = self._connect().execute("SELECT COUNT(*), SUM(served), SUM(answered), SUM(correct) FROM questions").fetchone()
+        except sqlite3.Error:
+            row = (0, 0, 0, 0)
+        return {"questions": row[0], "served": row[1] or 0, "answered": row[2] or 0, "correct": row[3] or 0}
@@ -0,0 +1,232 @@
+import re
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+
+# --- Line-oriented quiz parser ---
+# The LLM output is read one line at a time through a small state machine, so the
+# cost is linear in the input size and the parser can sit directly on a token stream.
+# Every pattern below is anchored and applied to a single (length-capped) line.
+
+# "Correct Answer" labels for every UI language, plus short forms the model sometimes uses
+CORRECT_ANSWER_LABELS = (
+    "Correct Answer",
+    "Correct Option",
+    "Answer",
+    "Amsa Daidai",
+    "Amsar Daidai",
+    "Amsa Madaidaiciya",
+    "Amsa",
+    "الإجابة الصحيحة",
+    "الاجابة الصحيحة",
+    "الإجابة",
+    "الاجابة",
+)
+
+OPTION_LETTERS = ("A", "B", "C", "D")
+# Arabic quizzes are sometimes lettered أ ب ج د instead of A B C D
+ARABIC_OPTION_LETTERS = {"أ": "A", "ب": "B", "ج": "C", "د": "D"}
+
+MAX_LINE_LENGTH = 2000  # Longer lines are truncated before matching
+MAX_DIAGNOSTICS = 20  # Per question; a runaway block should not grow without bound
+
+_LETTER = r"([A-Da-d]|[أبجد])"
+_SEPARATOR = r"(?:\s*[.):]|\s+-(?=\s))"  # "A)", "A.", "A:" or "A - "
+QUESTION_LINE = re.compile(r"^(?:Q(?:uestion)?\s*)?(\d{1,3})\s*[.):-]\s*(\S.*)$", re.IGNORECASE)
+OPTION_LINE = re.compile(r"^(?:\(" + _LETTER + r"\)|" + _LETTER + _SEPARATOR + r")\s*(.*)$")
+_MARKDOWN_PREFIX = re.compile(r"^[\s*_#>-]+")
+
+
+def _normalize_letter(letter):
+    return ARABIC_OPTION_LETTERS.get(letter, letter.upper())
+
+
+@lru_cache(maxsize=32)
+def _answer_pattern(labels):
+    # Compiled once per distinct label set and reused by every parser
+    # Longest labels first so "Correct Answer" wins over "Answer"
+    alternatives = "|".join(re.escape(label) for label in sorted(set(labels), key=len, reverse=True))
+    return re.compile(
+        r"^(?:" + alternatives + r")\s*[:：=-]\s*(?:\(" + _LETTER + r"\)|" + _LETTER + r")(?![A-Za-z])",
+        re.IGNORECASE,
+    )
+
+
+DEFAULT_ANSWER_LINE = _answer_pattern(CORRECT_ANSWER_LABELS)
+
+
+@dataclass(frozen=True)
+class QuizQuestion:
+    # Parsed quizzes are shared by every session that takes them (see content_store.py), so
+    # a question is a slotted, immutable record: the option letters are one interned string
+    # ("ABCD") and the option texts a tuple, instead of a per-question dict.
+    __slots__ = ("number", "question", "letters", "texts", "correct_answer", "diagnostics")
+    number: int
+    question: str
+    letters: str
+    texts: tuple
+    correct_answer: str
+    diagnostics: tuple  # Non-fatal problems found while parsing
+
+    @property
+    def options(self):
+        # {"A": text, ...} in letter order
+        return dict(zip(self.letters, self.texts))
+
+    def option_text(self, letter, default=None):
+        index = self.letters.find(letter) if letter else -1
+        return self.texts[index] if index >= 0 else default
+
+
+@dataclass
+class ParseIssue:
+    # A question block that had to be dropped, and why
+    number: int
+    question: str
+    reason: str
+
+
+class QuizParser:
+    def __init__(self, extra_labels=()):
+        extra_labels = tuple(label.strip().rstrip(":：").strip() for label in extra_labels if label)
+        if extra_labels and not set(extra_labels) <= set(CORRECT_ANSWER_LABELS):
+            self._answer_line = _answer_pattern(tuple(sorted(set(CORRECT_ANSWER_LABELS + extra_labels))))
+        else:
+            self._answer_line = DEFAULT_ANSWER_LINE
+        self.questions = []
+        self.issues = []
+        self._partial_line = []  # Pieces of the line currently being streamed
+        self._current = None  # The question block being filled in
+
+    # --- Streaming interface ---
+    def feed(self, chunk):
+        # Returns the questions completed by this chunk
+        completed_before = len(self.questions)
+        pieces = chunk.split("\n")
+        if len(pieces) == 1:
+            self._partial_line.append(chunk)
+        else:
+            self._partial_line.append(pieces[0])
+            self._process_line("".join(self._partial_line))
+            for line in pieces[1:-1]:
+                self._process_line(line)
+            self._partial_line = [pieces[-1]]
+        return self.questions[completed_before:]
+
+    def close(self):
+        completed_before = len(self.questions)
+        if self._partial_line:
+            self._process_line("".join(self._partial_line))
+            self._partial_line = []
+        if self._current is not None:
+            self._drop_current("no correct answer line")
+        return self.questions[completed_before:]
+
+    # --- State machine ---
+    def _process_line(self, line):
+        line = _MARKDOWN_PREFIX.sub("", line[:MAX_LINE_LENGTH].strip().replace("**", ""))
+        if not line:
+            return
+
+        answer = self._answer_line.match(line)
+        if answer:
+            self._finish_current(_normalize_letter(answer.group(1) or answer.group(2)))
+            return
+
+        if self._current is not None and self._current["options"]:
+            option = OPTION_LINE.match(line)
+            if option:
+                self._add_option(option)
+                return
+
+        question = QUESTION_LINE.match(line)
+        if question:
+            if self._current is not None:
+                self._drop_current("next question started before a correct answer line")
+            self._current = {
+                "number": int(question.group(1)),
+                "question": question.group(2).strip(),
+                "options": {},
+                "diagnostics": [],
+            }
+            return
+
+        if self._current is None:
+            return  # Preamble such as "Here is your quiz:"
+
+        option = OPTION_LINE.match(line)
+        if option:
+            self._add_option(option)
+        elif not self._current["options"]:
+            # Question text wrapped onto another line; capped so appending stays linear
+            if len(self._current["question"]) < MAX_LINE_LENGTH:
+                self._current["question"] = (self._current["question"] + " " + line)[:MAX_LINE_LENGTH]
+        else:
+            self._add_diagnostic(f"ignored line: {line[:60]}")
+
+    def _add_option(self, match):
+        letter = _normalize_letter(match.group(1) or match.group(2))
+        text = match.group(3).strip()
+        options = self._current["options"]
+        if letter in options:
+            if options[letter] == text:
+                self._add_diagnostic(f"duplicate option {letter} ignored")
+            else:
+                self._add_diagnostic(f"conflicting option {letter} ignored")
+            return
+        options[letter] = text
+
+    def _add_diagnostic(self, message):
+        if len(self._current["diagnostics"]) < MAX_DIAGNOSTICS:
+            self._current["diagnostics"].append(message)
+
+    def _finish_current(self, correct_answer):
+        current = self._current
+        if current is None:
+            return  # Stray answer line with no question before it
+        self._current = None
+        options = current["options"]
+        if not current["question"]:
+            self._record_issue(current, "empty question text")
+        elif len(options) < 2:
+            self._record_issue(current, f"only {len(options)} option(s)")
+        elif correct_answer not in options:
+            self._record_issue(current, f"correct answer {correct_answer} is not one of the options")
+        else:
+            missing = [letter for letter in OPTION_LETTERS if letter not in options]
+            if missing:
+                current["diagnostics"].append("missing option(s) " + ", ".join(missing))
+            letters = sorted(options)
+            self.questions.append(QuizQuestion(
+                number=current["number"],
+                question=current["question"],
+                letters=sys.intern("".join(letters)),
+                texts=tuple(options[letter] for letter in letters),
+                correct_answer=sys.intern(correct_answer),
+                diagnostics=tuple(current["diagnostics"]),
+            ))
+
+    def _drop_current(self, reason):
+        self._record_issue(self._current, reason)
+        self._current = None
+
+    def _record_issue(self, block, reason):
+        self.issues.append(ParseIssue(number=block["number"], question=block["question"][:200], reason=reason))
+
+
+def parse_quiz(raw_text, extra_labels=()):
+    parser = QuizParser(extra_labels)
+    parser.feed(raw_text)
+    parser.close()
+    return parser.questions, parser.issues
+
+
+def format_quiz(questions):
+    # Inverse of parse_quiz: renumbered questions in the format the prompt asks for
+    blocks = []
+    for n, q in enumerate(questions, start=1):
+        lines = [f"{n}. {q.question}"]
+        lines.extend(f"{letter}) {text}" for letter, text in zip(q.letters, q.texts))
+        lines.append(f"Correct Answer: {q.correct_answer}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks) + "\n"
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- Configuration for the response cache ---
+# The on-disk tier lives next to the app by default so every Streamlit worker
+# process on the same machine shares it.
+CACHE_DB_PATH = os.getenv(
+    "CLASSGPT_CACHE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".classgpt_cache.sqlite3"),
+)
+CACHE_TTL_SECONDS = float(os.getenv("CLASSGPT_CACHE_TTL", str(7 * 24 * 3600)))  # One week
+CACHE_MAX_BYTES = int(os.getenv("CLASSGPT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # In-process tier only
+CACHE_MAX_ENTRIES = int(os.getenv("CLASSGPT_CACHE_MAX_ENTRIES", "5000"))
+
+
+def normalize_topic(topic):
+    # "  Photosynthesis. " and "photosynthesis" should share a cache entry
+    topic = re.sub(r"\s+", " ", topic or "").strip()
+    topic = topic.strip(" .,;:!?؟،")
+    return topic.casefold()
+
+
+def make_cache_key(model, task, topic, language, level_index, num_questions, **sampling_params):
+    # Every input that changes the generated text must be part of the key
+    payload = json.dumps(
+        {
+            "model": model,
+            "task": task,
+            "topic": normalize_topic(topic),
+            "language": language,
+            "level_index": level_index,
+            "num_questions": num_questions,
+            "sampling": sampling_params,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryTier:
+    # Thread-safe LRU with a per-entry TTL and a total byte budget
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, max_entries=CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.current_bytes = 0
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, size = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.current_bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, expires_at):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return  # Never let one huge answer flush the whole tier
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            self._entries[key] = (value, expires_at, size)
+            self.current_bytes += size
+            while self._entries and (
+                self.current_bytes > self.max_bytes or len(self._entries) > self.max_entries
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def delete(self, key):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskTier:
+    # SQLite in WAL mode so several worker processes can read and write concurrently
+    PRUNE_EVERY = 200  # Writes between sweeps of expired rows
+
+    def __init__(self, path=CACHE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row  # (value, expires_at) or None
+
+    def put(self, key, value, expires_at):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, value, time.time(), expires_at),
+            )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def delete(self, key):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def prune(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+
+
+class ResponseCache:
+    # Two-tier cache in front of the Inference API: memory first, then SQLite
+    def __init__(self, db_path=CACHE_DB_PATH, ttl_seconds=CACHE_TTL_SECONDS,
+                 max_bytes=CACHE_MAX_BYTES, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.memory = MemoryTier(max_bytes=max_bytes, max_entries=max_entries)
+        try:
+            self.disk = DiskTier(db_path) if db_path else None
+        except sqlite3.Error:
+            self.disk = None  # Read-only filesystems still get the in-process tier
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._counter_lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            try:
+                row = self.disk.get(key)
+            except sqlite3.Error:
+                row = None
+            if row is not None:
+                value, expires_at = row
+                self.memory.put(key, value, expires_at)  # Promote to the faster tier
+                self._count("disk_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def put(self, key, value):
+        expires_at = time.time() + self.ttl_seconds
+        self.memory.put(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value, expires_at)
+            except sqlite3.Error:
+                pass  # A locked or full disk must never break a student's request
+        self._count("stores")
+
+    def invalidate(self, key):
+        self.memory.delete(key)
+        if self.disk is not None:
+            try:
+                self.disk.delete(key)
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.current_bytes,
+        }
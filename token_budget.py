@@ -0,0 +1,101 @@
+import math
+import os
+import re
+import threading
+from collections import defaultdict, deque
+from functools import lru_cache
+
+from llm_client import HF_API_KEY, HF_LLAMA3_MODEL
+from prompts import (
+    LANGUAGE_TOKEN_FACTOR,
+    MAX_TOKENS_HEADROOM,
+    OUTPUT_TOKENS_PER_UNIT,
+    clamp_max_tokens,
+    output_units,
+)
+
+# --- Local token counting and learned output budgets ---
+# Prompt and completion sizes are counted with the model's own tokenizer when the optional
+# `tokenizers` package is installed (tokenizer.json is fetched once from the Hub, and the
+# gated Llama 3 repos need HF_TOKEN); otherwise a script-aware character estimate is used.
+# TokenBudget learns how many output tokens a quiz question, explanation or summary
+# really takes per language and sizes max_tokens from that instead of the static priors.
+TOKENIZER_MODEL = os.getenv("CLASSGPT_TOKENIZER_MODEL", HF_LLAMA3_MODEL)
+MESSAGE_OVERHEAD_TOKENS = 5 # Llama 3 chat template: role header and end-of-turn markers
+BUDGET_WINDOW = 200 # Recent completions kept per task and language
+BUDGET_MIN_SAMPLES = 8 # Below this the static prior from prompts.py is used
+BUDGET_PERCENTILE = 95
+TRUNCATION_GROWTH = 1.5 # A completion cut off by max_tokens was longer than what we saw
+MAX_PRIOR_MULTIPLE = 3 # Repeated truncations cannot grow the budget past this multiple of the prior
+
+_ARABIC_SCRIPT = re.compile(r"[؀-ۿݐ-ݿ]")
+
+
+@lru_cache(maxsize=None)
+def load_tokenizer(model=TOKENIZER_MODEL):
+    # None when `tokenizers` is missing or the tokenizer cannot be downloaded
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        return None
+    try:
+        return Tokenizer.from_pretrained(model, token=HF_API_KEY or None)
+    except Exception:
+        return None
+
+
+def estimate_tokens(text):
+    # Llama 3 averages ~4 characters per token on Latin script and ~2.5 on Arabic script
+    arabic = len(_ARABIC_SCRIPT.findall(text))
+    return math.ceil((len(text) - arabic) / 4 + arabic / 2.5)
+
+
+def count_tokens(text, model=TOKENIZER_MODEL):
+    tokenizer = load_tokenizer(model)
+    if tokenizer is None:
+        return estimate_tokens(text)
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def count_message_tokens(messages, model=TOKENIZER_MODEL):
+    return 1 + sum(count_tokens(m["content"], model) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+class TokenBudget:
+    # Output tokens per unit (one quiz question, or one explanation/summary), learned per
+    # task and language from recent completions; max_tokens covers their 95th percentile
+    def __init__(self, window=BUDGET_WINDOW, min_samples=BUDGET_MIN_SAMPLES, headroom=MAX_TOKENS_HEADROOM):
+        self.min_samples = min_samples
+        self.headroom = headroom
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def observe(self, task_id, language, num_questions, completion_tokens, truncated=False):
+        if not completion_tokens:
+            return
+        per_unit = completion_tokens / output_units(task_id, num_questions)
+        if truncated:
+            per_unit *= TRUNCATION_GROWTH
+        with self._lock:
+            self._samples[(task_id, language)].append(per_unit)
+
+    def tokens_per_unit(self, task_id, language):
+        prior = OUTPUT_TOKENS_PER_UNIT[task_id] * LANGUAGE_TOKEN_FACTOR.get(language, 1.0)
+        with self._lock:
+            samples = sorted(self._samples[(task_id, language)])
+        if len(samples) < self.min_samples:
+            return prior
+        learned = samples[max(0, math.ceil(BUDGET_PERCENTILE / 100 * len(samples)) - 1)]
+        return min(learned, prior * MAX_PRIOR_MULTIPLE)
+
+    def max_tokens(self, task_id, language, num_questions=1):
+        per_unit = self.tokens_per_unit(task_id, language)
+        return clamp_max_tokens(per_unit * output_units(task_id, num_questions) * self.headroom)
+
+    def stats(self):
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            f"{task_id}/{language}": round(self.tokens_per_unit(task_id, language), 1)
+            for task_id, language in keys
+        }
@@ -0,0 +1,268 @@
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from itertools import combinations
+
+# --- Topic canonicalization and near-duplicate matching ---
+# "photosynthesis", "Photosynthesis process", "what is photosynthesis" and "ما هو التمثيل
+# الضوئي" should all reuse one answer. Topics are canonicalized (Unicode/diacritic folding
+# for Arabic and Hausa, per-language stopwords) and resolved onto a previously answered or
+# catalog topic with the same canonical text. String similarity alone would merge opposite
+# topics ("Organic"/"Inorganic chemistry", "Macro"/"Microeconomics"), so typo matching is
+# off by default and, when enabled, only forgives single-letter slips in whole words.
+
+# Misspelt words a topic may contain and still resolve onto a stored one (0 = exact only)
+TOPIC_MAX_TYPOS = int(os.getenv("CLASSGPT_TOPIC_TYPOS", "0"))
+TOPIC_DB_PATH = os.getenv(
+    "CLASSGPT_TOPIC_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".classgpt_topics.sqlite3"),
+)
+MIN_TYPO_WORD = 5 # Shorter words ("cell"/"sell", "acid"/"acids") must match exactly
+# Prefixes that flip or narrow a word's meaning; an edit inside one is not a typo
+CONTRAST_PREFIXES = (
+    "a", "anti", "de", "dis", "endo", "exo", "extra", "hetero", "homo", "hyper", "hypo", "il", "im",
+    "in", "inter", "intra", "ir", "macro", "micro", "mis", "mono", "multi", "non", "poly", "post",
+    "pre", "re", "sub", "super", "trans", "un",
+)
+
+# Arabic letter variants that students type interchangeably
+ARABIC_FOLDING = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه",
+    "ـ": None, # Tatweel
+})
+# Hausa hooked letters, and the apostrophe spelling of ƴ, on keyboards without them
+HAUSA_FOLDING = str.maketrans({"ɓ": "b", "ɗ": "d", "ƙ": "k", "ƴ": "y", "Ɓ": "b", "Ɗ": "d", "Ƙ": "k", "Ƴ": "y"})
+
+# Question words and filler that do not change which topic is meant. "how" and "why" (yaya,
+# كيف, لماذا) stay: "Why do plants need water" and "How do plants need water" are different asks.
+STOPWORDS = {
+    "English": {
+        "a", "an", "the", "of", "in", "on", "and", "to", "for", "about", "is", "are", "what", "whats",
+        "does", "do", "explain", "define", "definition", "meaning", "describe", "tell",
+        "me", "please", "process", "concept", "introduction", "intro", "basics", "topic", "overview",
+    },
+    "Hausa": {
+        "menene", "mene", "meye", "ne", "ce", "da", "na", "ta", "a", "game", "akan", "kan", "bayani",
+        "shine", "itace", "wato", "ma", "ni", "don", "allah", "ka", "ki", "fassara", "taƙaita",
+        "takaita",
+    },
+    "Arabic": {
+        "ما", "ماذا", "هو", "هي", "في", "من", "عن", "على", "الى", "اشرح", "شرح", "تعريف", "عمليه",
+        "مفهوم", "ماهو", "ماهي", "مقدمه", "موضوع",
+    },
+}
+ALL_STOPWORDS = set().union(*STOPWORDS.values())
+
+_WORD = re.compile(r"\w+")
+
+
+def _fold(text):
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = text.translate(HAUSA_FOLDING).replace("'y", "y").replace("ʼy", "y")
+    # Drop combining marks: Latin accents and Arabic harakat/shadda/superscript alef
+    text = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    text = unicodedata.normalize("NFKC", text)
+    return text.translate(ARABIC_FOLDING)
+
+
+def canonicalize_topic(topic, language=None):
+    stopwords = ALL_STOPWORDS if language is None else STOPWORDS.get(language, set()) | STOPWORDS["English"]
+    words = []
+    for word in _WORD.findall(_fold(topic or "")):
+        if word in stopwords:
+            continue
+        if len(word) > 4 and word.startswith("ال"):
+            word = word[2:] # Arabic definite article
+        words.append(word)
+    if not words:
+        # The topic was nothing but stopwords; fall back to the folded text
+        words = _WORD.findall(_fold(topic or ""))
+    return " ".join(words)
+
+
+def _typo_candidate(word, min_length=MIN_TYPO_WORD):
+    return len(word) >= min_length and not any(ch.isdigit() for ch in word)
+
+
+def _one_edit(a, b):
+    # True when b is a with one character inserted, deleted, substituted or two adjacent ones swapped
+    if a == b or abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        swapped = i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+        return swapped or a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:] if len(a) < len(b) else a[i + 1:] == b[i:]
+
+
+def _contrasting(a, b):
+    # "macroeconomics"/"microeconomics", "interstate"/"intrastate": one edit apart but opposite topics.
+    # Reject any edit that falls inside a meaning-changing prefix of either word.
+    first_difference = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+    prefix = max((len(p) for p in CONTRAST_PREFIXES if a.startswith(p) or b.startswith(p)), default=0)
+    return first_difference < prefix
+
+
+def _deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class TopicIndex:
+    # Exact lookup by canonical text, plus an optional typo index: a topic matches a stored one
+    # with the same number of words when every word is identical except at most `max_typos`
+    # words, each one edit away (symmetric-deletion lookup). Words under MIN_TYPO_WORD letters,
+    # numbers ("Algebra 1"/"Algebra 2") and edits inside a contrasting prefix must match exactly.
+
+    def __init__(self):
+        self.topics = [] # canonical text per doc id
+        self.values = [] # representative topic per doc id
+        self._by_canonical = {}
+        self._postings = {} # (word count, position, word) -> doc ids
+        self._deletions = {} # word, or word minus one letter -> indexed words
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.topics)
+
+    def add(self, topic, value=None, language=None):
+        with self._lock:
+            return self._add(topic, value, language)
+
+    def add_many(self, topics, language=None):
+        # Bulk load of (topic, value) pairs
+        with self._lock:
+            for topic, value in topics:
+                self._add(topic, value, language)
+
+    def _add(self, topic, value, language):
+        canonical = canonicalize_topic(topic, language)
+        if not canonical or canonical in self._by_canonical:
+            return canonical or None
+        doc_id = len(self.topics)
+        self._by_canonical[canonical] = doc_id
+        self.topics.append(canonical)
+        self.values.append(value if value is not None else topic)
+        words = canonical.split()
+        for position, word in enumerate(words):
+            key = (len(words), position, word)
+            postings = self._postings.get(key)
+            if postings is None:
+                self._postings[key] = postings = []
+                if _typo_candidate(word) and word not in self._deletions.get(word, ()):
+                    for variant in _deletions(word) | {word}:
+                        self._deletions.setdefault(variant, []).append(word)
+            postings.append(doc_id)
+        return canonical
+
+    def _near_words(self, word):
+        # Indexed words one edit away from `word`
+        if not _typo_candidate(word, MIN_TYPO_WORD - 1):
+            return ()
+        found = set()
+        for variant in _deletions(word) | {word}:
+            found.update(self._deletions.get(variant, ()))
+        return [w for w in found if _typo_candidate(w) and _one_edit(word, w) and not _contrasting(word, w)]
+
+    def match(self, topic, max_typos=TOPIC_MAX_TYPOS, language=None):
+        # Returns (value, canonical, score) of the stored topic this one resolves to, else None
+        canonical = canonicalize_topic(topic, language)
+        if not canonical:
+            return None
+        with self._lock:
+            doc_id = self._by_canonical.get(canonical)
+            if doc_id is not None:
+                return self.values[doc_id], canonical, 1.0
+            if max_typos <= 0 or not self.topics:
+                return None
+
+            words = canonical.split()
+            n_words = len(words)
+            exact = [self._postings.get((n_words, position, word), ()) for position, word in enumerate(words)]
+            near = [
+                [doc_id for w in self._near_words(word) for doc_id in self._postings.get((n_words, position, w), ())]
+                for position, word in enumerate(words)
+            ]
+            # Fewest misspelt words first; every other word must be identical
+            for typos in range(1, min(max_typos, n_words) + 1):
+                for misspelt in combinations(range(n_words), typos):
+                    required = sorted((near[i] if i in misspelt else exact[i] for i in range(n_words)), key=len)
+                    if not required[0]:
+                        continue
+                    candidates = set(required[0]).intersection(*required[1:])
+                    if candidates:
+                        doc_id = min(candidates) # The earliest stored spelling wins ties
+                        return self.values[doc_id], self.topics[doc_id], 1.0 - typos / len(canonical)
+            return None
+
+class TopicMatcher:
+    # One TopicIndex per request language, persisted to SQLite so every worker process learns the
+    # answered topics. Topics are canonicalized with the same language's stopwords when stored and
+    # when looked up, and a topic answered in one language never resolves a request in another.
+    def __init__(self, db_path=TOPIC_DB_PATH, max_typos=TOPIC_MAX_TYPOS):
+        self.max_typos = max_typos
+        self.db_path = db_path
+        self._indexes = {} # language -> TopicIndex
+        self._catalog = [] # Seeded (name or alias, topic) pairs, added to every language's index
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if db_path:
+            try:
+                conn = self._connect()
+                with conn:
+                    # Supersedes answered_topics, whose rows have no language and are no longer read
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS answered_topics_by_language"
+                        " (topic TEXT NOT NULL, language TEXT NOT NULL, PRIMARY KEY (topic, language))"
+                    )
+                rows = conn.execute("SELECT topic, language FROM answered_topics_by_language").fetchall()
+                for topic, language in rows:
+                    self.index(language or None).add(topic, language=language or None)
+            except sqlite3.Error:
+                self.db_path = None # Read-only filesystems still match within this process
+
+    def index(self, language=None):
+        with self._lock:
+            index = self._indexes.get(language)
+            if index is None:
+                index = self._indexes[language] = TopicIndex()
+                index.add_many(self._catalog, language)
+            return index
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            self._local.conn = conn
+        return conn
+
+    def seed(self, names):
+        # Catalog (name or alias, topic) pairs: every alias maps onto the catalog spelling, in every language
+        names = list(names)
+        with self._lock:
+            self._catalog.extend(names)
+            indexes = list(self._indexes.items())
+        for language, index in indexes:
+            index.add_many(names, language)
+
+    def resolve(self, topic, language=None):
+        # The topic to use for cache keys and generation: a previously answered one if it is the same
+        match = self.index(language).match(topic, self.max_typos, language)
+        return match[0] if match else topic.strip()
+
+    def remember(self, topic, language=None):
+        if self.index(language).add(topic, language=language) is None or not self.db_path:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO answered_topics_by_language (topic, language) VALUES (?, ?)",
+                    (topic.strip(), language or ""),
+                )
+        except sqlite3.Error:
+            pass
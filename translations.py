@@ -0,0 +1,131 @@
+from types import MappingProxyType
+
+# --- Internationalization (i18n) for UI Labels ---
+_translations = {
+    "English": {
+        "app_title": "📚 ClassGPT – Your Smart Study Assistant",
+        "tagline": "Explain topics, generate quizzes, and get summaries in English, Hausa, or Arabic!",
+        "settings_header": "⚙️ Settings",
+        "output_language_label": "Choose Output Language",
+        "select_task_label": "Select Task",
+        "level_label": "Choose Your Educational Level", # NEW
+        "level_primary": "Primary School (Ages 6-12)", # NEW
+        "level_secondary": "Secondary School (Ages 13-18)", # NEW
+        "level_tertiary": "Tertiary/University (Ages 18+)", # NEW
+        "explain_it": "Explain It",
+        "generate_quiz": "Generate Quiz",
+        "summarize_topic": "Summarize Topic",
+        "try_topics_tip": "💡 Try topics like *Photosynthesis*, *History*, *The Internet*, or *Algebra*.",
+        "enter_topic_prompt": "✍️ Enter a topic you’d like to study:",
+        "num_questions_label": "Number of Quiz Questions",
+        "get_response_button": "Get Response",
+        "submit_quiz_button": "Submit Quiz",
+        "force_regenerate_label": "Force regenerate (ignore saved answers)",
+        "cache_stats": "🗄️ Saved answers: {hits} reused · {misses} generated",
+        "resolved_topic": "🔎 Showing results for **{topic}**",
+        "learner_label": "Your name or class code (keeps your quiz progress)",
+        "parallel_quiz_label": "⚡ Faster quiz (one request per question)",
+        "processing_message": "⏳ Processing... Please wait...",
+        "success_message": "✅ Here's your result:",
+        "quiz_score": "📊 Your Quiz Score:",
+        "quiz_correct_answer": "Correct Answer:",
+        "your_answer": "Your Answer:",
+        "error_api_issue": "An error occurred with the Hugging Face API. Please check your API token, model access, or network.",
+        "error_parse_issue": "An unexpected response format was received from the API. Quiz parsing failed.",
+        "error_general": "A general error occurred.",
+        "start_info": "Enter a topic and click 'Get Response' to begin.",
+        "quote": "> 💡 *“Education is the passport to the future, for tomorrow belongs to those who prepare for it today.”*"
+    },
+    "Hausa": {
+        "app_title": "📚 ClassGPT – Mataimakin Nazari Mai Kaifin Hankali",
+        "tagline": "Fassara batutuwa, ƙirƙirar tambayoyi, da taƙaita abubuwa ko bayabai a Turanci, Hausa, ko Larabci!", #Edited
+        "settings_header": "⚙️ Saituna",
+        "output_language_label": "Zaɓi Harshen Fita",
+        "select_task_label": "Zaɓi Aiki",
+        "level_label": "Zaɓi Matakin Karatunka", # NEW
+        "level_primary": "Makarantar Firamare (Shekaru 6-12)", # NEW
+        "level_secondary": "Makarantar Sakandare (Shekaru 13-18)", # NEW
+        "level_tertiary": "Jami'a/Manyan Makarantu (Shekaru 18+)", # NEW
+        "explain_it": "Fassara",
+        "generate_quiz": "Ƙirƙiri Tambaya", #Edited
+        "summarize_topic": "Taƙaita Bayani", 
+        "try_topics_tip": "💡 Gwada batutuwa kamar *Photosynthesis*, *History*, *Intanet*, ko *Algebra*.",
+        "enter_topic_prompt": "✍️ Shigar da batu da kake son karantawa:",
+        "num_questions_label": "Adadin Tambayoyin Da Akeson Jarrabawa", #Edited
+        "get_response_button": "Samo Amsa",
+        "submit_quiz_button": "Aika Tambayoyin Da Akeson Jarrabawa",
+        "force_regenerate_label": "Sake ƙirƙira (kar a yi amfani da amsoshin da aka ajiye)",
+        "cache_stats": "🗄️ Amsoshin da aka ajiye: {hits} an sake amfani · {misses} sababbi",
+        "resolved_topic": "🔎 Ana nuna sakamako don **{topic}**",
+        "learner_label": "Sunanka ko lambar aji (don adana ci gabanka a jarrabawa)",
+        "parallel_quiz_label": "⚡ Tambayoyi cikin sauri (buƙata ɗaya ga kowace tambaya)",
+        "processing_message": "⏳ Ana kan aiwatarwa da umarnin... Don Allah a jira...", #Edited
+        "success_message": "✅ Ga sakamakon ka:",
+        "quiz_score": "📊 Sakamakon Jarrabawar ka:",
+        "quiz_correct_answer": "Amsa Daidai:",
+        "your_answer": "Amsar ka:",
+        "error_api_issue": "Akwai matsala da Hugging Face API. Don Allah ka/ki bincika makullin API ɗinka, damar samun samfurin, ko hanyar sadarwa.",
+        "error_parse_issue": "An sami tsarin amsa da ba a tsammace ce taba daga API. Tsarin jarrabawar ya gagara. Don Allah Ayi Hakuri", #Edited
+        "error_general": "Akwai matsala gabaɗaya.",
+        "start_info": "Shigar da batu sannan ka danna 'Samo Amsa' don farawa.",
+        "quote": "> 💡 *“Ilimi shine fasfo zuwa gaba, domin gobe ta waɗanda suka shirya mata a yau.”*"
+    },
+    "Arabic": {
+        "app_title": "📚 كلاس جي بي تي – مساعدك الذكي للدراسة",
+        "tagline": "اشرح المواضيع، أنشئ اختبارات، واحصل على ملخصات بالإنجليزية أو الهوسا أو العربية!",
+        "settings_header": "⚙️ الإعدادات",
+        "output_language_label": "اختر لغة الإخراج",
+        "select_task_label": "اختر المهمة",
+        "level_label": "اختر مستواك التعليمي", # NEW
+        "level_primary": "المرحلة الابتدائية (6-12 سنة)", # NEW
+        "level_secondary": "المرحلة الثانوية (13-18 سنة)", # NEW
+        "level_tertiary": "التعليم العالي/الجامعة (18+ سنة)", # NEW
+        "explain_it": "اشرح",
+        "generate_quiz": "إنشاء اختبار",
+        "summarize_topic": "لخص الموضوع",
+        "try_topics_tip": "💡 جرب مواضيع مثل *التمثيل الضوئي*, *الإنترنت*, أو *الجبر*.",
+        "enter_topic_prompt": "✍️ أدخل موضوعًا ترغب في دراسته:",
+        "num_questions_label": "عدد أسئلة الاختبار",
+        "get_response_button": "احصل على الرد",
+        "submit_quiz_button": "إرسال الاختبار",
+        "force_regenerate_label": "إعادة الإنشاء (تجاهل الإجابات المحفوظة)",
+        "cache_stats": "🗄️ الإجابات المحفوظة: {hits} مُعاد استخدامها · {misses} جديدة",
+        "resolved_topic": "🔎 عرض النتائج لـ **{topic}**",
+        "learner_label": "اسمك أو رمز الصف (لحفظ تقدمك في الاختبارات)",
+        "parallel_quiz_label": "⚡ اختبار أسرع (طلب واحد لكل سؤال)",
+        "processing_message": "⏳ جاري المعالجة... يرجى الانتظار...",
+        "success_message": "✅ إليك نتيجتك:",
+        "quiz_score": "📊 نتيجتك في الاختبار:",
+        "quiz_correct_answer": "الإجابة الصحيحة:",
+        "your_answer": "إجابتك:",
+        "error_api_issue": "حدث خطأ في واجهة برمجة تطبيقات Hugging Face. يرجى التحقق من مفتاح API الخاص بك، أو الوصول إلى النموذج، أو الشبكة.",
+        "error_parse_issue": "تم استلام تنسيق استجابة غير متوقع من واجهة برمجة التطبيقات. فشل تحليل الاختبار.",
+        "error_general": "حدث خطأ عام.",
+        "start_info": "أدخل موضوعًا وانقر على 'احصل على الرد' للبدء.",
+        "quote": "> 💡 *“التعليم هو جواز السفر إلى المستقبل، فالغد ملك لأولئك الذين يستعدون له اليوم.”*"
+    }
+}
+
+# --- Frozen lookups, built once per process at import time ---
+# Streamlit re-executes the app script on every rerun, but imported modules are cached, so
+# everything below is computed once and shared read-only by all sessions.
+translations = MappingProxyType({language: MappingProxyType(texts) for language, texts in _translations.items()})
+
+LANGUAGES = ("English", "Hausa", "Arabic")
+
+# Translation keys of the educational levels, in the order of selected_level_index
+LEVEL_KEYS = ("level_primary", "level_secondary", "level_tertiary")
+
+# Translation keys of the tasks; these double as the language-independent task ids
+TASK_KEYS = ("explain_it", "generate_quiz", "summarize_topic")
+
+# Per-language level labels and translated-task-label -> task id lookups for the UI
+LEVEL_LABELS = MappingProxyType({
+    language: tuple(texts[key] for key in LEVEL_KEYS) for language, texts in translations.items()
+})
+TASK_LABELS = MappingProxyType({
+    language: tuple(texts[key] for key in TASK_KEYS) for language, texts in translations.items()
+})
+TASK_ID_BY_LABEL = MappingProxyType({
+    language: MappingProxyType({texts[key]: key for key in TASK_KEYS}) for language, texts in translations.items()
+})